@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Encryptions per minute through dtcvote.crypto.batch for an 8-candidate RCV
+question with 1, 2, 4, ... worker processes.
+
+    PYTHONPATH=. python3 benchmarks/bench_batch_encrypt.py [ballots]
+"""
+import sys
+from multiprocessing import cpu_count
+from random import sample
+from time import perf_counter
+from uuid import uuid4
+
+from electionguard.group import rand_q
+
+from bench_encoding import rcv_election
+from dtcvote.controllers.election import generate_manifest
+from dtcvote.crypto.batch import BatchEncrypter
+from dtcvote.crypto.electionguard import ElectionGuardElection, plaintext_ballot
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    e = rcv_election(8, "expanded")
+    q = e.questions[0]
+    e_eg = ElectionGuardElection(generate_manifest(e), uuid4(), rand_q())
+    ballots = [plaintext_ballot(e, str(uuid4()), [dict(question_seq=q.sequence, candidate_seq=c.sequence, rank=rank)
+                                                  for rank, c in enumerate(sample(q.candidates, 7), start=1)],
+                                e_eg)
+               for _ in range(n)]
+
+    workers = 1
+    print(f"{'workers':>8} {'ballots/min':>12}")
+    while workers <= cpu_count():
+        with BatchEncrypter(e_eg, workers) as encrypter:
+            # start every worker, and let it load the election, before timing
+            list(encrypter.encrypt(ballots[:workers * encrypter.chunk_size]))
+            start = perf_counter()
+            encrypted = list(encrypter.encrypt(ballots))
+            elapsed = perf_counter() - start
+        assert all(encrypted)
+        print(f"{workers:>8} {n / elapsed * 60:>12.0f}")
+        workers *= 2
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Compare the ballot blob encodings in dtcvote.codec against the dill pickles
+they replace: bytes per row and decode throughput.
+
+    python3 benchmarks/bench_codec.py
+"""
+from datetime import datetime, timezone
+from timeit import timeit
+
+import dill
+
+from dtcvote.codec import decode, encode_content, encode_votes
+
+
+def timestamp(n: int) -> str:
+    # a distinct string per row, as isoformat() produces from the database
+    return datetime(2021, 4, 1, 12, tzinfo=timezone.utc).replace(microsecond=n).isoformat()
+
+
+def ballot_content(questions: int = 20, candidates: int = 15):
+    return dict(
+        id=1, created_dt=timestamp(0), name="Benchmark Election",
+        deadline="2021-04-28T01:10:08+00:00", secret_ballot=False,
+        vote_email="you must vote", voted_email="you voted", not_voted_email="you have not voted",
+        questions=[dict(id=q, created_dt=timestamp(q), algorithm_id=3, sequence=q,
+                        name=f"Question {q}", randomize_candidates=True, number_of_winners=1,
+                        candidates=[dict(id=c, created_dt=timestamp(q * 100 + c), sequence=c,
+                                         name=f"Candidate {c}") for c in range(1, candidates + 1)])
+                   for q in range(1, questions + 1)],
+    )
+
+
+def votes(questions: int = 20, candidates: int = 15):
+    return [dict(question_seq=q, candidate_seq=c, rank=c)
+            for q in range(1, questions + 1) for c in range(1, candidates + 1)]
+
+
+def compare(label, obj, encode, number=2000):
+    legacy, current = dill.dumps(obj), encode(obj)
+    t_legacy = timeit(lambda: dill.loads(legacy), number=number)
+    t_current = timeit(lambda: decode(current), number=number)
+    print(f"{label:<16} {'dill':<8} {len(legacy):>8} B {number / t_legacy:>12.0f} decodes/s")
+    print(f"{'':<16} {'codec':<8} {len(current):>8} B {number / t_current:>12.0f} decodes/s")
+
+
+if __name__ == "__main__":
+    compare("ballot_content", ballot_content(), encode_content)
+    compare("votes", votes(), encode_votes)
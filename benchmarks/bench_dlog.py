@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Time decrypting 50k-voter tallies: electionguard's linear discrete_log from
+a cold cache against a lookup in the memory-mapped table.
+
+    PYTHONPATH=. python3 benchmarks/bench_dlog.py [voters]
+"""
+import sys
+from random import randrange
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from electionguard import dlog as eg_dlog
+from electionguard.group import g_pow_p
+
+from dtcvote.crypto.dlog import DlogTable
+
+if __name__ == "__main__":
+    voters = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    totals = [g_pow_p(randrange(voters)) for _ in range(100)]
+    with TemporaryDirectory() as directory:
+        start = perf_counter()
+        table = DlogTable.build(f"{directory}/dlog.bin", voters + 1)
+        print(f"build {voters + 1} entries: {perf_counter() - start:.2f}s")
+
+        start = perf_counter()
+        for x in totals:
+            assert table.lookup(x.elem) is not None
+        print(f"table lookup:        {(perf_counter() - start) / len(totals) * 1e3:8.3f} ms/selection")
+
+        start = perf_counter()
+        eg_dlog.discrete_log(max(totals, key=lambda x: table.lookup(x.elem)))
+        print(f"linear, cold cache:  {(perf_counter() - start) * 1e3:8.3f} ms (one tally process)")
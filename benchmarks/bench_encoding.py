@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Encryption cost of one RCV question under the expanded and compact ballot
+encodings (see dtcvote.crypto.encoding) for 5, 10 and 20 candidates.
+
+    PYTHONPATH=. python3 benchmarks/bench_encoding.py [ballots]
+"""
+import sys
+from random import sample
+from time import perf_counter
+from types import SimpleNamespace
+from uuid import uuid4
+
+from electionguard.ballot import PlaintextBallot, PlaintextBallotContest, PlaintextBallotSelection
+from electionguard.group import rand_q
+
+from dtcvote.controllers.election import generate_manifest
+from dtcvote.crypto.encoding import ENCODINGS, plaintext_votes
+from dtcvote.crypto.electionguard import ElectionGuardElection
+
+
+def rcv_election(candidates: int, ballot_encoding: str):
+    algorithm = SimpleNamespace(name="rcv", instructions="Rank the candidates", ballot_encoding=ballot_encoding)
+    question = SimpleNamespace(
+        id=1, sequence=1, name="Question 1", number_of_winners=1, algorithm=algorithm,
+        candidates=[SimpleNamespace(sequence=c, name=f"candidate-{c}", party=None)
+                    for c in range(1, candidates + 1)],
+    )
+    return SimpleNamespace(name="benchmark", opened=None, deadline=None, questions=[question])
+
+
+def plaintext_ballot(e, e_eg, style_id: str) -> PlaintextBallot:
+    q = e.questions[0]
+    # a full ranking, the most selections either encoding sets
+    ranking = sample(q.candidates, len(q.candidates))
+    votes = [dict(question_seq=q.sequence, candidate_seq=c.sequence, rank=rank)
+             for rank, c in enumerate(ranking, start=1)]
+    values = plaintext_votes(q, votes, e_eg.encodings[str(q.id)])
+    selections = [PlaintextBallotSelection(object_id, vote) for object_id, vote in values.items()]
+    return PlaintextBallot(str(uuid4()), style_id, [PlaintextBallotContest(q.id, selections)])
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f"{'candidates':>10} {'encoding':>9} {'selections':>10} {'allowed':>8} {'ms/ballot':>10}")
+    for candidates in (5, 10, 20):
+        for ballot_encoding in ENCODINGS:
+            e = rcv_election(candidates, ballot_encoding)
+            manifest = generate_manifest(e)
+            contest = manifest["contests"][0]
+            e_eg = ElectionGuardElection(manifest, uuid4(), rand_q())
+            ballots = [plaintext_ballot(e, e_eg, f"{e.name}-ballot-style") for _ in range(n)]
+            start = perf_counter()
+            for ballot in ballots:
+                assert e_eg.encrypter.encrypt(ballot) is not None
+            elapsed = (perf_counter() - start) / n
+            print(f"{candidates:>10} {ballot_encoding:>9} {len(contest['ballot_selections']):>10} "
+                  f"{contest['votes_allowed']:>8} {elapsed * 1e3:>10.1f}")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Ballots encrypted per second for RCV questions with 4, 8 and 12 candidates,
+with electionguard's own modular exponentiation and with the fixed-base
+tables from dtcvote.crypto.precompute.
+
+    PYTHONPATH=. python3 benchmarks/bench_encrypt.py [ballots]
+"""
+import sys
+from random import sample
+from time import perf_counter
+from types import SimpleNamespace
+from uuid import uuid4
+
+from electionguard.ballot import PlaintextBallot, PlaintextBallotContest, PlaintextBallotSelection
+from electionguard.group import rand_q
+
+from dtcvote.controllers.election import generate_manifest
+from dtcvote.crypto import precompute
+from dtcvote.crypto.electionguard import ElectionGuardElection
+
+
+def rcv_election(candidates: int):
+    algorithm = SimpleNamespace(name="rcv", instructions="Rank the candidates")
+    question = SimpleNamespace(
+        id=1, sequence=1, name="Question 1", number_of_winners=1, algorithm=algorithm,
+        candidates=[SimpleNamespace(name=f"candidate-{c}", party=None) for c in range(1, candidates + 1)],
+    )
+    return SimpleNamespace(name="benchmark", opened=None, deadline=None, questions=[question])
+
+
+def plaintext_ballot(manifest, style_id: str) -> PlaintextBallot:
+    contests = list()
+    for contest in manifest["contests"]:
+        names = sorted({s["candidate_id"].rsplit("-rank-", 1)[0] for s in contest["ballot_selections"]})
+        ranked = {f"{name}-rank-{rank}-selection"
+                  for rank, name in enumerate(sample(names, len(names) - 1), start=1)}
+        contests.append(PlaintextBallotContest(
+            contest["object_id"],
+            [PlaintextBallotSelection(s["object_id"], int(s["object_id"] in ranked))
+             for s in contest["ballot_selections"]],
+        ))
+    return PlaintextBallot(str(uuid4()), style_id, contests)
+
+
+def ballots_per_second(e_eg, ballots) -> float:
+    start = perf_counter()
+    for ballot in ballots:
+        assert e_eg.encrypter.encrypt(ballot) is not None
+    return len(ballots) / (perf_counter() - start)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{'candidates':>10} {'selections':>10} {'baseline':>12} {'fixed-base':>12} {'speedup':>8}")
+    for candidates in (4, 8, 12):
+        e = rcv_election(candidates)
+        manifest = generate_manifest(e)
+        start = perf_counter()
+        e_eg = ElectionGuardElection(manifest, uuid4(), rand_q())
+        setup = perf_counter() - start
+        ballots = [plaintext_ballot(manifest, f"{e.name}-ballot-style") for _ in range(n)]
+        fast = ballots_per_second(e_eg, ballots)
+        precompute.restore()
+        slow = ballots_per_second(e_eg, ballots)
+        e_eg.precompute()
+        selections = len(manifest["contests"][0]["ballot_selections"])
+        print(f"{candidates:>10} {selections:>10} {slow:>10.2f}/s {fast:>10.2f}/s {fast / slow:>7.1f}x"
+              f"   (setup incl. tables {setup:.2f}s)")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Messages per second through dtcvote.mail's senders into a local aiosmtpd
+stand-in relay: a new connection per message, then reused connections
+with 1, 2, 4 and 8 sender threads, and 4 threads under a per-relay rate
+limit. No database is needed; the rows are built in memory.
+
+    pip install aiosmtpd
+    PYTHONPATH=. python3 benchmarks/bench_mail.py [messages]
+"""
+import sys
+from collections import namedtuple
+from threading import Thread
+from time import perf_counter
+
+from aiosmtpd.controller import Controller
+
+from dtcvote.mail import Relay, message, send_batch
+
+Row = namedtuple("Row", "id email_from email_to subject body")
+
+
+class Sink(object):
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def run(relay: Relay, rows, threads: int, batch_size: int = 50) -> float:
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+
+    def sender(i: int) -> None:
+        for batch in batches[i::threads]:
+            sent, retry, failed = send_batch(relay, batch)
+            assert not retry and not failed, retry + failed
+        relay.close()
+
+    workers = [Thread(target=sender, args=(i,)) for i in range(threads)]
+    started = perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(rows) / (perf_counter() - started)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=8025)
+    controller.start()
+    rows = [Row(i, "Election <election@example.com>", f"voter{i}@example.com", "Vote in Election",
+                "To vote in this election, click this link: https://example.com/vote/x\n" * 5)
+            for i in range(n)]
+    relay = Relay("127.0.0.1", 8025)
+    started = perf_counter()
+    for row in rows[:n // 4]:
+        relay.send(message(row))
+        relay.close()
+    print(f"{'reconnect x1':>16} {n // 4 / (perf_counter() - started):>10.0f} msgs/sec")
+
+    for threads in (1, 2, 4, 8):
+        print(f"{f'reuse x{threads}':>16} {run(relay, rows, threads):>10.0f} msgs/sec")
+
+    limited = Relay("127.0.0.1", 8025, rate=500)
+    print(f"{'500/sec x4':>16} {run(limited, rows[:1000], 4):>10.0f} msgs/sec")
+    controller.stop()
+    print(f"relay received {sink.received} messages")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Cast-path encryption latency for an 8-candidate RCV ballot, without and with
+a full nonce pool, during a burst of back-to-back casts, plus the pool's
+depth and fallback rate afterwards.
+
+    PYTHONPATH=. python3 benchmarks/bench_nonce_pool.py [ballots]
+"""
+import sys
+from random import sample
+from statistics import quantiles
+from time import perf_counter, sleep
+from uuid import uuid4
+
+from electionguard.group import rand_q
+
+from bench_encoding import rcv_election
+from dtcvote.controllers.election import generate_manifest
+from dtcvote.crypto import nonces
+from dtcvote.crypto.electionguard import ElectionGuardElection, plaintext_ballot
+
+
+def latencies(e_eg, ballots):
+    times = list()
+    for ballot in ballots:
+        start = perf_counter()
+        assert e_eg.encrypter.encrypt(ballot) is not None
+        times.append(perf_counter() - start)
+    cuts = quantiles(times, n=100)
+    return cuts[49] * 1e3, cuts[98] * 1e3
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    e = rcv_election(8, "expanded")
+    q = e.questions[0]
+    manifest = generate_manifest(e)
+    e_eg = ElectionGuardElection(manifest, uuid4(), rand_q())
+    ballots = [plaintext_ballot(e, str(uuid4()), [dict(question_seq=q.sequence, candidate_seq=c.sequence, rank=rank)
+                                                  for rank, c in enumerate(sample(q.candidates, 7), start=1)],
+                                e_eg)
+               for _ in range(n)]
+    # selections per ballot, placeholders included
+    contest = manifest["contests"][0]
+    depth = n * (len(contest["ballot_selections"]) + contest["votes_allowed"])
+
+    p50, p99 = latencies(e_eg, ballots)
+    print(f"no pool       p50 {p50:8.1f} ms  p99 {p99:8.1f} ms")
+
+    pool = nonces.use_nonce_pool(e_eg.context.elgamal_public_key, depth)
+    while pool.stats()["depth"] < depth:
+        sleep(0.5)
+    p50, p99 = latencies(e_eg, ballots)
+    print(f"full pool     p50 {p50:8.1f} ms  p99 {p99:8.1f} ms  {pool.stats()}")
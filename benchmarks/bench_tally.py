@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tally and decrypt an 8-candidate RCV question sequentially and across
+1, 2, 4, ... worker processes, for a growing number of cast ballots, and
+check that every mode, including decrypting the running tally kept by
+ElectionGuardBallot.submit, returns the same counts.
+
+    PYTHONPATH=. python3 benchmarks/bench_tally.py [max_ballots]
+"""
+import sys
+from multiprocessing import cpu_count
+from time import perf_counter
+from uuid import uuid4
+
+from electionguard.ballot import BallotBoxState
+from electionguard.ballot_box import accept_ballot
+from electionguard.data_store import DataStore
+from electionguard.group import rand_q
+
+from bench_encrypt import plaintext_ballot, rcv_election
+from dtcvote.controllers.election import generate_manifest
+from dtcvote.crypto.electionguard import ElectionGuardElection
+from dtcvote.crypto.tally import TallyAccumulator, parallel_count
+
+
+def timed(f):
+    start = perf_counter()
+    result = f()
+    return result, perf_counter() - start
+
+
+if __name__ == "__main__":
+    max_ballots = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    e = rcv_election(8)
+    manifest = generate_manifest(e)
+    secret_key = rand_q()
+    e_eg = ElectionGuardElection(manifest, uuid4(), secret_key)
+    encrypted = [e_eg.encrypter.encrypt(plaintext_ballot(manifest, f"{e.name}-ballot-style"))
+                 for _ in range(max_ballots)]
+
+    cores = [1]
+    while cores[-1] * 2 <= cpu_count():
+        cores.append(cores[-1] * 2)
+    print(f"{'ballots':>8} {'sequential':>11}" + "".join(f" {f'{n} proc':>9}" for n in cores) + f" {'running':>9}")
+    n = 100
+    while n <= max_ballots:
+        e_eg.store = DataStore()
+        e_eg.accumulator = TallyAccumulator.for_manifest(e_eg.internal_manifest)
+        for ballot in encrypted[:n]:
+            e_eg.accumulator.add(accept_ballot(ballot, BallotBoxState.CAST, e_eg.internal_manifest,
+                                               e_eg.context, e_eg.store))
+        expected, t = timed(lambda: e_eg.count_encrypted_ballots(secret_key, workers=1, recount=True))
+        row = f"{n:>8} {t:>10.2f}s"
+        for workers in cores:
+            counts, t = timed(lambda: parallel_count(e_eg.store.values(), e_eg.internal_manifest,
+                                                     e_eg.context, secret_key, workers))
+            assert counts == expected, "parallel tally differs from sequential"
+            row += f" {t:>8.2f}s"
+        counts, t = timed(lambda: e_eg.count_encrypted_ballots(secret_key, workers=1))
+        assert counts == expected, "running tally differs from sequential"
+        row += f" {t:>8.2f}s"
+        print(row)
+        n *= 2
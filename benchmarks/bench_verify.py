@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Ballots verified per second for an 8-candidate RCV question: electionguard's
+own is_valid_encryption one ballot at a time, then dtcvote.crypto.verify's
+batch check with 1, 2, 4, ... worker processes.
+
+    PYTHONPATH=. python3 benchmarks/bench_verify.py [ballots]
+"""
+import sys
+from multiprocessing import cpu_count
+from random import sample
+from time import perf_counter
+from uuid import uuid4
+
+from dill import dumps
+from electionguard.group import rand_q
+
+from bench_encoding import rcv_election
+from dtcvote.controllers.election import generate_manifest
+from dtcvote.crypto.batch import encrypt_ballots
+from dtcvote.crypto.electionguard import ElectionGuardElection, plaintext_ballot, submit_ballot
+from dtcvote.crypto.verify import verify_ballots
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    e = rcv_election(8, "expanded")
+    q = e.questions[0]
+    e_eg = ElectionGuardElection(generate_manifest(e), uuid4(), rand_q())
+    ballots = [plaintext_ballot(e, str(uuid4()), [dict(question_seq=q.sequence, candidate_seq=c.sequence, rank=rank)
+                                                  for rank, c in enumerate(sample(q.candidates, 7), start=1)],
+                                e_eg)
+               for _ in range(n)]
+    for ciphertext in encrypt_ballots(e_eg, ballots):
+        submit_ballot(e_eg, ciphertext)
+    rows = [(object_id, dumps(ballot)) for object_id, ballot in e_eg.store.items()]
+    manifest_hash = e_eg.internal_manifest.manifest_hash
+    k, base_hash = e_eg.context.elgamal_public_key, e_eg.context.crypto_extended_base_hash
+
+    start = perf_counter()
+    assert all(ballot.is_valid_encryption(manifest_hash, k, base_hash) for ballot in e_eg.store.values())
+    print(f"{'individual':>10} {n / (perf_counter() - start):>12.1f} ballots/s")
+
+    workers = 1
+    while workers <= cpu_count():
+        start = perf_counter()
+        report = verify_ballots(rows, e_eg.internal_manifest, e_eg.context, workers)
+        elapsed = perf_counter() - start
+        assert report.checked == n and not report.invalid
+        print(f"{f'batch x{workers}':>10} {n / elapsed:>12.1f} ballots/s")
+        workers *= 2
@@ -1,45 +1,51 @@
 from collections import OrderedDict
-from uuid import UUID
-from electionguard.elgamal import ElGamalKeyPair, elgamal_keypair_from_secret
-from electionguard.ballot import CiphertextBallot, PlaintextBallotSelection, PlaintextBallotContest, PlaintextBallot
-from electionguard.encrypt import SelectionDescription
+from typing import Dict, List, Text
+from electionguard.ballot import PlaintextBallot
 from dtcvote.models.orm import Election
-
-
-
-
-
+from dtcvote.crypto.electionguard import ElectionGuardBallot, ElectionGuardElection, ballot_request, plaintext_ballot
 
 
 class BasicBallot(OrderedDict):
+    """
+    A blank ballot for Election `e`, which should be loaded with the
+    ballot-template profile (dtcvote.models.loading) so reading its
+    questions, algorithms, candidates and parties takes no further queries.
+    """
+
     def __init__(self, e: Election):
+        self.election = e
         super().__init__(
-            election_id=e.ID,
+            election_id=e.id,
             election_name=e.name,
             election_deadline=e.deadline,
             election_secret=e.secret_ballot,
-            questions = [OrderedDict(
-               question_id = q.ID,
-               question_name = q.name,
-               algorithm_name = q.algorithm.name,
-               algorithm_instructions = q.algorithm.instructions,
-               question_number_of_winners = q.number_of_winners,
-               candidates = [OrderedDict(
-                   candidate_sequence = c.sequence,
-                   candidate_name = c.name,
-                   candidate_party = c.party.name,
-                   voter_ranking = 0
-                   ) for c in q.candidates]
-                ) for q in e.questions]
-            )
-
-
-    def encrypt(self):
-        ballot_pt = PlaintextBallot(None,
-                                    self.get("election_name"),
-                                    [   PlaintextBallotContest(q.get("question_name"),
-                                        [   PlaintextBallotSelection(c.get("candidate_name"), c.get("voter_ranking"))
-                                            for c in q.candidates ]
-                                        )
-                                        for q in self.get("questions") ]
-                                    )
+            questions=[OrderedDict(
+                question_id=q.id,
+                question_sequence=q.sequence,
+                question_name=q.name,
+                algorithm_name=q.algorithm.name,
+                algorithm_instructions=q.algorithm.instructions,
+                question_number_of_winners=q.number_of_winners,
+                candidates=[OrderedDict(
+                    candidate_sequence=c.sequence,
+                    candidate_name=c.name,
+                    candidate_party=c.party.name if c.party else None,
+                    voter_ranking=0
+                ) for c in q.candidates]
+            ) for q in e.questions]
+        )
+
+    def votes(self) -> List[Dict]:
+        """
+        The voter's rankings as {question_seq, candidate_seq, rank} dicts.
+        """
+        return [dict(question_seq=q["question_sequence"], candidate_seq=c["candidate_sequence"],
+                     rank=c["voter_ranking"])
+                for q in self["questions"] for c in q["candidates"] if c["voter_ranking"]]
+
+    def plaintext(self, election: ElectionGuardElection, object_id: Text) -> PlaintextBallot:
+        return plaintext_ballot(self.election, object_id, self.votes(), election)
+
+    def encrypt(self, election: ElectionGuardElection, object_id: Text) -> ElectionGuardBallot:
+        return ElectionGuardBallot(object_id, f"{self.election.name}-ballot-style",
+                                   ballot_request(self.election, self.votes(), election), election)
@@ -0,0 +1,73 @@
+"""
+Versioned binary encodings for the blobs stored on a Ballot.
+
+Every blob starts with a one-byte format tag:
+
+    0x01  msgpack document (ballot content)
+    0x02  packed little-endian uint16 (question_seq, candidate_seq, rank) triples
+    0x03  packed little-endian int32 triples, for values outside uint16
+
+Rows written before these formats existed hold dill pickles, which start
+with the pickle PROTO opcode 0x80 and are still decoded transparently.
+"""
+from array import array
+from sys import byteorder
+from typing import Any, Dict, List, Union
+
+import dill
+import msgpack
+
+CONTENT_MSGPACK = 0x01
+VOTES_U16 = 0x02
+VOTES_I32 = 0x03
+LEGACY_PICKLE = 0x80
+
+VOTE_KEYS = ("question_seq", "candidate_seq", "rank")
+
+Blob = Union[bytes, bytearray, memoryview]
+
+
+def is_legacy(blob: Blob) -> bool:
+    return bool(blob) and blob[0] == LEGACY_PICKLE
+
+
+def encode_content(content: Any) -> bytes:
+    return bytes((CONTENT_MSGPACK,)) + msgpack.packb(content, use_bin_type=True)
+
+
+def encode_votes(votes: List[Dict]) -> bytes:
+    flat = [v[k] for v in votes for k in VOTE_KEYS]
+    if all(0 <= x <= 0xFFFF for x in flat):
+        tag, packed = VOTES_U16, array("H", flat)
+    else:
+        tag, packed = VOTES_I32, array("i", flat)
+    if byteorder != "little":
+        packed.byteswap()
+    return bytes((tag,)) + packed.tobytes()
+
+
+def _decode_votes(typecode: str, payload: Blob) -> List[Dict]:
+    flat = array(typecode)
+    flat.frombytes(payload)
+    if byteorder != "little":
+        flat.byteswap()
+    it = iter(flat.tolist())
+    return [{"question_seq": q, "candidate_seq": c, "rank": r} for q, c, r in zip(it, it, it)]
+
+
+def decode(blob: Blob) -> Any:
+    """
+    Decode a ballot blob of any known format, including legacy dill pickles.
+    """
+    blob = memoryview(blob)
+    tag = blob[0]
+    if tag == CONTENT_MSGPACK:
+        return msgpack.unpackb(blob[1:], raw=False)
+    elif tag == VOTES_U16:
+        return _decode_votes("H", blob[1:])
+    elif tag == VOTES_I32:
+        return _decode_votes("i", blob[1:])
+    elif tag == LEGACY_PICKLE:
+        return dill.loads(blob)
+    else:
+        raise ValueError(f"Unknown ballot blob format 0x{tag:02x}")
@@ -1,15 +1,34 @@
 import connexion
-from typing import TypeVar, Generic, Callable
+from dtcvote.config import LIST_MAX_PAGE_SIZE, LIST_PAGE_SIZE
+from dtcvote.models.loading import DETAIL, options
+from dtcvote.models.serializers import dumps
+from flask import Response
+from typing import Any, Dict, TypeVar, Generic, Callable
 
 T = TypeVar('T')
 
 
+def _json(body: Any, status: int = 200, headers: Dict = None) -> Response:
+    """
+    A JSON response encoded here, in one pass, rather than by connexion
+    """
+    return Response(dumps(body), status, headers, mimetype="application/json")
+
+
 def _search(cls: Generic[T]) -> Callable:
     """get
 
-    Returns all records from the system that the user has access to
+    Returns a page of records from the system that the user has access to,
+    with a Link header to the next page when this one is full
     """
-    return lambda: (cls.search(), 200)
+    def search(after_id: int = 0, limit: int = LIST_PAGE_SIZE):
+        rows = cls.search(after_id, limit)
+        headers = dict()
+        if rows and len(rows) == min(limit, LIST_MAX_PAGE_SIZE):
+            headers["Link"] = f'<{connexion.request.path}?after_id={rows[-1]["id"]}&limit={limit}>; rel="next"'
+        return _json(rows, 200, headers)
+
+    return search
 
 
 def _post(cls: Generic[T]) -> Callable:
@@ -26,9 +45,9 @@ def _get(cls: Generic[T]) -> Callable:
     :param id_: id_ of pet to fetch
     """
     def get(id_: int):
-        response = cls.get(id_)
+        response = cls.get(id_, options(cls, DETAIL))
         if response:
-            return response, 200
+            return _json(response)
         else:
             return {'code': 404, 'message': f"{cls.__name__} ID Not Found"}, 404
 
@@ -46,7 +65,7 @@ def _delete(cls: Generic[T]) -> Callable:  # noqa: E501
 
     :rtype: None
     """
-    def delete(id_: int, dry_run: bool=False):
+    def delete(id_: int, dry_run: bool = False):
         response = cls.delete(id_, dry_run)
         if response == 404:
             return {'code': 404, 'message': f"{cls.__name__} ID Not Found"}, 404
@@ -1,4 +1,5 @@
 import connexion
+from dtcvote.controllers import _json
 from dtcvote.models.orm import Ballot
 from typing import Text
 from uuid import UUID
@@ -15,10 +16,10 @@ def get(uuid: Text):  # noqa: E501
     if b == 404:
         return {'code': 404, 'message': "No ballot here by that ID."}, 404
     else:
-        return b, 200
+        return _json(b)
 
 
-def put(uuid: Text, dry_run: bool=None):
+def put(uuid: Text, dry_run: bool = None):
     """ballot_id_uuid_put
 
     Cast a ballot. # noqa: E501
@@ -29,7 +30,9 @@ def put(uuid: Text, dry_run: bool=None):
     """
     ballot_put_request = connexion.request.get_json()
     b = Ballot.put(UUID(uuid), votes=ballot_put_request, dry_run=dry_run)
-    if b == 418:
+    if b == 400:
+        return {'code': 400, 'message': "A question has more than one candidate at the same rank."}, 400
+    elif b == 418:
         return {'code': 418, 'message': "Cannot cast ballot. It may not exist or the election may be closed."}, 418
     else:
         return b, 200
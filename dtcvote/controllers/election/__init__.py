@@ -1,8 +1,8 @@
 from typing import Dict, Tuple
 import connexion
 from dtcvote.controllers import _delete, _get, _post, _search
-from dtcvote.models.orm import BasicMixin, Election
-from electionguard.manifest import ElectionType
+from dtcvote.crypto.encoding import contest_selections, is_ranked
+from dtcvote.models.orm import Election
 
 search = _search(Election)
 post = _post(Election)
@@ -60,16 +60,17 @@ def generate_manifest(e: Election) -> Dict:
     if e.deadline:
         manifest["end_date"] = e.deadline.isoformat()
     for q in e.questions:
-        rcv = False if q.algorithm.name in ("Plurality", "Majority") else True
+        rcv = is_ranked(q)
+        selections, contest_candidates, votes_allowed = contest_selections(q)
         contest = {
             "@type": "CandidateContest",
-            "object_id": q.id,
+            "object_id": str(q.id),
             "sequence_order": q.sequence,
             "vote_variation": 'rcv' if rcv else q.algorithm.name.lower(),
             "electoral_district_id": "windsor-dtc",
             "name": q.name,
             "number_elected": q.number_of_winners,
-            "votes_allowed": len(q.candidates) if rcv else q.number_of_winners,
+            "votes_allowed": votes_allowed,
             "ballot_title": {
                 "text": [
                     {"value": q.name, "language": "en"},
@@ -80,37 +81,20 @@ def generate_manifest(e: Election) -> Dict:
                     {"value": q.algorithm.instructions, "language": "en"},
                 ]
             },
-            "ballot_selections": list(),
+            "ballot_selections": selections,
         }
 
-        seq = 1
         for c in q.candidates:
-            candidate = dict()
-            for n in range(1, len(q.candidates)):
-                if candidate.get("object_id", str()) != c.name:
-                    candidate_id = f"{c.name}-rank-{n}" if rcv else c.name
-                    contest["ballot_selections"].append(
-                        {
-                            "object_id": f"{candidate_id}-selection",
-                            "sequence_order": seq,
-                            "candidate_id": candidate_id,
-                        }
+            if c.party:
+                contest.setdefault("primary_party_ids", list())
+                if c.party.name not in contest["primary_party_ids"]:
+                    contest["primary_party_ids"].append(c.party.name)
+                if c.party.name not in parties.keys():
+                    parties[c.party.name] = dict(
+                        object_id=c.party.name,
+                        name=dict(text=[dict(value=c.party.name, language="en")]),
                     )
-                    seq = seq + 1
-                    candidate = dict(
-                        object_id=candidate_id, name={"text": [{"value": c.name, "language": "en"}]}
-                    )
-
-                    if c.party:
-                        candidate["party_id"] = c.party.name
-                        if c.party.name not in contest["primary_party_ids"]:
-                            contest["primary_party_ids"].append(c.party.name)
-                        if c.party.name not in parties.keys():
-                            parties[c.party.name] = dict(
-                                object_id=c.party.name,
-                                name=dict(text=[dict(value=c.party.name, language="en")]),
-                            )
-                    candidates.append(candidate)
+        candidates.extend(contest_candidates)
 
         manifest["contests"].append(contest)
 
@@ -1,15 +1,64 @@
-def search(ID, dry_run=None, recount=None):  # noqa: E501
+from itertools import groupby
+from typing import Dict, List
+
+from dtcvote.crypto.electionguard import load_election
+from dtcvote.jobs import JobFailed, save, submit
+from dtcvote.models.loading import TALLY, load
+from dtcvote.models.orm import Election, Job
+
+
+def grouped(results: List[Dict]) -> List[List]:
+    return [list(rows) for _, rows in groupby(results, key=lambda r: r["question_id"])]
+
+
+def count(job: Job, dry_run: bool = False) -> List[List]:
+    """
+    Job handler: check the encrypted ballots' proofs if asked to, then count
+    one question at a time, committing each question's results.
+    """
+    e = load(Election, job.election_id, TALLY)
+    checkpoint = job.checkpoint or dict(verified=False, questions=list(), results=list())
+    if job.params.get("verify") and not checkpoint["verified"] and e.pickle_jar is not None:
+        report = load_election(e).verify()
+        if report.invalid:
+            raise JobFailed(f"{len(report.invalid)} of {report.checked} encrypted ballots "
+                            f"failed verification: {', '.join(report.invalid)}")
+        checkpoint = dict(checkpoint, verified=True)
+        save(job, 0, checkpoint, len(e.questions), dry_run)
+
+    for q in e.questions:
+        if q.id in checkpoint["questions"]:
+            continue
+        try:
+            rows = q.tabulate()
+        except ValueError as err:
+            raise JobFailed(str(err))
+        checkpoint = dict(checkpoint, questions=checkpoint["questions"] + [q.id],
+                          results=checkpoint["results"] + rows)
+        save(job, len(checkpoint["questions"]), checkpoint, len(e.questions), dry_run)
+
+    e.results = checkpoint["results"]
+    return grouped(e.results)
+
+
+def search(id_: int, dry_run: bool = False, recount: bool = False, verify: bool = False):  # noqa: E501
     """election_id_count_get
 
     Counts the ballots for a given election ID # noqa: E501
 
-    :param ID: ID of pet to fetch
-    :type ID: int
+    :param id_: ID of pet to fetch
     :param dry_run: Validate but don&#39;t actually do it
-    :type dry_run: bool
     :param recount: Force a recount even when stored results are available
-    :type recount: bool
+    :param verify: Check the proofs of every encrypted ballot first
 
     :rtype: List[List]
     """
-    return 'do some magic!'
+    e = load(Election, id_, TALLY)
+    if not e:
+        return {'code': 404, 'message': "Election ID Not Found"}, 404
+    elif not e.closed:
+        return {'code': 418, 'message': "This election is still open. Close it before counting."}, 418
+
+    if e.results and not (recount or verify):
+        return grouped(e.results), 200
+    return submit("count", e.id, dict(verify=verify), dry_run)
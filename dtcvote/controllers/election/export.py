@@ -0,0 +1,41 @@
+from typing import Dict, List
+
+from dtcvote.jobs import save, submit
+from dtcvote.models.loading import TALLY, load
+from dtcvote.models.orm import Election, Job
+
+
+def export(job: Job, dry_run: bool = False) -> List[Dict]:
+    """
+    Job handler: list every question's BLT download, one question at a time,
+    checkpointing the ids of the questions done. The BLT itself is streamed
+    from /question/{id_}/blt when it is downloaded, so neither the job's
+    checkpoint nor its result holds it.
+    """
+    e = load(Election, job.election_id, TALLY)
+    checkpoint = job.checkpoint or dict(question_ids=list())
+    if "files" in checkpoint:
+        # a job checkpointed when the BLT text was kept in it
+        checkpoint = dict(question_ids=[f["question_id"] for f in checkpoint["files"]])
+    for q in e.questions:
+        if q.id in checkpoint["question_ids"]:
+            continue
+        checkpoint = dict(checkpoint, question_ids=checkpoint["question_ids"] + [q.id])
+        save(job, len(checkpoint["question_ids"]), checkpoint, len(e.questions), dry_run)
+    return [dict(question_id=q.id, name=q.name, blt=f"question/{q.id}/blt") for q in e.questions]
+
+
+def search(id_: int, dry_run: bool = False):  # noqa: E501
+    """election_id_export_get
+
+    Queues exporting every question of a closed election in BLT format # noqa: E501
+
+    :param id_: ID of pet to fetch
+    :param dry_run: Validate but don&#39;t actually do it
+    """
+    e = load(Election, id_, TALLY)
+    if not e:
+        return {'code': 404, 'message': "Election ID Not Found"}, 404
+    elif not e.closed:
+        return {'code': 418, 'message': "This election is still open. Close it before exporting."}, 418
+    return submit("export", e.id, dry_run=dry_run)
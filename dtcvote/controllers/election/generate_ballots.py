@@ -1,108 +1,143 @@
-import random
-import subprocess
 from datetime import datetime
-from typing import Text
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Text, Tuple
+from uuid import uuid4
 
-#from dtcvote.ballot import PlaintextBallot
-from dill import dump, dumps, load, loads
+from dill import dumps
 from dtcvote.controllers.election import generate_manifest
-from dtcvote.crypto.electionguard import (ElectionGuardBallot,
-                                          ElectionGuardElection)
-from dtcvote.database import (commit_or_rollback, db_exec, db_flush,
-                              db_get_by_id, db_insert)
-from dtcvote.models.orm import Ballot, Election
+from dtcvote.crypto.electionguard import ElectionGuardElection, election_cache, load_election
+from dtcvote.database import db_exec, db_flush, db_insert_returning
+from dtcvote.jobs import JobFailed, save, submit
+from dtcvote.mail import VOTE, election_email
+from dtcvote.models.loading import BALLOT_TEMPLATE, load
+from dtcvote.models.orm import (Ballot, BallotCast, BallotTemplate, Election, ElectionTally, ElectionVoter,
+                                EncryptedBallot, Job, OutboundEmail, Voter)
+from dtcvote.phrases import random_phrases
+from dtcvote.shuffle import new_seed
 from electionguard.group import rand_q
 from flask import current_app
-from sqlalchemy import (TIMESTAMP, Column, ForeignKey, Identity, MetaData,
-                        UniqueConstraint, create_engine)
-from sqlalchemy import delete as sql_delete
-from sqlalchemy import inspect, select, text, update
+from sqlalchemy import select, text
 
-# TODO: Send emails to voters
-
-def random_words(number_of_voters: int):
-    number_of_words = number_of_voters * 2
-    counter = range(0, number_of_voters)
-    words = subprocess.check_output(('shuf', '-n', str(number_of_words), '/usr/share/dict/words'), text=True).splitlines()
-    return [f"{words.pop()} {words.pop()}" for i in counter]
 
+def taken_phrases(e: Election) -> Set[Text]:
+    """
+    The secret phrases already issued for the election.
+    """
+    stmt = select(Ballot.secret_phrase).where(Ballot.election_id == e.id, Ballot.secret_phrase.isnot(None))
+    return set(db_exec(stmt).scalars())
 
-def search(id_: int, dry_run: bool = False) -> Text:
-    """election_id_generate_ballots_get
 
-    Creates ballot blanks unique to each voter in a given election. # noqa: E501
+def random_words(number_of_voters: int, taken: Set[Text]) -> List[Text]:
+    """
+    Draw one secret phrase per voter, unique within the election, whose
+    issued phrases are `taken`. The new phrases are added to `taken`, so
+    one set, read once, serves every chunk of a job.
+    """
+    return random_phrases(number_of_voters, taken=taken)
 
-    :param id_: ID of pet to fetch
-    :param dry_run: Validate but don&#39;t actually do it
 
+def generate_ballot_rows(e: Election, template: BallotTemplate, voters: Sequence[Voter], secret_phrases: List[Text],
+                         chunk_size: int) -> Iterator[Tuple[Voter, int, Text, Text]]:
     """
-    e = db_get_by_id(Election, id_)
-
-    if e:
-        if e.opened:
-            only_new = True
-        else:
-            e.opened = text("CURRENT_TIMESTAMP")
-            only_new = False
-            db_flush()
-        manifest = e.manifest if e.manifest else generate_manifest(e)
-        voters = e.voters_for_election(only_new=only_new)
-
+    Insert one ballot per voter in chunks of multi-row INSERT ... RETURNING
+    statements and yield (voter, ballot id, ballot uuid, secret phrase) for each.
+    Each ballot refers to the shared `template` and gets its own shuffle seed.
+    """
+    for start in range(0, len(voters), chunk_size):
+        chunk = voters[start:start + chunk_size]
+        rows = [dict(election_id=e.id,
+                     secret_phrase=secret_phrases.pop(),
+                     template_id=template.id,
+                     shuffle_seed=new_seed())
+                for v in chunk]
+        inserted = db_insert_returning(Ballot, rows, (Ballot.secret_phrase, Ballot.id, Ballot.uuid))
+        ballots = {r.secret_phrase: r for r in inserted}
+        for v, row in zip(chunk, rows):
+            b = ballots[row["secret_phrase"]]
+            yield v, b.id, b.uuid, row["secret_phrase"]
+
+
+def open_election(e: Election) -> Optional[datetime]:
+    """
+    Open the election if it isn't yet and, the first time, run its key
+    ceremony and pickle it. Returns when it had already been opened, so only
+    voters added since then get ballots.
+    """
+    since = e.opened
+    if not e.opened:
+        e.opened = text("CURRENT_TIMESTAMP")
+        db_flush()
+        BallotCast.add_partition(e.id)
+    if e.pickle_jar is not None:
+        # its encrypted ballots and running tally are under the stored key, so keep it
+        load_election(e)
+        return since
+    if (db_exec(select(EncryptedBallot.object_id).where(EncryptedBallot.election_id == e.id).limit(1)).first()
+            or db_exec(select(ElectionTally.election_id).where(ElectionTally.election_id == e.id)).first()):
+        raise JobFailed("This election has encrypted ballots but no stored key; refusing to generate a new one.")
+    manifest = e.manifest if e.manifest else generate_manifest(e)
+    secret_number = e.secret_number if e.secret_number else rand_q()
+    if not e.uuid:
+        e.uuid = str(uuid4())
+    e_eg = ElectionGuardElection(manifest, e.uuid, secret_number, e.id)
+
+    # persist
+    e.manifest = manifest
+    e.pickle_jar = dumps(e_eg)
+    e.pickle_version = (e.pickle_version or 0) + 1
+    election_cache.invalidate(e.uuid)
+    return since
+
+
+def generate(job: Job, dry_run: bool = False) -> Text:
+    """
+    Job handler: open the election, then create one ballot per voter a chunk
+    at a time, committing each chunk with the id of its last voter.
+    """
+    e = load(Election, job.election_id, BALLOT_TEMPLATE)
+    checkpoint = job.checkpoint
+    if checkpoint is None:
+        since = open_election(e)
+        checkpoint = dict(since=since.isoformat() if since else None, after_voter_id=0)
+        save(job, 0, checkpoint, e.count_voters(since), dry_run)
+    since = datetime.fromisoformat(checkpoint["since"]) if checkpoint["since"] else None
+
+    chunk_size = current_app.config.get("BALLOT_CHUNK_SIZE", 1000)
+    template = BallotTemplate.for_election(e)
+    created = resumed = job.progress
+    taken = taken_phrases(e)
+    started = perf_counter()
+    while True:
+        voters = e.voters_page(since, checkpoint["after_voter_id"], chunk_size)
         if not voters:
-            return {'code': 404, 'message': f"No voters to generate ballots for"}, 404
-
-        secret_number = e.secret_number if e.secret_number else rand_q()
-
-        # generate the ballots
-        secret_phrases = random_words(len(voters))
-        emails = list()
-        for v in voters:
-            # update the manifest for each voter
-            # if e.secret_ballot:
-            #     manifest["geopolitical_units"].append(
-            #         {
-            #             "object_id": str(v.uuid),
-            #             "name": v.name,
-            #             "type": "polling-place"})
-            #     manifest["ballot-styles"][0]["geopolitical_unit_ids"].append(str(v.uuid))
-
-            # Create ballot
-            ballot_content = e.dict_from_colset()
-            for q in ballot_content.get("questions"):
-                # randomize candidate order
-                if q.get("randomize_candidates") == True:
-                    random.shuffle(q["candidates"])
-            b = Ballot(election_id=e.id, secret_phrase=secret_phrases.pop(), ballot_content=dumps(ballot_content))
-            b = db_insert([b])[0]
-
-            # send email with link to ballot and secret phrase
-            add_message = f"""\n\nTo vote in this election, click this link: {current_app.config.get("GUI_URL") + '/vote/' + str(b.uuid)}
-
-            Before voting, verify that the secret phrase displayed on the screen is "{b.secret_phrase}."
-
-            If the phrase does not match or you have trouble voting, contact your election administrator.
-            """
-            emails.append(
-                dict(email_body=e.vote_email + add_message,
-                    email_to = v.email,
-                    email_from = current_app.config.get("EMAIL_FROM")
-                )
-            )
-
-
-
-        e_eg = ElectionGuardElection(manifest, e.uuid, secret_number)
-
-
-        # persist
-        e.manifest = manifest
-        e.pickle_jar = dumps(e_eg)
-        # send emails here
-        current_app.logger.warning(emails)
+            break
+        secret_phrases = random_words(len(voters), taken)
+        rows = list(generate_ballot_rows(e, template, voters, secret_phrases, chunk_size))
+        ElectionVoter.attach_ballots(e.id, [v.id for v, *_ in rows], [ballot_id for _, ballot_id, *_ in rows])
+        # queued with the chunk, so a resumed job neither skips nor repeats emails
+        OutboundEmail.enqueue([election_email(e, VOTE, v.email, uuid, secret_phrase)
+                               for v, _, uuid, secret_phrase in rows])
+        checkpoint = dict(checkpoint, after_voter_id=voters[-1].id)
+        created += len(voters)
+        save(job, created, checkpoint, dry_run=dry_run)
+    elapsed = perf_counter() - started
+    rate = (created - resumed) / elapsed if elapsed > 0 else 0.0
+    current_app.logger.info(f"Generated {created} ballots for election {e.id} at {rate:.0f} rows/sec")
+    return f'{created} ballots created ({rate:.0f} rows/sec)'
+
+
+def search(id_: int, dry_run: bool = False) -> Tuple[Dict, int]:
+    """election_id_generate_ballots_get
 
-        commit_or_rollback(dry_run)
+    Queues creating ballot blanks unique to each voter in a given election. # noqa: E501
 
-    else:
-        return {'code': 404, 'message': f"Election ID Not Found"}, 404
+    :param id_: ID of pet to fetch
+    :param dry_run: Validate but don&#39;t actually do it
 
-    return 'Ballots created'
+    """
+    e = load(Election, id_, BALLOT_TEMPLATE)
+    if not e:
+        return {'code': 404, 'message': "Election ID Not Found"}, 404
+    if not e.count_voters(e.opened):
+        return {'code': 404, 'message': "No voters to generate ballots for"}, 404
+    return submit("generate-ballots", e.id, dry_run=dry_run)
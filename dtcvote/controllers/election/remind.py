@@ -0,0 +1,46 @@
+from typing import Text
+
+from dtcvote.database import db_get_by_id
+from dtcvote.jobs import JobFailed, save, submit
+from dtcvote.mail import NOT_VOTED, VOTED, election_email
+from dtcvote.models.orm import Election, ElectionVoter, Job, OutboundEmail
+from flask import current_app
+
+
+def remind(job: Job, dry_run: bool = False) -> Text:
+    """
+    Job handler: queue the voted_email or not_voted_email to every voter who
+    has or hasn't voted, a chunk of voters at a time.
+    """
+    e = db_get_by_id(Election, job.election_id)
+    kind = job.params["which"]
+    if e.closed:
+        raise JobFailed("This election is closed.")
+    chunk_size = current_app.config.get("BALLOT_CHUNK_SIZE", 1000)
+    checkpoint = job.checkpoint or dict(after_voter_id=0)
+    queued = job.progress
+    while True:
+        voters = ElectionVoter.reminder_page(e.id, kind == VOTED, checkpoint["after_voter_id"], chunk_size)
+        if not voters:
+            break
+        queued += OutboundEmail.enqueue([election_email(e, kind, v.email, v.uuid, v.secret_phrase) for v in voters])
+        checkpoint = dict(checkpoint, after_voter_id=voters[-1].id)
+        save(job, queued, checkpoint, dry_run=dry_run)
+    return f"{queued} emails queued"
+
+
+def search(id_: int, which: Text = NOT_VOTED, dry_run: bool = False):  # noqa: E501
+    """election_id_remind_get
+
+    Queues the voted or not voted email to every voter it applies to # noqa: E501
+
+    :param id_: ID of pet to fetch
+    :param which: voted or not_voted
+    :param dry_run: Validate but don&#39;t actually do it
+    """
+    e = db_get_by_id(Election, id_)
+    if not e:
+        return {'code': 404, 'message': "Election ID Not Found"}, 404
+    elif not e.opened or e.closed:
+        return {'code': 418, 'message': "Reminders can only be sent while the election is open."}, 418
+    return submit("remind", e.id, dict(which=which), dry_run)
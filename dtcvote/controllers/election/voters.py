@@ -1,8 +1,6 @@
-from typing import Iterable, List, Tuple, Union
-
 import connexion
-from dtcvote.database import (commit_or_rollback, db_exec, db_get_by_id,
-                              db_insert)
+from dtcvote.database import commit_or_rollback, db_exec, db_insert
+from dtcvote.models.loading import LISTING, load
 from dtcvote.models.orm import Election, ElectionVoter
 from sqlalchemy import delete as sql_delete
 from sqlalchemy.exc import IntegrityError
@@ -15,7 +13,7 @@ def search(id_: int):  # noqa: E501
 
     :param id_: ID of pet to fetch
     """
-    e = db_get_by_id(Election, id_)
+    e = load(Election, id_, LISTING)
     if not e:
         return {'code': 404, 'message': "Election ID Not Found"}, 404
     else:
@@ -32,13 +30,13 @@ def delete(id_: int, dry_run=False):
     :param dry_run: Validate but don&#39;t actually do it
 
     """
-    e = db_get_by_id(Election, id_)
+    e = load(Election, id_, LISTING)
     if not e:
         return {'code': 404, 'message': "Election ID Not Found"}, 404
     elif e.opened:
         return {'code': 418, 'message': "This election has been opened. It is too late to remove voters."}, 418
     else:
-        stmt = sql_delete(ElectionVoter).where(ElectionVoter.election_id==id_)
+        stmt = sql_delete(ElectionVoter).where(ElectionVoter.election_id == id_)
         db_exec(stmt)
         commit_or_rollback(dry_run)
         return None
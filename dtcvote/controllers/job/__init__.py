@@ -0,0 +1,4 @@
+from dtcvote.controllers import _get
+from dtcvote.models.orm import Job
+
+get = _get(Job)
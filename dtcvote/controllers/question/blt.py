@@ -1,5 +1,6 @@
-from dtcvote.database import db_get_by_id
+from dtcvote.models.loading import TALLY, load
 from dtcvote.models.orm import Question
+from flask import Response, current_app, stream_with_context
 
 
 def search(id_):  # noqa: E501
@@ -11,5 +12,8 @@ def search(id_):  # noqa: E501
 
     :rtype: str
     """
-    q = db_get_by_id(Question, id_)
-    return q.blt()
+    q = load(Question, id_, TALLY)
+    if not q:
+        return {'code': 404, 'message': "Question ID Not Found"}, 404
+    batch_size = current_app.config.get("BLT_BATCH_SIZE", 1000)
+    return Response(stream_with_context(q.iter_blt(batch_size)), mimetype="text/plain")
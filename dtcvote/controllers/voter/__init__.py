@@ -1,8 +1,24 @@
+import connexion
 from dtcvote.models.orm import Voter
-from dtcvote.controllers import _search, _post, _get, _delete
+from dtcvote.controllers import _search, _get, _delete
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
 
 
 search = _search(Voter)
-post = _post(Voter)
 get = _get(Voter)
 delete = _delete(Voter)
+
+
+def post(dry_run: bool = False):  # noqa: E501
+    """voter_post
+
+    Creates new voters. Emails are unique regardless of case. # noqa: E501
+
+    :param dry_run: Validate but don&#39;t actually do it
+    """
+    try:
+        return Voter.post(connexion.request.get_json(), dry_run), 201
+    except IntegrityError:
+        current_app.db_session.rollback()
+        return {'code': 409, 'message': "A voter with that email already exists"}, 409
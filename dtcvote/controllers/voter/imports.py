@@ -0,0 +1,31 @@
+from io import BytesIO
+from typing import Dict, Tuple
+
+import connexion
+from dtcvote.database import commit_or_rollback, db_get_by_id
+from dtcvote.models.orm import Election
+from dtcvote.voter_import import CSV, NDJSON, import_voters
+
+FORMATS = {"text/csv": CSV, "application/x-ndjson": NDJSON}
+
+
+def post(election_id: int = None, dry_run: bool = False) -> Tuple[Dict, int]:
+    """voter_import_post
+
+    Bulk-load voters from CSV or NDJSON, upserting by email # noqa: E501
+
+    :param election_id: Election to add every imported voter to
+    :param dry_run: Validate but don&#39;t actually do it
+    """
+    if election_id is not None and not db_get_by_id(Election, election_id):
+        return {'code': 404, 'message': "Election ID Not Found"}, 404
+    fmt = FORMATS.get(connexion.request.mimetype)
+    if fmt is None:
+        return {'code': 415, 'message': "Send text/csv or application/x-ndjson"}, 415
+    # connexion has already read the body, so stream it from memory
+    try:
+        response = import_voters(BytesIO(connexion.request.get_data()), fmt, election_id)
+    except ValueError as err:
+        return {'code': 400, 'message': str(err)}, 400
+    commit_or_rollback(dry_run)
+    return response, 200
@@ -0,0 +1,94 @@
+"""
+Encrypt many ballots for one election across a process pool.
+
+Each worker unpickles the election once, in the pool initializer, and then
+reuses its EncryptionMediator, context and fixed-base tables for every
+ballot it is handed. Ballots travel to the workers in chunks and come back
+as CiphertextBallots in the order they were given, ready for
+`submit_ballot`.
+
+An EncryptionMediator chains each ballot's code into the seed of the next,
+so with a pool each worker's ballots form their own chain.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import cpu_count, get_all_start_methods, get_context
+from typing import Iterable, Iterator, List, Optional
+
+from dill import dumps, loads
+from electionguard.ballot import CiphertextBallot, PlaintextBallot
+
+from dtcvote.config import ENCRYPT_CHUNK_SIZE
+
+_election = None
+
+
+def _init(pickled: bytes) -> None:
+    global _election
+    _election = loads(pickled)
+
+
+def _encrypt_chunk(chunk: List[PlaintextBallot]) -> List[Optional[CiphertextBallot]]:
+    return [_election.encrypter.encrypt(ballot) for ballot in chunk]
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BatchEncrypter(object):
+    """
+    A pool of worker processes, each holding a copy of one election.
+
+        with BatchEncrypter(e_eg) as encrypter:
+            for ciphertext in encrypter.encrypt(plaintexts):
+                submit_ballot(e_eg, ciphertext)
+
+    Attrs:
+        workers: Number of worker processes.
+        chunk_size: Ballots sent to a worker at a time.
+    """
+
+    def __init__(self, election, workers: Optional[int] = None, chunk_size: int = ENCRYPT_CHUNK_SIZE):
+        self.workers = workers or cpu_count() or 1
+        self.chunk_size = chunk_size
+        # the store stays behind, as encryption never touches it. `election` may be
+        # the instance shared through election_cache, so pickle a shallow copy
+        # rather than taking the store off it while other requests use it
+        detached = object.__new__(type(election))
+        detached.__dict__.update(election.__dict__, store=None)
+        pickled = dumps(detached)
+        ctx = get_context("fork" if "fork" in get_all_start_methods() else None)
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_init, initargs=(pickled,))
+
+    def encrypt(self, ballots: Iterable[PlaintextBallot]) -> Iterator[Optional[CiphertextBallot]]:
+        """
+        Encrypt `ballots`, yielding a CiphertextBallot (or None, for a ballot
+        that is not valid for the election) per ballot, in order.
+        """
+        for chunk in self.pool.map(_encrypt_chunk, _chunks(ballots, self.chunk_size)):
+            yield from chunk
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+    def __enter__(self) -> "BatchEncrypter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def encrypt_ballots(
+    election, ballots: Iterable[PlaintextBallot], workers: Optional[int] = None, chunk_size: int = ENCRYPT_CHUNK_SIZE
+) -> List[Optional[CiphertextBallot]]:
+    """
+    Encrypt a batch of ballots for `election` with a short-lived BatchEncrypter.
+    """
+    with BatchEncrypter(election, workers, chunk_size) as encrypter:
+        return list(encrypter.encrypt(ballots))
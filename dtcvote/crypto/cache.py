@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class LRUCache(object):
+    """
+    A bounded, thread-safe least-recently-used cache with hit, miss and
+    eviction counters.
+
+    Keys are (id, version) pairs. Loading a newer version of an id drops the
+    older ones, and `invalidate` drops every version of an id.
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Tuple[Hashable, Hashable], Any]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Tuple[Hashable, Hashable], loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for `key`, calling `loader` to build it on a miss.
+        The loader runs outside the lock, so a slow load does not block hits.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+        value = loader()
+        with self._lock:
+            for stale in [k for k in self._data if k[0] == key[0] and k != key]:
+                del self._data[stale]
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, id_: Hashable) -> None:
+        with self._lock:
+            for k in [k for k in self._data if k[0] == id_]:
+                del self._data[k]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(size=len(self._data), maxsize=self.maxsize,
+                        hits=self.hits, misses=self.misses, evictions=self.evictions)
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,137 @@
+"""
+A persistent discrete-log table for decrypting tallies.
+
+electionguard's `discrete_log` walks g^0, g^1, ... until it reaches the
+element, caching as it goes, and every tally process starts that walk from
+scratch. Here the walk is done once, up to the largest count an election
+can produce, and written to a file of sorted 64-bit fingerprints of g^m
+alongside their exponents. The file is memory-mapped, so every worker shares
+the same pages, and a lookup is a binary search plus one check that
+g^m really is the element.
+
+Layout: b"DLOG", uint32 version, uint64 count, uint64 fingerprints[count]
+(sorted), uint32 exponents[count].
+"""
+import os
+import struct
+from importlib import import_module
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+from gmpy2 import mpz
+from electionguard import dlog
+from electionguard.group import G, P, ElementModP
+
+from dtcvote.config import DLOG_TABLE_PATH, DLOG_TABLE_SIZE
+
+MAGIC = b"DLOG"
+VERSION = 1
+HEADER = struct.Struct("<4sIQ")
+FINGERPRINT_MASK = (1 << 64) - 1
+
+# modules that imported discrete_log by name
+PATCHED_MODULES = ("electionguard.elgamal", "electionguard.decrypt_with_shares")
+
+
+def fingerprint(x: int) -> int:
+    return int(x) & FINGERPRINT_MASK
+
+
+class DlogTable(object):
+    """
+    A read-only, memory-mapped table of log_g(x) for x = g^0 .. g^(count-1).
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            magic, version, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} discrete-log table")
+        self.path = path
+        self.count = count
+        self.fingerprints = np.memmap(path, dtype="<u8", mode="r", offset=HEADER.size, shape=(count,))
+        self.exponents = np.memmap(path, dtype="<u4", mode="r", offset=HEADER.size + 8 * count, shape=(count,))
+
+    @classmethod
+    def build(cls, path: str, count: int) -> "DlogTable":
+        """
+        Compute g^0 .. g^(count-1) and write the table to `path`. The file is
+        written beside it and renamed into place, so concurrent builders and
+        readers never see a partial table.
+        """
+        g, p = mpz(G), mpz(P)
+        fingerprints = np.empty(count, dtype="<u8")
+        x = mpz(1)
+        for m in range(count):
+            fingerprints[m] = fingerprint(x)
+            x = x * g % p
+        order = np.argsort(fingerprints, kind="stable")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with NamedTemporaryFile(dir=directory, delete=False) as f:
+            f.write(HEADER.pack(MAGIC, VERSION, count))
+            f.write(fingerprints[order].tobytes())
+            f.write(order.astype("<u4").tobytes())
+        os.replace(f.name, path)
+        return cls(path)
+
+    def lookup(self, x: int) -> Optional[int]:
+        """
+        log_g(x) if it is in the table, otherwise None.
+        """
+        fp = fingerprint(x)
+        i = int(np.searchsorted(self.fingerprints, fp))
+        while i < self.count and int(self.fingerprints[i]) == fp:
+            m = int(self.exponents[i])
+            if pow(mpz(G), m, mpz(P)) == x:
+                return m
+            i += 1
+        return None
+
+
+_table: Optional[DlogTable] = None
+_original_discrete_log = dlog.discrete_log
+_lock = Lock()
+
+
+def discrete_log(e: ElementModP) -> int:
+    """
+    Drop-in replacement for electionguard.dlog.discrete_log that consults
+    the table first and falls back to the linear search past its end.
+    """
+    if _table is not None:
+        m = _table.lookup(e.elem)
+        if m is not None:
+            return m
+    return _original_discrete_log(e)
+
+
+def use_dlog_table(max_exponent: int, path: str = DLOG_TABLE_PATH) -> DlogTable:
+    """
+    Make sure a table covering 0..max_exponent is mapped in this process,
+    opening the file at `path` or (re)building it when it is missing or too
+    small. Tables cover at least DLOG_TABLE_SIZE exponents so that small
+    elections share one file. Also routes electionguard's discrete_log through it.
+    """
+    global _table
+    with _lock:
+        if _table is None or _table.count <= max_exponent:
+            table = None
+            if os.path.exists(path):
+                try:
+                    table = DlogTable(path)
+                except ValueError:
+                    table = None
+            if table is None or table.count <= max_exponent:
+                table = DlogTable.build(path, max(max_exponent + 1, DLOG_TABLE_SIZE))
+            _table = table
+            for name in PATCHED_MODULES:
+                try:
+                    module = import_module(name)
+                except ImportError:
+                    continue
+                if hasattr(module, "discrete_log"):
+                    module.discrete_log = discrete_log
+        return _table
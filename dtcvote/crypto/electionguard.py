@@ -1,12 +1,11 @@
-import os
-from typing import Dict, List, Text
+from threading import RLock
+from typing import Dict, List, Optional, Set, Text
 from uuid import UUID, getnode
-from flask import current_app
-from gmpy2 import mpz, mpz_rrandomb, random_state
 from json import dumps
 from electionguard.ballot import (BallotBoxState, CiphertextBallot, PlaintextBallotSelection,
                                   PlaintextBallot, SubmittedBallot, PlaintextBallotContest)
 from electionguard.ballot_box import accept_ballot
+from electionguard.ballot_validator import ballot_is_valid_for_election
 from electionguard.data_store import DataStore
 from electionguard.election import CiphertextElectionContext
 from electionguard.election_builder import ElectionBuilder
@@ -17,24 +16,40 @@ from electionguard.manifest import InternalManifest, Manifest
 from electionguard.tally import CiphertextTally, tally_ballots
 from electionguard.key_ceremony import CeremonyDetails
 from electionguard.key_ceremony_mediator import Guardian, KeyCeremonyMediator
+import dill
+from dill import loads
+from dtcvote.config import ELECTION_CACHE_SIZE, TALLY_WORKERS, VERIFY_WORKERS
+from dtcvote.crypto.cache import LRUCache
+from dtcvote.crypto.dlog import use_dlog_table
+from dtcvote.crypto.encoding import COMPACT, manifest_encoding, plaintext_votes
+from dtcvote.crypto.nonces import use_nonce_pool
+from dtcvote.crypto.precompute import use_fixed_base
+from dtcvote.crypto.store import DatabaseStore
+from dtcvote.models.orm import ElectionTally, EncryptedBallot
+from dtcvote.crypto.tally import TallyAccumulator, parallel_count
+from dtcvote.crypto.verify import VerificationReport, verify_ballots
+
+# live ElectionGuardElection instances, keyed by (election uuid, pickle_version)
+election_cache = LRUCache(ELECTION_CACHE_SIZE)
 
 
 def key_ceremony():
     # Setup Guardians
-    guardian = Guardian(f"Admin", 1, 1, 1)
+    guardian = Guardian("Admin", 1, 1, 1)
 
     mediator = KeyCeremonyMediator(CeremonyDetails(number_of_guardians=1, quorum=1))
 
     # Attendance (Public Key Share)
     mediator.announce(guardian)
     # Orchestation (Private Key Share)
-    orchestrated = mediator.orchestrate()
+    mediator.orchestrate()
     # Verify (Prove the guardians acted in good faith)
-    verified = mediator.verify()
+    mediator.verify()
     # Publish the Joint Public Key
     joint_public_key = mediator.publish_joint_key()
     return joint_public_key
 
+
 class ElectionGuardElection:
     internal_manifest: InternalManifest
     context: CiphertextElectionContext
@@ -44,8 +59,11 @@ class ElectionGuardElection:
     device: EncryptionDevice
     encrypter: EncryptionMediator
     store: DataStore
+    accumulator: TallyAccumulator
+    encodings: Dict[Text, Text]
+    selection_ids: Dict[Text, Set[Text]]
 
-    def __init__(self, manifest: Dict, uuid: UUID, secret_number: ElementModQ):
+    def __init__(self, manifest: Dict, uuid: UUID, secret_number: ElementModQ, election_id: Optional[int] = None):
         # Open an election manifest
         election_description = Manifest.from_json(dumps(manifest))
 
@@ -77,18 +95,190 @@ class ElectionGuardElection:
         self.encrypter = EncryptionMediator(
             self.internal_manifest, self.context, self.device
         )
-        self.store = DataStore()
+        # with an election id, accepted ballots go to the database instead of the pickle_jar
+        self.store = DataStore() if election_id is None else DatabaseStore(election_id)
+        self.accumulator = TallyAccumulator.for_manifest(self.internal_manifest)
+        # serializes casts into this instance, which election_cache shares between requests
+        self.lock = RLock()
+        self.precompute()
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        state.pop("lock", None)
+        return state
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self.lock = RLock()
+        if "accumulator" not in state:
+            # pickled before the running tally existed; fold in what is already in the store
+            self.accumulator = TallyAccumulator.for_manifest(self.internal_manifest)
+            for ballot in self.store.values():
+                self.accumulator.add(ballot)
+        self.precompute()
+
+    def precompute(self):
+        # fixed-base tables for g and this election's public key, used by every encryption and proof
+        use_fixed_base(self.context.elgamal_public_key)
+        # {contest object_id: encoding}, fixed by the manifest rather than the algorithm rows
+        self.encodings = {c.object_id: manifest_encoding(c) for c in self.internal_manifest.contests}
+        self.selection_ids = {c.object_id: {s.object_id for s in c.ballot_selections}
+                              for c in self.internal_manifest.contests}
 
-    def count_encrypted_ballots(self, secret_key: ElementModQ) -> Dict[str, int]:
+    def checkpoint(self, election_id: int, ballot_cast_id: Optional[int] = None):
+        """
+        Persist the running tally, noting the last BallotCast folded into it.
+        """
+        ElectionTally.save(election_id, self.accumulator.to_bytes(), self.accumulator.ballots, ballot_cast_id)
+
+    def restore(self, election_id: int) -> Optional[int]:
+        """
+        Replace the running tally with the election's last checkpoint, if any,
+        and return the BallotCast id to resume from.
+        """
+        row = ElectionTally.load(election_id)
+        if row is None:
+            return None
+        with self.lock:
+            self.accumulator = TallyAccumulator.from_bytes(row.accumulator)
+        return row.ballot_cast_id
+
+    def countable_selections(self) -> List[Text]:
+        """
+        The selections whose encrypted sums are vote counts: those of every
+        contest but the compact ones, whose bits sum to nothing meaningful.
+        """
+        return [s.object_id for c in self.internal_manifest.contests if self.encodings[c.object_id] != COMPACT
+                for s in c.ballot_selections]
+
+    def count_encrypted_ballots(
+        self, secret_key: ElementModQ, workers: int = TALLY_WORKERS, recount: bool = False
+    ) -> Dict[str, int]:
+        """
+        Decrypt the running tally. With `recount`, re-tally every ballot in the
+        store instead, e.g. to check the running tally. Compact contests are
+        left out (see dtcvote.crypto.encoding); they are counted from the
+        plaintext ballot_vote rows only.
+        """
+        countable = self.countable_selections()
+        if not recount:
+            if isinstance(self.store, DatabaseStore):
+                # other processes may have cast since this instance was loaded
+                self.restore(self.store.election_id)
+            return self.accumulator.decrypt(secret_key, workers, countable)
+        if isinstance(self.store, DatabaseStore):
+            # stream the ballots through a fresh accumulator, so memory stays bounded
+            accumulator = TallyAccumulator.for_manifest(self.internal_manifest)
+            for ballot in self.store.values():
+                if ballot_is_valid_for_election(ballot, self.internal_manifest, self.context):
+                    accumulator.add(ballot)
+            return accumulator.decrypt(secret_key, workers, countable)
+        if workers != 1:
+            return parallel_count(self.store.values(), self.internal_manifest, self.context, secret_key,
+                                  workers or None, countable)
+        use_dlog_table(len(self.store))
         tally = tally_ballots(self.store, self.internal_manifest, self.context)
         assert tally is not None
         plaintext_selections: Dict[str, int] = {}
-        for _, contest in tally.contests.items():
+        for contest_id, contest in tally.contests.items():
+            if self.encodings[contest_id] == COMPACT:
+                continue
             for object_id, selection in contest.selections.items():
                 plaintext_tally = selection.ciphertext.decrypt(secret_key)
                 plaintext_selections[object_id] = plaintext_tally
         return plaintext_selections
 
+    def verify(self, workers: Optional[int] = VERIFY_WORKERS) -> VerificationReport:
+        """
+        Check the proofs of every ballot in the store across a process pool.
+        """
+        if isinstance(self.store, DatabaseStore):
+            # the pickled rows go straight to the workers, unopened
+            rows = EncryptedBallot.stream(self.store.election_id, batch_size=self.store.batch_size)
+        else:
+            rows = ((object_id, dill.dumps(ballot)) for object_id, ballot in self.store.items())
+        return verify_ballots(rows, self.internal_manifest, self.context, workers or None)
+
+
+def load_election(e) -> ElectionGuardElection:
+    """
+    Return the live ElectionGuardElection for an Election row.
+    The deferred pickle_jar is only fetched and unpickled on a cache miss,
+    and then picks up the running tally from its last checkpoint.
+    """
+    def loader() -> ElectionGuardElection:
+        election = loads(e.pickle_jar)
+        if isinstance(election.store, DatabaseStore):
+            election.restore(election.store.election_id)
+        return election
+
+    return election_cache.get((e.uuid, e.pickle_version), loader)
+
+
+def ballot_request(e, votes: List[Dict], election: ElectionGuardElection) -> Dict[Text, Dict[Text, int]]:
+    """
+    The 0/1 value of every selection, per contest, for one voter's `votes`
+    ({question_seq, candidate_seq, rank} dicts) in Election `e`, encoded as
+    `election`'s manifest has each contest.
+    """
+    request = dict()
+    for q in e.questions:
+        contest_id = str(q.id)
+        values = plaintext_votes(q, votes, election.encodings[contest_id])
+        # only the manifest's selections, e.g. no rank n on a manifest generated without it
+        request[contest_id] = {s: v for s, v in values.items() if s in election.selection_ids[contest_id]}
+    return request
+
+
+def plaintext_contests(request: Dict[Text, Dict[Text, int]]) -> List[PlaintextBallotContest]:
+    return [PlaintextBallotContest(contest_id, [PlaintextBallotSelection(selection_id, vote)
+                                                for selection_id, vote in selections.items()])
+            for contest_id, selections in request.items()]
+
+
+def plaintext_ballot(e, object_id: Text, votes: List[Dict], election: ElectionGuardElection) -> PlaintextBallot:
+    """
+    A PlaintextBallot for one voter's `votes` in Election `e`, whose
+    ElectionGuard election is `election`, e.g. for dtcvote.crypto.batch.
+    """
+    return PlaintextBallot(object_id, f"{e.name}-ballot-style", plaintext_contests(ballot_request(e, votes, election)))
+
+
+def submit_ballot(election: ElectionGuardElection, encrypted_ballot: CiphertextBallot) -> Optional[SubmittedBallot]:
+    """
+    Cast an encrypted ballot into the election's ballot box and running tally.
+    A re-vote, with the same object_id, replaces the voter's earlier ballot.
+
+    With a DatabaseStore the running tally is the election's ElectionTally
+    row: it is locked and read before the ballot is folded in and saved
+    again after, in the caller's transaction, so casts from any process are
+    applied one at a time and none is lost.
+    """
+    with election.lock:
+        persistent = isinstance(election.store, DatabaseStore)
+        if persistent:
+            row = ElectionTally.lock(election.store.election_id, election.accumulator.to_bytes(),
+                                     election.accumulator.ballots)
+            election.accumulator = TallyAccumulator.from_bytes(row.accumulator)
+        superseded = election.store.pop(encrypted_ballot.object_id)
+        submitted_ballot = accept_ballot(
+            encrypted_ballot,
+            BallotBoxState.CAST,
+            election.internal_manifest,
+            election.context,
+            election.store,
+        )
+        if submitted_ballot is None:
+            if superseded is not None:
+                election.store.set(superseded.object_id, superseded)
+            return None
+        if superseded is not None:
+            election.accumulator.remove(superseded)
+        election.accumulator.add(submitted_ballot)
+        if persistent:
+            election.checkpoint(election.store.election_id)
+        return submitted_ballot
+
 
 class ElectionGuardBallot(PlaintextBallot):
     statuses = {}
@@ -100,22 +290,15 @@ class ElectionGuardBallot(PlaintextBallot):
         ballot_request: Dict,
         election: ElectionGuardElection,
     ):
-        super().__init__()
-
-        # for k, v in ballot_request.items():
-            # PlaintextBallotSelection()
-            # this_contest = PlaintextBallotContest(contest_id, [PlaintextBallotSelection(selection_id, vote_1_or_0) for blah in blech])
-
-        # self.encrypted_ballot = election.encrypter.encrypt(self.ballot)
-
-
+        """
+        :param ballot_request: {contest object_id: {selection object_id: 0 or 1}},
+            as built by `ballot_request`
+        """
+        super().__init__(object_id, style_id, plaintext_contests(ballot_request))
+        # the first ballot encrypted starts this process's nonce pool; later ones draw from it
+        use_nonce_pool(election.context.elgamal_public_key)
+        self.encrypted_ballot = election.encrypter.encrypt(self)
 
     def submit(self, election):
-        self.submitted_ballot = accept_ballot(
-            self.encrypted_ballot,
-            BallotBoxState.CAST,
-            election.internal_manifest,
-            election.context,
-            election.store,
-        )
+        self.submitted_ballot = submit_ballot(election, self.encrypted_ballot)
         return self.submitted_ballot
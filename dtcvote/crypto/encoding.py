@@ -0,0 +1,143 @@
+"""
+How a question's choices map onto ElectionGuard selections.
+
+ElectionGuard selections are 0/1, each costing an encryption and a
+disjunctive proof per ballot, plus one placeholder selection per vote
+allowed. Two encodings are supported. `Algorithm.ballot_encoding` chooses
+one when the election's manifest is generated (the seeded "rcv-compact"
+algorithm is compact); after that the manifest is the record, and ballots
+are encoded the way its selection object_ids say, whatever the algorithm
+row says by then:
+
+expanded
+    One selection per candidate per rank, "{name}-rank-{n}", for ranks 1
+    to n. That is n * n selections for n candidates, but the tally of each
+    selection is directly the number of voters who gave that candidate
+    that rank. Manifests generated before rank n was included stop at
+    n - 1, and ballots for them leave it out.
+
+compact
+    For each rank, the 1-based index of the candidate given that rank
+    (0 for none) written in binary, one selection per bit,
+    "q{id}-rank-{r}-bit-{b}". That is n * bit_length(n) selections, so
+    O(n log n), not linear; the placeholders only need to cover the most
+    1-bits a valid ballot can have. Summing bits across ballots doesn't
+    count votes, so the encrypted tally leaves compact contests out
+    (ElectionGuardElection.count_encrypted_ballots). Their counts come from
+    the plaintext ballot_vote rows, and the ciphertexts serve only as a
+    record whose proofs can be checked.
+
+Plurality and majority questions always use one selection per candidate.
+ElectionGuard 1.x only has 0/1 proofs, so a single selection per rank
+carrying the candidate index would need range proofs it does not provide.
+"""
+import re
+from typing import Dict, Iterable, List, Tuple
+
+EXPANDED = "expanded"
+COMPACT = "compact"
+ENCODINGS = (EXPANDED, COMPACT)
+SINGLE_CHOICE = ("plurality", "majority")
+
+
+def is_ranked(q) -> bool:
+    return q.algorithm.name.lower() not in SINGLE_CHOICE
+
+
+def encoding(q) -> str:
+    """
+    The encoding a new manifest uses for question `q`.
+    """
+    if not is_ranked(q):
+        return EXPANDED
+    return getattr(q.algorithm, "ballot_encoding", None) or EXPANDED
+
+
+def manifest_encoding(contest) -> str:
+    """
+    The encoding a manifest contest was generated with, read off its
+    selection object_ids.
+    """
+    compact = re.compile(rf"q{re.escape(contest.object_id)}-rank-\d+-bit-\d+-selection")
+    selections = contest.ballot_selections
+    if selections and all(compact.fullmatch(s.object_id) for s in selections):
+        return COMPACT
+    return EXPANDED
+
+
+def rank_bits(candidates: int) -> int:
+    """
+    Bits per rank in the compact encoding: enough for indexes 0..candidates.
+    """
+    return candidates.bit_length()
+
+
+def compact_votes_allowed(candidates: int) -> int:
+    """
+    The most selections a valid compact ballot can set: each candidate
+    ranked at most once, so the sum of the popcounts of every index.
+    """
+    return sum(bin(i).count("1") for i in range(1, candidates + 1))
+
+
+def _candidate(candidate_id: str, name: str) -> Dict:
+    return dict(object_id=candidate_id, name={"text": [{"value": name, "language": "en"}]})
+
+
+def contest_selections(q) -> Tuple[List[Dict], List[Dict], int]:
+    """
+    The ballot_selections, manifest candidates and votes_allowed of
+    question `q`'s contest.
+    """
+    selections, candidates = list(), list()
+
+    def add(candidate_id: str, name: str) -> Dict:
+        selections.append(dict(object_id=f"{candidate_id}-selection",
+                               sequence_order=len(selections) + 1,
+                               candidate_id=candidate_id))
+        candidate = _candidate(candidate_id, name)
+        candidates.append(candidate)
+        return candidate
+
+    if encoding(q) == COMPACT:
+        n = len(q.candidates)
+        for rank in range(1, n + 1):
+            for bit in range(rank_bits(n)):
+                add(f"q{q.id}-rank-{rank}-bit-{bit}", f"{q.name} rank {rank} bit {bit}")
+        return selections, candidates, compact_votes_allowed(n)
+
+    ranked = is_ranked(q)
+    for c in q.candidates:
+        for rank in range(1, len(q.candidates) + 1) if ranked else (None,):
+            candidate = add(f"{c.name}-rank-{rank}" if ranked else c.name, c.name)
+            if c.party:
+                candidate["party_id"] = c.party.name
+    return selections, candidates, len(q.candidates) if ranked else q.number_of_winners
+
+
+def plaintext_votes(q, votes: Iterable[Dict], encoded: str) -> Dict[str, int]:
+    """
+    The 0/1 value of every selection in question `q`'s contest, which has
+    encoding `encoded`, for one voter's `votes`, which are
+    {question_seq, candidate_seq, rank} dicts.
+    """
+    chosen = {v["rank"]: v["candidate_seq"] for v in votes if v["question_seq"] == q.sequence}
+    values = dict()
+    if encoded == COMPACT:
+        n = len(q.candidates)
+        index = {c.sequence: i for i, c in enumerate(q.candidates, start=1)}
+        for rank in range(1, n + 1):
+            i = index.get(chosen.get(rank), 0)
+            for bit in range(rank_bits(n)):
+                values[f"q{q.id}-rank-{rank}-bit-{bit}-selection"] = (i >> bit) & 1
+        return values
+
+    ranked = is_ranked(q)
+    ranks = {seq: rank for rank, seq in chosen.items()}
+    for c in q.candidates:
+        if ranked:
+            for rank in range(1, len(q.candidates) + 1):
+                values[f"{c.name}-rank-{rank}-selection"] = int(ranks.get(c.sequence) == rank)
+        else:
+            values[f"{c.name}-selection"] = int(c.sequence in ranks)
+    return values
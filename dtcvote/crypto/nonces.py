@@ -0,0 +1,262 @@
+"""
+Precomputed proof randomness, so casting a ballot leaves only the
+encryption itself, g^r and K^r per selection, to exponentiate.
+
+Encrypting a 0/1 selection and proving it is 0 or 1 takes, for the
+selection nonce r and proof randomness u, w and c, the powers g^r, K^r, g^u,
+K^u, g^w, K^w and g^c. The proof's powers depend on neither the vote nor
+the ballot, so background threads compute them ahead of time into a
+`NoncePool` per election public key, and `encrypt_selection` takes one entry
+per selection.
+
+The selection nonce is not pooled. It is derived from the ballot's nonce
+seed exactly as electionguard derives it, Nonces(description hash, seed)
+at the selection's sequence order, so a spoiled ballot can still be
+decrypted from its ballot nonce. g^r and K^r are computed when the ballot
+is encrypted, through the fixed-base tables of dtcvote.crypto.precompute.
+
+The proof's simulated branch normally raises the ciphertext to -c. With
+alpha = g^r that is g^(-rc), so choosing w first and setting v = w + rc
+gives the same commitments from precomputed powers alone. v is still
+uniform, so the proofs are distributed exactly as electionguard's and pass
+the same verification. When the pool is empty the original
+`encrypt_selection` runs instead, and the miss is counted.
+
+Pools never cross a fork. A forked child (the tally, batch encryption and
+verification process pools) would otherwise inherit the same queued
+entries as its parent and prove with the same randomness, which reveals
+the votes, and could inherit a queue lock held by a filler thread that no
+longer exists. The child drops every pool and gets electionguard's own
+encrypt_selection back; it can start pools of its own.
+"""
+from collections import OrderedDict, namedtuple
+import os
+from importlib import import_module
+from queue import Empty, Full, Queue
+from secrets import randbelow
+from threading import Event, Lock, Thread
+from typing import Dict, Optional
+
+from gmpy2 import invert, mpz
+from electionguard.ballot import make_ciphertext_ballot_selection
+from electionguard.chaum_pedersen import DisjunctiveChaumPedersenProof
+from electionguard.elgamal import ElGamalCiphertext
+from electionguard.group import G, P, Q, ElementModP, ElementModQ
+from electionguard.hash import hash_elems
+from electionguard.logs import log_warning
+from electionguard.nonces import Nonces
+
+from dtcvote.config import ELECTION_CACHE_SIZE, NONCE_POOL_DEPTH, NONCE_POOL_THREADS
+from dtcvote.crypto.precompute import g_pow_p, pow_p, use_fixed_base
+
+PooledNonces = namedtuple("PooledNonces", "u g_u k_u w g_w k_w c g_c g_c_inv")
+
+
+def _rand_q() -> int:
+    return randbelow(Q - 1) + 1
+
+
+class NoncePool(object):
+    """
+    A bounded queue of PooledNonces for one public key, kept full by daemon
+    threads.
+
+    Attrs:
+        public_key: The election public key K.
+        depth: The most entries kept ready.
+        taken: Entries handed out.
+        fallbacks: Requests that found the pool empty.
+    """
+
+    def __init__(self, public_key: mpz, depth: int = NONCE_POOL_DEPTH, threads: int = NONCE_POOL_THREADS):
+        self.public_key = mpz(public_key)
+        self.depth = depth
+        self.taken = 0
+        self.fallbacks = 0
+        self._queue: Queue = Queue(maxsize=depth)
+        self._stop = Event()
+        self._lock = Lock()
+        use_fixed_base(self.public_key)
+        self._threads = [Thread(target=self._fill, name=f"nonce-pool-{i}", daemon=True) for i in range(threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def make(self) -> PooledNonces:
+        u, w, c = _rand_q(), _rand_q(), _rand_q()
+        k = self.public_key
+        g_c = g_pow_p(c).elem
+        return PooledNonces(u, g_pow_p(u).elem, pow_p(k, u).elem,
+                            w, g_pow_p(w).elem, pow_p(k, w).elem,
+                            c, g_c, invert(g_c, mpz(P)))
+
+    def _fill(self) -> None:
+        while not self._stop.is_set():
+            entry = self.make()
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(entry, timeout=1)
+                    break
+                except Full:
+                    continue
+
+    def take(self) -> Optional[PooledNonces]:
+        """
+        The next precomputed entry, or None (counted as a fallback) when the
+        pool has run dry.
+        """
+        try:
+            entry = self._queue.get_nowait()
+        except Empty:
+            with self._lock:
+                self.fallbacks += 1
+            return None
+        with self._lock:
+            self.taken += 1
+        return entry
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            requests = self.taken + self.fallbacks
+            return dict(depth=self._queue.qsize(), maxsize=self.depth, taken=self.taken,
+                        fallbacks=self.fallbacks, fallback_rate=self.fallbacks / requests if requests else 0.0)
+
+
+def disjunctive_proof(
+    m: int, r: mpz, n: PooledNonces, alpha: mpz, beta: mpz, extended_base_hash: ElementModQ
+) -> DisjunctiveChaumPedersenProof:
+    """
+    The proof make_disjunctive_chaum_pedersen_zero/one would give for an
+    encryption of m with nonce r, built from the precomputed powers.
+    """
+    p = mpz(P)
+    if m:
+        # simulate the zero branch with challenge c; a0 = g^w, b0 = K^w g^-c
+        c0, a0, b0 = n.c, n.g_w, n.k_w * n.g_c_inv % p
+        v0 = (n.w + r * c0) % Q
+        a1, b1 = n.g_u, n.k_u
+    else:
+        # simulate the one branch with challenge c; a1 = g^w, b1 = K^w g^c
+        a0, b0 = n.g_u, n.k_u
+        c1, a1, b1 = n.c, n.g_w, n.k_w * n.g_c % p
+        v1 = (n.w + r * c1) % Q
+    elements = [ElementModP(x) for x in (alpha, beta, a0, b0, a1, b1)]
+    c = hash_elems(extended_base_hash, *elements)
+    if m:
+        c1 = (c.elem - c0) % Q
+        v1 = (n.u + c1 * r) % Q
+    else:
+        c0 = (c.elem - c1) % Q
+        v0 = (n.u + c0 * r) % Q
+    return DisjunctiveChaumPedersenProof(*elements[2:], ElementModQ(mpz(c0)), ElementModQ(mpz(c1)), c,
+                                         ElementModQ(mpz(v0)), ElementModQ(mpz(v1)))
+
+
+# public key -> NoncePool, most recently used last
+_pools: "OrderedDict[mpz, NoncePool]" = OrderedDict()
+_pools_lock = Lock()
+_original_encrypt_selection = None
+
+
+def encrypt_selection(
+    selection,
+    selection_description,
+    elgamal_public_key: ElementModP,
+    crypto_extended_base_hash: ElementModQ,
+    nonce_seed: ElementModQ,
+    is_placeholder: bool = False,
+    should_verify_proofs: bool = True,
+):
+    """
+    Drop-in replacement for electionguard.encrypt.encrypt_selection that
+    uses pooled proof randomness when the public key has a pool with
+    entries ready. The ciphertext is the one electionguard would produce.
+    """
+    pool = _pools.get(elgamal_public_key.elem)
+    n = pool.take() if pool is not None else None
+    if n is None:
+        return _original_encrypt_selection(selection, selection_description, elgamal_public_key,
+                                           crypto_extended_base_hash, nonce_seed, is_placeholder,
+                                           should_verify_proofs)
+
+    if not selection.is_valid(selection_description.object_id):
+        log_warning(f"malformed input selection: {selection}")
+        return None
+
+    description_hash = selection_description.crypto_hash()
+    r = Nonces(description_hash, nonce_seed)[selection_description.sequence_order]
+    m = selection.to_int()
+    alpha = g_pow_p(r).elem
+    k_r = pow_p(elgamal_public_key, r).elem
+    beta = k_r * G % P if m else k_r
+    encrypted_selection = make_ciphertext_ballot_selection(
+        object_id=selection.object_id,
+        description_hash=description_hash,
+        ciphertext=ElGamalCiphertext(ElementModP(alpha), ElementModP(beta)),
+        elgamal_public_key=elgamal_public_key,
+        crypto_extended_base_hash=crypto_extended_base_hash,
+        proof_seed=nonce_seed,
+        selection_representation=m,
+        is_placeholder_selection=is_placeholder,
+        nonce=r,
+        proof=disjunctive_proof(m, r.elem, n, alpha, beta, crypto_extended_base_hash),
+    )
+
+    if not should_verify_proofs:
+        return encrypted_selection
+    if encrypted_selection.is_valid_encryption(description_hash, elgamal_public_key, crypto_extended_base_hash):
+        return encrypted_selection
+    log_warning(f"mismatching selection proof for selection {encrypted_selection.object_id}")
+    return None
+
+
+def use_nonce_pool(public_key, depth: int = NONCE_POOL_DEPTH) -> Optional[NoncePool]:
+    """
+    Start (once per process) a pool for this public key and route
+    electionguard's encrypt_selection through it. A depth of 0 disables
+    pooling.
+    """
+    global _original_encrypt_selection
+    if depth <= 0:
+        return None
+    k = public_key.elem if isinstance(public_key, ElementModP) else mpz(public_key)
+    with _pools_lock:
+        pool = _pools.get(k)
+        if pool is None:
+            pool = _pools[k] = NoncePool(k, depth)
+            while len(_pools) > ELECTION_CACHE_SIZE:
+                _pools.popitem(last=False)[1].stop()
+        _pools.move_to_end(k)
+        if _original_encrypt_selection is None:
+            encrypt = import_module("electionguard.encrypt")
+            _original_encrypt_selection = encrypt.encrypt_selection
+            encrypt.encrypt_selection = encrypt_selection
+    return pool
+
+
+def _forget_pools() -> None:
+    """
+    Run in a forked child: drop the inherited pools without touching their
+    queues or locks, whose filler threads didn't survive the fork, and
+    unpatch encrypt_selection.
+    """
+    global _pools, _pools_lock, _original_encrypt_selection
+    _pools = OrderedDict()
+    _pools_lock = Lock()
+    if _original_encrypt_selection is not None:
+        import_module("electionguard.encrypt").encrypt_selection = _original_encrypt_selection
+        _original_encrypt_selection = None
+
+
+os.register_at_fork(after_in_child=_forget_pools)
+
+
+def nonce_pool_stats() -> Dict[str, Dict]:
+    """
+    Depth and fallback rate of every pool in this process, keyed by a short
+    fingerprint of the public key.
+    """
+    with _pools_lock:
+        return {format(int(k) & 0xffffffff, "08x"): pool.stats() for k, pool in _pools.items()}
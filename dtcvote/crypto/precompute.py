@@ -0,0 +1,146 @@
+"""
+Fixed-base windowed exponentiation for ElectionGuard.
+
+Encryption and its proofs raise the same two bases, the generator g and the
+election public key K, to fresh exponents over and over. For a fixed base b
+we precompute b^(d * 2^(w*i)) for every window i and digit d, after which
+b^e costs one modular multiplication per window of e instead of a full
+square-and-multiply.
+
+`use_fixed_base(K)` builds (and caches) the tables for g and K and routes
+electionguard's `pow_p`/`g_pow_p` through them. Any other base falls through
+to the original implementation.
+"""
+from collections import OrderedDict
+from importlib import import_module
+from threading import Lock
+from typing import List, Union
+
+from gmpy2 import mpz
+from electionguard import group
+from electionguard.group import G, P, Q, ElementModP
+
+from dtcvote.config import ELECTION_CACHE_SIZE
+
+WINDOW_BITS = 8
+EXPONENT_BITS = Q.bit_length()
+
+# modules that imported pow_p/g_pow_p by name and so need their own reference swapped
+PATCHED_MODULES = ("electionguard.group", "electionguard.elgamal", "electionguard.chaum_pedersen")
+
+Exponent = Union[int, mpz, group.ElementModQ, group.ElementModP]
+
+
+class FixedBaseTable(object):
+    """
+    Precomputed powers of one base mod P.
+
+    Attrs:
+        base: The fixed base.
+        window: Bits of the exponent consumed per table row.
+        rows: rows[i][d] = base^(d * 2^(window * i)) mod P.
+    """
+
+    def __init__(self, base: int, window: int = WINDOW_BITS, exponent_bits: int = EXPONENT_BITS):
+        self.base = mpz(base)
+        self.window = window
+        self.mask = (1 << window) - 1
+        p = mpz(P)
+        self.rows: List[List[mpz]] = list()
+        row_base = self.base
+        for _ in range(-(-exponent_bits // window)):
+            row = [mpz(1)]
+            for _ in range(self.mask):
+                row.append(row[-1] * row_base % p)
+            self.rows.append(row)
+            row_base = row[-1] * row_base % p
+
+    def pow(self, e: int) -> mpz:
+        """
+        base^e mod P. The exponent is reduced mod Q first, which is sound
+        because g and every public key g^s have order Q.
+        """
+        e = int(e) % Q
+        p = mpz(P)
+        result = mpz(1)
+        window, mask = self.window, self.mask
+        for row in self.rows:
+            if not e:
+                break
+            digit = e & mask
+            if digit:
+                result = result * row[digit] % p
+            e >>= window
+        return result
+
+
+def _elem(x: Exponent) -> mpz:
+    return x.elem if isinstance(x, (group.ElementModP, group.ElementModQ)) else mpz(x)
+
+
+# public key tables, most recently used last; g's table lives outside it
+_tables: "OrderedDict[mpz, FixedBaseTable]" = OrderedDict()
+_g_table = None
+_original_pow_p = group.pow_p
+_originals = dict()
+_install_lock = Lock()
+_installed = False
+
+
+def pow_p(b: Exponent, e: Exponent) -> ElementModP:
+    """
+    Drop-in replacement for electionguard.group.pow_p that uses a
+    precomputed table when one exists for the base.
+    """
+    base = _elem(b)
+    table = _g_table if _g_table is not None and base == _g_table.base else _tables.get(base)
+    if table is None:
+        return _original_pow_p(b, e)
+    return ElementModP(table.pow(_elem(e)))
+
+
+def g_pow_p(e: Exponent) -> ElementModP:
+    """
+    Drop-in replacement for electionguard.group.g_pow_p.
+    """
+    return ElementModP(_g_table.pow(_elem(e)))
+
+
+def use_fixed_base(public_key: Exponent) -> None:
+    """
+    Route g^e and K^e through fixed-base tables for this election's public
+    key K, building the tables on first use in this process. At most
+    ELECTION_CACHE_SIZE public key tables are kept.
+    """
+    global _g_table, _installed
+    k = _elem(public_key)
+    with _install_lock:
+        if _g_table is None:
+            _g_table = FixedBaseTable(G)
+        if k in _tables:
+            _tables.move_to_end(k)
+        else:
+            _tables[k] = FixedBaseTable(k)
+            while len(_tables) > ELECTION_CACHE_SIZE:
+                _tables.popitem(last=False)
+        if not _installed:
+            for name in PATCHED_MODULES:
+                module = import_module(name)
+                for attr, replacement in (("pow_p", pow_p), ("g_pow_p", g_pow_p)):
+                    if hasattr(module, attr):
+                        _originals[(name, attr)] = getattr(module, attr)
+                        setattr(module, attr, replacement)
+            _installed = True
+
+
+def restore() -> None:
+    """
+    Put electionguard's own pow_p/g_pow_p back. The tables are kept, so a
+    later `use_fixed_base` reinstalls without rebuilding them.
+    """
+    global _installed
+    with _install_lock:
+        for (name, attr), original in _originals.items():
+            setattr(import_module(name), attr, original)
+        _originals.clear()
+        _installed = False
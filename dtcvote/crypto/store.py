@@ -0,0 +1,79 @@
+"""
+A DataStore for ElectionGuard ballots that lives in Postgres.
+
+electionguard keeps accepted ballots in an in-memory `DataStore`, which
+was pickled into `Election.pickle_jar` with the rest of the election, so
+the blob and the tally's memory grew with every ballot. `DatabaseStore`
+keeps the same interface over the `encrypted_ballot` table: reads are
+point lookups and iteration streams rows through a server-side cursor, so
+only `batch_size` ballots are in memory at a time. Pickling one stores
+just the election id.
+"""
+from typing import Iterator, List, Optional, Text, Tuple
+
+from dill import dumps, loads
+from electionguard.ballot import SubmittedBallot
+from electionguard.data_store import DataStore
+
+from dtcvote.config import BALLOT_CHUNK_SIZE
+from dtcvote.models.orm import EncryptedBallot
+
+
+class DatabaseStore(DataStore):
+    """
+    Attrs:
+        election_id: The Election whose ballot box this is.
+        batch_size: Rows fetched per round trip while iterating.
+    """
+
+    def __init__(self, election_id: int, batch_size: int = BALLOT_CHUNK_SIZE):
+        self.election_id = election_id
+        self.batch_size = batch_size
+
+    def __getstate__(self):
+        return dict(election_id=self.election_id, batch_size=self.batch_size)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __iter__(self) -> Iterator[Tuple[Text, SubmittedBallot]]:
+        return self.items()
+
+    def __len__(self) -> int:
+        return EncryptedBallot.count(self.election_id)
+
+    def __contains__(self, key: Text) -> bool:
+        return self.get(key) is not None
+
+    def all(self) -> List[SubmittedBallot]:
+        return list(self.values())
+
+    def clear(self) -> None:
+        EncryptedBallot.remove(self.election_id)
+
+    def exists(self, key: Text) -> Tuple[bool, Optional[SubmittedBallot]]:
+        ballot = self.get(key)
+        return ballot is not None, ballot
+
+    def get(self, key: Text) -> Optional[SubmittedBallot]:
+        blob = EncryptedBallot.fetch(self.election_id, key)
+        return None if blob is None else loads(blob)
+
+    def items(self) -> Iterator[Tuple[Text, SubmittedBallot]]:
+        for object_id, blob in EncryptedBallot.stream(self.election_id, batch_size=self.batch_size):
+            yield object_id, loads(blob)
+
+    def keys(self) -> Iterator[Text]:
+        for (object_id,) in EncryptedBallot.stream(self.election_id, (EncryptedBallot.object_id,), self.batch_size):
+            yield object_id
+
+    def pop(self, key: Text) -> Optional[SubmittedBallot]:
+        blob = EncryptedBallot.remove(self.election_id, key)
+        return None if blob is None else loads(blob)
+
+    def set(self, key: Text, value: SubmittedBallot) -> None:
+        EncryptedBallot.store(self.election_id, key, value.state.value, dumps(value))
+
+    def values(self) -> Iterator[SubmittedBallot]:
+        for _, ballot in self.items():
+            yield ballot
@@ -0,0 +1,201 @@
+"""
+Process-parallel homomorphic tally and decryption.
+
+`tally_ballots` accumulates every selection in one process and
+`count_encrypted_ballots` then decrypts the totals one after another. Here
+the cast ballots are split into (pad, data) columns per selection, and
+worker processes each take a share of the selections, multiply out their
+columns and decrypt the totals. Multiplication mod P is commutative, and each
+total is decrypted with the same `ElGamalCiphertext.decrypt`, so the counts
+are identical to the sequential path.
+
+`TallyAccumulator` keeps the same per-selection products up to date as each
+ballot is accepted, so they never have to be rebuilt from the ballot store.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import cpu_count, get_all_start_methods, get_context
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from gmpy2 import invert, mpz
+from msgpack import packb, unpackb
+from electionguard.ballot import BallotBoxState, SubmittedBallot
+from electionguard.ballot_validator import ballot_is_valid_for_election
+from electionguard.election import CiphertextElectionContext
+from electionguard.elgamal import ElGamalCiphertext
+from electionguard.group import P, ElementModP, ElementModQ
+from electionguard.manifest import InternalManifest
+
+from dtcvote.crypto.dlog import use_dlog_table
+
+# selection object_id -> ([pad, ...], [data, ...]), one entry per cast ballot
+Columns = Dict[str, Tuple[List[mpz], List[mpz]]]
+
+_columns: Columns = dict()
+_secret_key: Optional[ElementModQ] = None
+
+
+def _init(columns: Columns, secret_key: ElementModQ, max_count: int) -> None:
+    global _columns, _secret_key
+    _columns, _secret_key = columns, secret_key
+    # already mapped when the pool forks; opens the shared file otherwise
+    use_dlog_table(max_count)
+
+
+def _count(selection_id: str) -> Tuple[str, int]:
+    """
+    Multiply out one selection's pads and datas, starting from (1, 1) like
+    an empty CiphertextTallySelection, and decrypt the total.
+    """
+    p = mpz(P)
+    pads, datas = _columns.get(selection_id, ((), ()))
+    pad, data = mpz(1), mpz(1)
+    for x in pads:
+        pad = pad * x % p
+    for x in datas:
+        data = data * x % p
+    return selection_id, ElGamalCiphertext(ElementModP(pad), ElementModP(data)).decrypt(_secret_key)
+
+
+def cast_columns(
+    ballots: Iterable[SubmittedBallot],
+    internal_manifest: InternalManifest,
+    context: CiphertextElectionContext,
+) -> Columns:
+    """
+    Split the valid, cast ballots into ciphertext columns per selection,
+    skipping ballot ids already seen, the way CiphertextTally.batch_append does.
+    """
+    columns: Columns = dict()
+    seen = set()
+    for ballot in ballots:
+        if ballot.object_id in seen or ballot.state != BallotBoxState.CAST:
+            continue
+        if not ballot_is_valid_for_election(ballot, internal_manifest, context):
+            continue
+        seen.add(ballot.object_id)
+        for contest in ballot.contests:
+            for selection in contest.ballot_selections:
+                if selection.is_placeholder_selection:
+                    continue
+                pads, datas = columns.setdefault(selection.object_id, (list(), list()))
+                pads.append(selection.ciphertext.pad.elem)
+                datas.append(selection.ciphertext.data.elem)
+    return columns
+
+
+def parallel_count(
+    ballots: Iterable[SubmittedBallot],
+    internal_manifest: InternalManifest,
+    context: CiphertextElectionContext,
+    secret_key: ElementModQ,
+    workers: Optional[int] = None,
+    selection_ids: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """
+    Decrypted totals for every non-placeholder selection in the manifest, or
+    only `selection_ids`, keyed by selection object_id, computed across
+    `workers` processes.
+    """
+    columns = cast_columns(ballots, internal_manifest, context)
+    if selection_ids is None:
+        selection_ids = [s.object_id for contest in internal_manifest.contests for s in contest.ballot_selections]
+    max_count = max((len(pads) for pads, _ in columns.values()), default=0)
+    return count_columns(columns, selection_ids, secret_key, max_count, workers)
+
+
+def count_columns(
+    columns: Columns,
+    selection_ids: List[str],
+    secret_key: ElementModQ,
+    max_count: int,
+    workers: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Multiply out and decrypt each selection's column across `workers`
+    processes, or in this process when workers is 1.
+    """
+    workers = workers or cpu_count() or 1
+    use_dlog_table(max_count)
+    if workers == 1:
+        _init(columns, secret_key, max_count)
+        return dict(map(_count, selection_ids))
+    # fork hands the columns to the workers without pickling them
+    ctx = get_context("fork" if "fork" in get_all_start_methods() else None)
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init,
+                             initargs=(columns, secret_key, max_count)) as pool:
+        return dict(pool.map(_count, selection_ids, chunksize=max(1, len(selection_ids) // (4 * workers))))
+
+
+class TallyAccumulator(object):
+    """
+    Running encrypted tally: the product of every cast ballot's ciphertexts,
+    per selection, updated as each ballot is accepted. Closing the election
+    then only needs the final decryption.
+
+    Attrs:
+        totals: selection object_id -> [pad, data] products mod P.
+        ballots: Number of cast ballots folded in.
+    """
+
+    def __init__(self, selection_ids: Iterable[str] = (), ballots: int = 0):
+        self.totals: Dict[str, List[mpz]] = {s: [mpz(1), mpz(1)] for s in selection_ids}
+        self.ballots = ballots
+
+    @classmethod
+    def for_manifest(cls, internal_manifest: InternalManifest) -> "TallyAccumulator":
+        return cls(s.object_id for contest in internal_manifest.contests for s in contest.ballot_selections)
+
+    def _fold(self, ballot: SubmittedBallot, inverse: bool) -> bool:
+        if ballot.state != BallotBoxState.CAST:
+            return False
+        p = mpz(P)
+        for contest in ballot.contests:
+            for selection in contest.ballot_selections:
+                total = self.totals.get(selection.object_id)
+                if total is None or selection.is_placeholder_selection:
+                    continue
+                pad, data = selection.ciphertext.pad.elem, selection.ciphertext.data.elem
+                if inverse:
+                    pad, data = invert(pad, p), invert(data, p)
+                total[0] = total[0] * pad % p
+                total[1] = total[1] * data % p
+        self.ballots += -1 if inverse else 1
+        return True
+
+    def add(self, ballot: SubmittedBallot) -> bool:
+        """
+        Multiply a cast ballot into the tally. Spoiled ballots are ignored.
+        """
+        return self._fold(ballot, False)
+
+    def remove(self, ballot: SubmittedBallot) -> bool:
+        """
+        Take a superseded cast ballot back out, by multiplying in the
+        inverse of each of its ciphertexts.
+        """
+        return self._fold(ballot, True)
+
+    def decrypt(self, secret_key: ElementModQ, workers: Optional[int] = 1,
+                selection_ids: Optional[List[str]] = None) -> Dict[str, int]:
+        """
+        Decrypted totals keyed by selection object_id, for every selection or
+        only `selection_ids`.
+        """
+        selection_ids = list(self.totals) if selection_ids is None else selection_ids
+        columns = {s: ([pad], [data]) for s, (pad, data) in self.totals.items()}
+        return count_columns(columns, selection_ids, secret_key, self.ballots, workers)
+
+    def to_bytes(self) -> bytes:
+        width = (P.bit_length() + 7) // 8
+        return packb(dict(
+            ballots=self.ballots,
+            totals={s: [int(x).to_bytes(width, "big") for x in total] for s, total in self.totals.items()},
+        ), use_bin_type=True)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TallyAccumulator":
+        state = unpackb(blob, raw=False)
+        accumulator = cls(ballots=state["ballots"])
+        accumulator.totals = {s: [mpz(int.from_bytes(x, "big")) for x in total]
+                              for s, total in state["totals"].items()}
+        return accumulator
@@ -0,0 +1,236 @@
+"""
+Parallel, batched verification of submitted ballots' proofs.
+
+electionguard verifies a ballot one equation at a time: per selection it
+checks that six values are group members (one full exponentiation each)
+and that the four disjunctive Chaum-Pedersen equations hold, and it checks
+the contest's constant Chaum-Pedersen proof the same way. Here each worker
+takes a chunk of ballots and does the cheap checks exactly (hashes,
+challenge sums, bounds, style), then checks every group equation in the
+chunk at once using the small-exponent batch test: each equation is raised
+to a random 64-bit exponent and all of them are multiplied into a single
+check. Most exponentiations then use 64-bit exponents or the fixed-base
+tables.
+
+Soundness. The batch test is only sound for elements of the order-Q
+subgroup. With ElectionGuard's standard P, (P - 1) = 2 * Q * r' with r' a
+large prime. Membership is therefore checked as a Legendre symbol per
+element, which rules out the order-2 component and is cheap, plus one
+batched (prod x_i^d_i)^Q == 1, which catches an r' component except with
+probability 2^-64. If a chunk's batch fails, every ballot in it is
+re-checked with electionguard's own `is_valid_encryption`, which names the
+invalid ones.
+"""
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from multiprocessing import cpu_count, get_all_start_methods, get_context
+from secrets import randbits
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Text, Tuple
+
+from dill import dumps, loads
+from gmpy2 import legendre, mpz, powmod
+from electionguard.ballot import SubmittedBallot
+from electionguard.ballot_validator import ballot_is_valid_for_style
+from electionguard.election import CiphertextElectionContext
+from electionguard.group import P, Q
+from electionguard.hash import hash_elems
+from electionguard.manifest import InternalManifest
+
+from dtcvote.config import VERIFY_CHUNK_SIZE
+from dtcvote.crypto.precompute import g_pow_p, pow_p, use_fixed_base
+
+VerificationReport = namedtuple("VerificationReport", "checked invalid")
+
+
+class BatchCheck(object):
+    """
+    Random linear combination of group equations of the form
+    g^x K^y prod(X^z) == prod(A^d), with d the random batch exponent.
+    """
+
+    def __init__(self, public_key: mpz):
+        self.public_key = public_key
+        self.g_exp = 0
+        self.k_exp = 0
+        # base -> combined exponent; alpha and beta appear in several equations
+        self.lhs: Dict[mpz, int] = dict()
+        self.rhs: List[Tuple[mpz, int]] = list()
+        self.members: List[Tuple[mpz, int]] = list()
+
+    def member(self, *elements: mpz) -> bool:
+        """
+        Quadratic residuosity now, order-Q membership in the batch.
+        """
+        for x in elements:
+            if not 0 < x < P or legendre(x, P) != 1:
+                return False
+            self.members.append((x, randbits(64) | 1))
+        return True
+
+    def equation(self, g_exp: int, k_exp: int, bases: Iterable[Tuple[mpz, int]], commitment: mpz) -> None:
+        """
+        Add g^g_exp * K^k_exp * prod(base^exp) == commitment.
+        """
+        d = randbits(64) | 1
+        self.g_exp += d * g_exp
+        self.k_exp += d * k_exp
+        for base, e in bases:
+            self.lhs[base] = self.lhs.get(base, 0) + d * e
+        self.rhs.append((commitment, d))
+
+    def holds(self) -> bool:
+        p = mpz(P)
+        members = mpz(1)
+        for x, d in self.members:
+            members = members * powmod(x, d, p) % p
+        if powmod(members, Q, p) != 1:
+            return False
+        lhs = g_pow_p(self.g_exp % Q).elem * pow_p(self.public_key, self.k_exp % Q).elem % p
+        for base, e in self.lhs.items():
+            lhs = lhs * powmod(base, e % Q, p) % p
+        rhs = mpz(1)
+        for base, d in self.rhs:
+            rhs = rhs * powmod(base, d, p) % p
+        return lhs == rhs
+
+
+def _in_q(*values) -> bool:
+    return all(0 <= v.elem < Q for v in values)
+
+
+def _selection(selection, check: BatchCheck, base_hash) -> bool:
+    if selection.crypto_hash != selection.crypto_hash_with(selection.description_hash) or selection.proof is None:
+        return False
+    alpha, beta = selection.ciphertext.pad, selection.ciphertext.data
+    proof = selection.proof
+    a0, b0 = proof.proof_zero_pad, proof.proof_zero_data
+    a1, b1 = proof.proof_one_pad, proof.proof_one_data
+    c0, c1, c = proof.proof_zero_challenge, proof.proof_one_challenge, proof.challenge
+    v0, v1 = proof.proof_zero_response, proof.proof_one_response
+    if not _in_q(c0, c1, c, v0, v1) or (c0.elem + c1.elem) % Q != c.elem:
+        return False
+    if c != hash_elems(base_hash, alpha, beta, a0, b0, a1, b1):
+        return False
+    if not check.member(alpha.elem, beta.elem, a0.elem, b0.elem, a1.elem, b1.elem):
+        return False
+    # g^v0 = a0 alpha^c0, g^v1 = a1 alpha^c1, K^v0 = b0 beta^c0, g^c1 K^v1 = b1 beta^c1
+    check.equation(v0.elem, 0, [(alpha.elem, -c0.elem)], a0.elem)
+    check.equation(v1.elem, 0, [(alpha.elem, -c1.elem)], a1.elem)
+    check.equation(0, v0.elem, [(beta.elem, -c0.elem)], b0.elem)
+    check.equation(c1.elem, v1.elem, [(beta.elem, -c1.elem)], b1.elem)
+    return True
+
+
+def _contest(contest, check: BatchCheck, base_hash, number_elected: int) -> bool:
+    if contest.crypto_hash != contest.crypto_hash_with(contest.description_hash) or contest.proof is None:
+        return False
+    proof = contest.proof
+    a, b, c, v, constant = proof.pad, proof.data, proof.challenge, proof.response, proof.constant
+    # the proof is of the selections summing to `constant`, which must be the
+    # contest's limit (placeholders make up any undervote), or overvotes pass
+    if not _in_q(c, v) or constant != number_elected:
+        return False
+    accumulated = contest.elgamal_accumulate()
+    alpha, beta = accumulated.pad, accumulated.data
+    if c != hash_elems(base_hash, alpha, beta, a, b):
+        return False
+    # alpha and beta are products of selection ciphertexts, already checked as members
+    if not check.member(a.elem, b.elem):
+        return False
+    # g^v = a alpha^c, g^(cL) K^v = b beta^c
+    check.equation(v.elem, 0, [(alpha.elem, -c.elem)], a.elem)
+    check.equation(c.elem * constant, v.elem, [(beta.elem, -c.elem)], b.elem)
+    return True
+
+
+def _structure(ballot: SubmittedBallot, check: BatchCheck, internal_manifest: InternalManifest, base_hash) -> bool:
+    """
+    Everything but the group equations, which go into `check`.
+    """
+    if ballot.manifest_hash != internal_manifest.manifest_hash:
+        return False
+    if ballot.crypto_hash != ballot.crypto_hash_with(internal_manifest.manifest_hash):
+        return False
+    if not ballot_is_valid_for_style(ballot, internal_manifest):
+        return False
+    limits = {c.object_id: c.number_elected for c in internal_manifest.contests}
+    for contest in ballot.contests:
+        if contest.object_id not in limits:
+            return False
+        if not all(_selection(s, check, base_hash) for s in contest.ballot_selections):
+            return False
+        if not _contest(contest, check, base_hash, limits[contest.object_id]):
+            return False
+    return True
+
+
+_manifest: Optional[InternalManifest] = None
+_context: Optional[CiphertextElectionContext] = None
+
+
+def _init(pickled: bytes) -> None:
+    global _manifest, _context
+    _manifest, _context = loads(pickled)
+    use_fixed_base(_context.elgamal_public_key)
+
+
+def verify_chunk(rows: List[Tuple[Text, bytes]]) -> Tuple[int, List[Text]]:
+    """
+    Verify dill-pickled SubmittedBallots; returns how many were checked and
+    the object_ids of the invalid ones.
+    """
+    k = _context.elgamal_public_key
+    base_hash = _context.crypto_extended_base_hash
+    check = BatchCheck(k.elem)
+    ballots, invalid = list(), list()
+    for object_id, blob in rows:
+        ballot = loads(blob)
+        if _structure(ballot, check, _manifest, base_hash):
+            ballots.append(ballot)
+        else:
+            invalid.append(object_id)
+    if ballots and not check.holds():
+        invalid.extend(b.object_id for b in ballots
+                       if not b.is_valid_encryption(_manifest.manifest_hash, k, base_hash))
+    return len(rows), invalid
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[List]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def verify_ballots(
+    rows: Iterable[Tuple[Text, bytes]],
+    internal_manifest: InternalManifest,
+    context: CiphertextElectionContext,
+    workers: Optional[int] = None,
+    chunk_size: int = VERIFY_CHUNK_SIZE,
+) -> VerificationReport:
+    """
+    Verify (object_id, dill-pickled SubmittedBallot) rows across a process
+    pool. At most two chunks per worker are in flight, so `rows` can stream
+    from a server-side cursor.
+    """
+    workers = workers or cpu_count() or 1
+    ctx = get_context("fork" if "fork" in get_all_start_methods() else None)
+    checked, invalid = 0, list()
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init,
+                             initargs=(dumps((internal_manifest, context)),)) as pool:
+        pending: Set = set()
+        for chunk in _chunks(rows, chunk_size):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    n, bad = future.result()
+                    checked, invalid = checked + n, invalid + bad
+            pending.add(pool.submit(verify_chunk, chunk))
+        for future in pending:
+            n, bad = future.result()
+            checked, invalid = checked + n, invalid + bad
+    return VerificationReport(checked, sorted(invalid))
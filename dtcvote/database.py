@@ -1,11 +1,11 @@
 from contextlib import contextmanager
 from threading import get_ident
-from typing import ClassVar, NoReturn, Sequence
+from typing import Dict, Iterator, List, NoReturn, Sequence, Text
 
 from flask import current_app
 from psycopg2 import Error as DbError
-from sqlalchemy import create_engine, select
-from sqlalchemy.engine import Result
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.engine import Result, Row
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.sql.expression import Executable
 
@@ -40,8 +40,20 @@ def db_insert(models: Sequence) -> Sequence:
     return models
 
 
-def db_get_by_id(cls, ID):
-    return current_app.db_session().get(cls, ID)
+def db_insert_returning(cls, rows: Sequence[Dict], returning: Sequence) -> List[Row]:
+    """
+    Insert many rows with a single multi-row INSERT ... RETURNING within the
+    thread's current transaction. Bypasses the unit of work, so no ORM objects
+    are built and nothing needs to be flushed.
+    """
+    if not rows:
+        return []
+    stmt = insert(cls).values(list(rows)).returning(*returning)
+    return db_exec(stmt).all()
+
+
+def db_get_by_id(cls, ID, options: Sequence = ()):
+    return current_app.db_session().get(cls, ID, options=options)
 
 
 def db_get_by_uuid(cls, uuid):
@@ -75,3 +87,21 @@ def commit_or_rollback(rollback: bool) -> NoReturn:
             current_app.db_session.commit()
         except DbError:
             current_app.db_session.close()
+
+
+@contextmanager
+def count_statements() -> Iterator[List[Text]]:
+    """
+    Collect the SQL statements sent to the database inside the block, e.g.
+    to check how many queries a loading profile costs.
+    """
+    statements = list()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
@@ -0,0 +1,150 @@
+"""
+Long election operations, run by worker processes instead of inside the
+HTTP request that asked for them.
+
+An endpoint queues a `Job` and answers 202 with it straight away; its
+progress can then be polled at /job/{id}. Workers (`python3 -m
+dtcvote.manage worker`) claim jobs with SELECT ... FOR UPDATE SKIP LOCKED
+and run the handler for the job's kind. A handler does its work in chunks
+and commits each chunk together with a checkpoint, through `save`, so a job
+whose worker dies is claimed again once its heartbeat goes stale and
+resumes after the last chunk that was committed.
+"""
+from importlib import import_module
+from os import getpid
+from socket import gethostname
+from threading import Event, Thread
+from time import sleep
+from typing import Callable, Dict, Optional, Text, Tuple
+
+from flask import current_app
+
+from dtcvote.config import JOB_MAX_ATTEMPTS, JOB_POLL_INTERVAL, JOB_STALE_AFTER
+from dtcvote.database import commit_or_rollback, db_engine, db_flush, db_insert
+from dtcvote.models.orm import Job
+
+# kind -> "module:function"; imported when first run, so handlers can live with their controllers
+HANDLERS = {
+    "generate-ballots": "dtcvote.controllers.election.generate_ballots:generate",
+    "count": "dtcvote.controllers.election.count:count",
+    "export": "dtcvote.controllers.election.export:export",
+    "remind": "dtcvote.controllers.election.remind:remind",
+}
+
+
+class JobFailed(Exception):
+    """
+    Raised by a handler to fail its job with a message for whoever asked
+    for it.
+    """
+
+
+class JobLost(Exception):
+    """
+    Another worker has taken the job over.
+    """
+
+
+def handler_for(kind: Text) -> Callable:
+    module, name = HANDLERS[kind].split(":")
+    return getattr(import_module(module), name)
+
+
+def save(job: Job, progress: int, checkpoint: Dict, total: Optional[int] = None, dry_run: bool = False) -> None:
+    """
+    Commit a chunk of the job's work together with the checkpoint to resume
+    after it. A dry run only flushes, and is rolled back at the end.
+    """
+    if not job.advance(progress, checkpoint, total):
+        current_app.db_session.rollback()
+        raise JobLost(job.id)
+    if dry_run:
+        db_flush()
+    else:
+        current_app.db_session.commit()
+
+
+def run_job(job: Job, dry_run: bool = False) -> None:
+    """
+    Run a claimed job's handler and record its result or error.
+    """
+    try:
+        result = handler_for(job.kind)(job, dry_run)
+    except JobLost:
+        current_app.logger.warning(f"job {job.id} was taken over by another worker")
+        return
+    except Exception as err:
+        current_app.db_session.rollback()
+        if not isinstance(err, JobFailed):
+            current_app.logger.exception(f"job {job.id} ({job.kind}) failed")
+        job.finish(error=str(err) or type(err).__name__)
+    else:
+        job.finish(result)
+    if not dry_run:
+        current_app.db_session.commit()
+
+
+def submit(kind: Text, election_id: int, params: Optional[Dict] = None, dry_run: bool = False) -> Tuple[Dict, int]:
+    """
+    Queue a job and answer 202 with it, or with the same kind of job already
+    pending for the election. A dry run runs the job here instead, rolls it
+    back and answers with what it would have returned.
+    """
+    if dry_run:
+        job, = db_insert([Job(kind=kind, election_id=election_id, params=params or dict())])
+        run_job(job, dry_run=True)
+        result, error = job.result, job.error
+        commit_or_rollback(True)
+        if error:
+            return {'code': 418, 'message': error}, 418
+        return result, 200
+    job = Job.enqueue(kind, election_id, params)
+    commit_or_rollback(False)
+    return job.dict_from_colset(), 202
+
+
+class Heartbeat(Thread):
+    """
+    Keeps a running job's heartbeat_dt fresh, on its own connection, until
+    stopped.
+    """
+
+    def __init__(self, job_id: int, worker: Text, interval: float):
+        super().__init__(name=f"heartbeat-{job_id}", daemon=True)
+        self.job_id = job_id
+        self.worker = worker
+        self.interval = interval
+        self.stopped = Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            with db_engine.begin() as connection:
+                if not Job.heartbeat(connection, self.job_id, self.worker):
+                    return
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+def work(worker: Optional[Text] = None, poll: float = JOB_POLL_INTERVAL, until_empty: bool = False) -> None:
+    """
+    Claim and run jobs forever, or until none are left with `until_empty`.
+    """
+    worker = worker or f"{gethostname()}:{getpid()}"
+    while True:
+        job = Job.claim(worker, JOB_STALE_AFTER, JOB_MAX_ATTEMPTS)
+        current_app.db_session.commit()
+        if job is None:
+            if until_empty:
+                return
+            sleep(poll)
+            continue
+        current_app.logger.info(f"{worker} running job {job.id} ({job.kind}), attempt {job.attempts}")
+        heartbeat = Heartbeat(job.id, worker, JOB_STALE_AFTER / 3)
+        heartbeat.start()
+        try:
+            run_job(job)
+        finally:
+            heartbeat.stop()
+            current_app.db_session.remove()
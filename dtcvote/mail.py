@@ -0,0 +1,224 @@
+"""
+Outbound email: a queue in the `outbound_email` table and the senders
+that drain it.
+
+Nothing that queues an email waits on SMTP. Ballot generation queues each
+chunk's emails in the chunk's own transaction, and reminders are a job
+(dtcvote.controllers.election.remind). Sender threads (`python3 -m
+dtcvote.manage mailer`) claim due emails a batch at a time with
+SELECT ... FOR UPDATE SKIP LOCKED. Each thread keeps its SMTP connection
+open across messages and batches, and every relay has a token bucket
+shared by the threads that use it. Temporary failures (4xx answers, broken
+connections) are retried with exponential backoff. Permanent ones (5xx)
+fail at once.
+
+Delivery is at least once. A sender that dies between the relay accepting
+a batch and recording it leaves the batch to be sent again after
+MAIL_CLAIM_TIMEOUT. Every message carries a Message-ID derived from its
+row and MAIL_MESSAGE_ID_DOMAIN, not the sending host, so duplicates are
+recognisable.
+"""
+import smtplib
+from email.message import EmailMessage
+from os import getpid
+from socket import gethostname
+from threading import Lock, local
+from time import monotonic, sleep
+from typing import Dict, List, Optional, Text, Tuple
+
+from flask import current_app
+
+from dtcvote.config import (MAIL_BACKOFF, MAIL_BATCH_SIZE, MAIL_CLAIM_TIMEOUT, MAIL_MAX_ATTEMPTS,
+                            MAIL_MESSAGE_ID_DOMAIN, MAIL_POLL_INTERVAL)
+from dtcvote.models.orm import Election, OutboundEmail
+
+VOTE = "vote"
+VOTED = "voted"
+NOT_VOTED = "not_voted"
+
+
+def ballot_link(uuid: Text, secret_phrase: Text) -> Text:
+    return f"""\n\nTo vote in this election, click this link: {current_app.config.get("GUI_URL") + '/vote/' + str(uuid)}
+
+    Before voting, verify that the secret phrase displayed on the screen is "{secret_phrase}."
+
+    If the phrase does not match or you have trouble voting, contact your election administrator.
+    """
+
+
+def election_email(e: Election, kind: Text, email_to: Text, uuid: Text = None, secret_phrase: Text = None) -> Dict:
+    """
+    An OutboundEmail row for one voter. Ballot and not-voted reminder emails
+    carry the link to the voter's ballot and its secret phrase.
+    """
+    if kind == VOTE:
+        subject, body = e.name, e.vote_email
+    elif kind == VOTED:
+        subject, body = f"Thank you for voting in {e.name}", e.voted_email
+    else:
+        subject, body = f"Reminder: vote in {e.name}", e.not_voted_email
+    body = body or ""
+    if kind != VOTED:
+        body += ballot_link(uuid, secret_phrase)
+    return dict(election_id=e.id, kind=kind, email_from=current_app.config.get("EMAIL_FROM"),
+                email_to=email_to, subject=subject, body=body)
+
+
+class TokenBucket(object):
+    """
+    Allows `rate` sends a second on average, in bursts of up to `burst`. A
+    rate of 0 means no limit.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self.tokens = self.burst
+        self.updated = monotonic()
+        self.lock = Lock()
+
+    def take(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            sleep(wait)
+
+
+class Relay(object):
+    """
+    An SMTP relay. Each thread sending through it keeps its own connection
+    open between messages; all of them share the relay's rate limit.
+
+    Attrs:
+        host: Relay host name.
+        port: Relay port.
+        starttls: Whether to upgrade connections with STARTTLS.
+        username: Login, if the relay wants one.
+        password: Password for `username`.
+        bucket: The relay's TokenBucket.
+    """
+
+    def __init__(self, host: Text, port: int = 25, rate: float = 0, starttls: bool = False,
+                 username: Optional[Text] = None, password: Optional[Text] = None):
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.username = username
+        self.password = password
+        self.bucket = TokenBucket(rate)
+        self._local = local()
+
+    @classmethod
+    def from_config(cls, config) -> List["Relay"]:
+        """
+        One Relay per host[:port] in MAIL_RELAYS.
+        """
+        relays = list()
+        for relay in config.get("MAIL_RELAYS", "localhost:25").split(","):
+            host, _, port = relay.strip().partition(":")
+            relays.append(cls(host, int(port or 25), config.get("MAIL_RATE", 0), config.get("MAIL_STARTTLS", False),
+                              config.get("MAIL_USERNAME"), config.get("MAIL_PASSWORD")))
+        return relays
+
+    def connection(self) -> smtplib.SMTP:
+        smtp = getattr(self._local, "smtp", None)
+        if smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            self._local.smtp = smtp
+        return smtp
+
+    def close(self) -> None:
+        smtp = getattr(self._local, "smtp", None)
+        self._local.smtp = None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+
+    def send(self, message: EmailMessage) -> None:
+        self.bucket.take()
+        try:
+            self.connection().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # the relay dropped an idle connection; one fresh try
+            self.close()
+            self.connection().send_message(message)
+
+
+def message(row) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = row.email_from
+    msg["To"] = row.email_to
+    msg["Subject"] = row.subject
+    msg["Message-ID"] = f"<outbound-{row.id}@{MAIL_MESSAGE_ID_DOMAIN}>"
+    msg.set_content(row.body)
+    return msg
+
+
+def send_batch(relay: Relay, rows: List) -> Tuple[List[int], List[Tuple[int, Text]], List[Tuple[int, Text]]]:
+    """
+    Send claimed rows through one connection. Returns the ids sent, and the
+    (id, error) pairs to retry and to fail.
+    """
+    sent, retry, failed = list(), list(), list()
+    for row in rows:
+        try:
+            relay.send(message(row))
+        except smtplib.SMTPRecipientsRefused as err:
+            codes = [code for code, _ in err.recipients.values()]
+            (failed if min(codes) >= 500 else retry).append((row.id, str(err.recipients)))
+        except smtplib.SMTPResponseException as err:
+            (failed if err.smtp_code >= 500 else retry).append((row.id, f"{err.smtp_code} {err.smtp_error!r}"))
+            if err.smtp_code < 500:
+                relay.close()
+        except (smtplib.SMTPException, OSError) as err:
+            retry.append((row.id, f"{type(err).__name__}: {err}"))
+            relay.close()
+        else:
+            sent.append(row.id)
+    return sent, retry, failed
+
+
+def deliver(relay: Relay, sender: Optional[Text] = None, batch_size: int = MAIL_BATCH_SIZE,
+            until_empty: bool = False) -> int:
+    """
+    Claim, send and settle batches of due emails forever, or until none are
+    due with `until_empty`. Returns how many were sent.
+    """
+    sender = sender or f"{gethostname()}:{getpid()}"
+    total = 0
+    try:
+        while True:
+            rows = OutboundEmail.claim(sender, batch_size, MAIL_CLAIM_TIMEOUT)
+            current_app.db_session.commit()
+            if not rows:
+                if until_empty:
+                    return total
+                # don't hold an idle connection open while the queue is empty
+                relay.close()
+                sleep(MAIL_POLL_INTERVAL)
+                continue
+            started = monotonic()
+            sent, retry, failed = send_batch(relay, rows)
+            OutboundEmail.settle(sent, retry, failed, MAIL_MAX_ATTEMPTS, MAIL_BACKOFF)
+            current_app.db_session.commit()
+            total += len(sent)
+            elapsed = monotonic() - started
+            current_app.logger.info(f"{sender} via {relay.host}: {len(sent)} sent, {len(retry)} to retry, "
+                                    f"{len(failed)} failed ({len(rows) / elapsed if elapsed else 0:.0f} msgs/sec)")
+    finally:
+        relay.close()
+        current_app.db_session.remove()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands that run against the database outside of the API.
+
+    python3 -m dtcvote.manage rebuild-votes 1
+    python3 -m dtcvote.manage recode-ballots
+    python3 -m dtcvote.manage verify-ballots 1
+    python3 -m dtcvote.manage worker --processes 4
+    python3 -m dtcvote.manage mailer --senders 8
+    python3 -m dtcvote.manage import-voters roll.csv --election-id 1
+"""
+import argparse
+import sys
+from multiprocessing import get_context
+from os import getpid
+from socket import gethostname
+from threading import Thread
+from typing import List, Optional
+
+from flask import Flask, current_app
+
+from dtcvote import config
+from dtcvote.database import commit_or_rollback, db_connect
+
+
+def make_app() -> Flask:
+    """
+    A bare Flask app with a database session, so the db_* helpers and
+    models work the same way they do inside a request.
+    """
+    app = Flask("dtcvote")
+    app.config.from_object(config)
+    app.db_session = db_connect()
+    app.teardown_appcontext(lambda e: app.db_session.remove())
+    return app
+
+
+def rebuild_votes(args: argparse.Namespace) -> None:
+    from dtcvote.models.orm import BallotVote
+
+    for election_id in args.election_id:
+        ballots = BallotVote.rebuild(election_id, args.batch_size)
+        commit_or_rollback(args.dry_run)
+        print(f"election {election_id}: rebuilt choices for {ballots} ballots")
+
+
+def recode_ballots(args: argparse.Namespace) -> None:
+    from dtcvote.models.orm import Ballot
+
+    after_id, total = 0, 0
+    while True:
+        # one transaction per batch keeps locks short while voting continues
+        after_id, rewritten = Ballot.recode(args.election_id, args.batch_size, after_id)
+        commit_or_rollback(args.dry_run)
+        total += rewritten
+        if not after_id:
+            break
+        print(f"up to ballot {after_id}: {total} ballots rewritten")
+    print(f"done: {total} ballots rewritten")
+
+
+def verify_ballots(args: argparse.Namespace) -> None:
+    from dtcvote.crypto.electionguard import load_election
+    from dtcvote.crypto.store import DatabaseStore
+    from dtcvote.database import db_get_by_id
+    from dtcvote.models.orm import Election
+
+    e = db_get_by_id(Election, args.election_id)
+    if e is None or e.pickle_jar is None:
+        sys.exit(f"election {args.election_id}: no encrypted ballots")
+    e_eg = load_election(e)
+    if isinstance(e_eg.store, DatabaseStore):
+        e_eg.store.batch_size = args.batch_size
+    report = e_eg.verify(args.workers)
+    for object_id in report.invalid:
+        print(object_id)
+    print(f"election {args.election_id}: {len(report.invalid)} of {report.checked} ballots failed verification")
+    if report.invalid:
+        sys.exit(1)
+
+
+def worker(args: argparse.Namespace) -> None:
+    from dtcvote.jobs import work
+
+    if args.processes <= 1:
+        work(until_empty=args.until_empty)
+        return
+    # each process starts fresh, with its own app and database connections
+    argv = ["worker", "--processes", "1"] + (["--until-empty"] if args.until_empty else [])
+    ctx = get_context("spawn")
+    processes = [ctx.Process(target=main, args=(argv,)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def mailer(args: argparse.Namespace) -> None:
+    from dtcvote.mail import Relay, deliver
+
+    # each sender thread pushes its own context of this app, and so gets its own session
+    app = current_app._get_current_object()
+    relays = Relay.from_config(app.config)
+
+    def sender(i: int) -> None:
+        with app.app_context():
+            deliver(relays[i % len(relays)], f"{gethostname()}:{getpid()}:{i}", args.batch_size, args.until_empty)
+
+    threads = [Thread(target=sender, args=(i,), name=f"sender-{i}") for i in range(args.senders)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def import_voters(args: argparse.Namespace) -> None:
+    from dtcvote.voter_import import CSV, NDJSON, import_voters
+
+    fmt = args.format or (NDJSON if args.path.endswith((".ndjson", ".jsonl")) else CSV)
+    with open(args.path, "rb") as stream:
+        summary = import_voters(stream, fmt, args.election_id)
+    commit_or_rollback(args.dry_run)
+    for reject in summary["rejected"]:
+        print(f"line {reject['line']}: {reject['reason']}")
+    print(f"{summary['inserted']} voters added, {summary['updated']} updated, {summary['attached']} attached, "
+          f"{len(summary['rejected'])} rejected")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m dtcvote.manage")
+    parser.add_argument("--dry-run", action="store_true", help="Validate but don't actually do it")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cmd = commands.add_parser("rebuild-votes", help="Repopulate ballot_vote from the votes stored on each ballot")
+    cmd.add_argument("election_id", type=int, nargs="+")
+    cmd.add_argument("--batch-size", type=int, default=config.BLT_BATCH_SIZE)
+    cmd.set_defaults(func=rebuild_votes)
+
+    cmd = commands.add_parser("recode-ballots", help="Rewrite ballots stored as dill pickles in the current encodings")
+    cmd.add_argument("--election-id", type=int, default=None)
+    cmd.add_argument("--batch-size", type=int, default=config.BLT_BATCH_SIZE)
+    cmd.set_defaults(func=recode_ballots)
+
+    cmd = commands.add_parser("verify-ballots", help="Check the proofs of every encrypted ballot and list invalid ones")
+    cmd.add_argument("election_id", type=int)
+    cmd.add_argument("--workers", type=int, default=config.VERIFY_WORKERS, help="0 means one per core")
+    cmd.add_argument("--batch-size", type=int, default=config.BALLOT_CHUNK_SIZE)
+    cmd.set_defaults(func=verify_ballots)
+
+    cmd = commands.add_parser("worker", help="Run queued jobs: ballot generation, counts and exports")
+    cmd.add_argument("--processes", type=int, default=1)
+    cmd.add_argument("--until-empty", action="store_true", help="Exit once no jobs are left")
+    cmd.set_defaults(func=worker)
+
+    cmd = commands.add_parser("mailer", help="Send queued emails")
+    cmd.add_argument("--senders", type=int, default=config.MAIL_SENDERS, help="Threads, spread over MAIL_RELAYS")
+    cmd.add_argument("--batch-size", type=int, default=config.MAIL_BATCH_SIZE)
+    cmd.add_argument("--until-empty", action="store_true", help="Exit once nothing is due")
+    cmd.set_defaults(func=mailer)
+
+    cmd = commands.add_parser("import-voters", help="Bulk-load voters from CSV or NDJSON, upserting by email")
+    cmd.add_argument("path")
+    cmd.add_argument("--format", choices=("csv", "ndjson"), help="Defaults to the file's extension")
+    cmd.add_argument("--election-id", type=int, default=None, help="Also add every voter to this election")
+    cmd.set_defaults(func=import_voters)
+
+    args = parser.parse_args(argv)
+    with make_app().app_context():
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
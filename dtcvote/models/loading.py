@@ -0,0 +1,99 @@
+"""
+Named loading profiles: what each use of a model reads, and how to fetch it.
+
+No relationship is eager by default. A controller that walks an election's
+questions and candidates opts in to the profile for what it does, which
+selectinloads exactly the relationships it reads (one SELECT ... WHERE id
+IN (...) per level, instead of one join multiplying questions by
+candidates) and raiseloads the rest, so straying off the profile raises
+instead of quietly issuing a query per row.
+
+    e = load(Election, id_, MANIFEST)
+
+- LISTING: the model's listing columns only, no relationships.
+- DETAIL: what dict_from_colset() returns for a single record, deferred
+  public columns such as the email bodies included.
+- BALLOT_TEMPLATE: that, plus questions' algorithms and candidates' parties,
+  as a blank ballot (dtcvote.ballot.BasicBallot) and ballot generation read.
+- MANIFEST: questions with algorithms, candidates and their parties, for
+  generate_manifest.
+- TALLY: questions with algorithms and candidates, without parties, for
+  counting and BLT export.
+
+An object already in the session comes back as it is, without the
+profile's loads, so an endpoint that may run its job inline (a dry run)
+loads with the job's profile.
+"""
+from typing import Callable, Dict, Sequence, Text, Type
+
+from sqlalchemy.orm import load_only, raiseload, selectinload, undefer
+
+from dtcvote.database import db_get_by_id
+from dtcvote.models.orm import Candidate, Election, Question
+
+LISTING = "listing"
+DETAIL = "detail"
+BALLOT_TEMPLATE = "ballot-template"
+MANIFEST = "manifest"
+TALLY = "tally"
+
+
+def _rest():
+    # sql_only: many-to-ones already in the session, e.g. Question.election, still resolve
+    return raiseload("*", sql_only=True)
+
+
+def _listing(cls: Type) -> Sequence:
+    return (load_only(*[getattr(cls, c.key) for c in cls.__table__.c if c.key in cls.dir_cols]), _rest())
+
+
+def _public(cls: Type) -> Sequence:
+    return tuple(undefer(getattr(cls, c.key)) for c in cls.__table__.c if c.key in cls.public_cols)
+
+
+def _questions(*options) -> Sequence:
+    return (selectinload(Election.questions).options(*options, _rest()), _rest())
+
+
+def _ballot_template() -> Sequence:
+    return _public(Election) + _questions(selectinload(Question.algorithm), selectinload(Question.candidates)
+                                          .options(selectinload(Candidate.party), _rest()))
+
+
+PROFILES: Dict[Text, Dict[Type, Callable[[], Sequence]]] = {
+    DETAIL: {
+        Election: lambda: _public(Election) + _questions(selectinload(Question.candidates).options(_rest())),
+        Question: lambda: (selectinload(Question.candidates).options(_rest()), _rest()),
+    },
+    BALLOT_TEMPLATE: {Election: _ballot_template},
+    MANIFEST: {
+        Election: lambda: _questions(selectinload(Question.algorithm), selectinload(Question.candidates)
+                                     .options(selectinload(Candidate.party), _rest())),
+    },
+    TALLY: {
+        Election: lambda: _questions(selectinload(Question.algorithm),
+                                     selectinload(Question.candidates).options(_rest())),
+        Question: lambda: (selectinload(Question.algorithm), selectinload(Question.candidates).options(_rest()),
+                           _rest()),
+    },
+}
+
+
+def options(cls: Type, profile: Text) -> Sequence:
+    """
+    The loader options for loading `cls` with `profile`. Models the profile
+    doesn't name load with the mapper defaults.
+    """
+    if profile == LISTING:
+        return _listing(cls)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown loading profile {profile!r}")
+    factory = PROFILES[profile].get(cls)
+    return factory() if factory else ()
+
+
+def load(cls: Type, id_: int, profile: Text):
+    """
+    Get a record by id with a loading profile, or None.
+    """
+    return db_get_by_id(cls, id_, options(cls, profile))
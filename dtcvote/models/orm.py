@@ -1,24 +1,30 @@
 import datetime
-from collections import OrderedDict, namedtuple
-from turtle import st
-from typing import Dict, Iterable, List, NoReturn, Set, Text, Tuple, Union
-from unicodedata import name
-from itertools import permutations
-from dtcvote.config import SQLALCHEMY_DATABASE_URI
-from dtcvote.database import commit_or_rollback, db_del, db_exec, db_flush, db_get_by_id, db_get_by_uuid, db_insert, db_connect
-from flask import current_app
-from sqlalchemy import Column, ForeignKey, Identity, MetaData, UniqueConstraint, create_engine
+from hashlib import md5
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, NoReturn, Set, Text, Tuple, Union
+from dtcvote.config import ELECTION_CACHE_SIZE, LIST_MAX_PAGE_SIZE, LIST_PAGE_SIZE, SQLALCHEMY_DATABASE_URI
+from dtcvote.crypto.cache import LRUCache
+from dtcvote.database import commit_or_rollback, db_exec, db_get_by_id, db_get_by_uuid, db_insert, db_connect
+from dtcvote.models.serializers import compile_serializers
+from dtcvote.shuffle import shuffled_content
+from dtcvote.tabulate import tabulate
+from sqlalchemy import DDL, Column, ForeignKey, Identity, Index, Sequence, UniqueConstraint, create_engine, event
 from sqlalchemy import delete as sql_delete
-from sqlalchemy import inspect, select, update
-from sqlalchemy.dialects.postgresql import ARRAY, BYTEA, JSONB, NUMERIC, UUID, TIMESTAMP, array
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, BYTEA, JSONB, NUMERIC, UUID, TIMESTAMP, aggregate_order_by
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.associationproxy import association_proxy
-from sqlalchemy.orm import declarative_base, deferred, registry, relationship
-from sqlalchemy.orm.collections import InstrumentedList
-from sqlalchemy.sql.expression import Select, Update, func, text
-from sqlalchemy.types import Boolean, Integer, Unicode
-from dill import dumps, loads
+from sqlalchemy.orm import declarative_base, deferred, relationship
+from sqlalchemy.sql.expression import Select, func, text
+from sqlalchemy.engine import Row
+from sqlalchemy.types import BigInteger, Boolean, Integer, Unicode
+from dtcvote.codec import decode, encode_content, encode_votes, is_legacy
 
 Base = declarative_base()
+# decoded BallotTemplate content, by (template id, 0): templates are immutable, so
+# there is no newer version for the cache to drop, and keying on the election id
+# would have two template versions of one election evict each other
+template_cache = LRUCache(ELECTION_CACHE_SIZE)
 
 
 class BasicMixin(object):
@@ -48,21 +54,8 @@ class BasicMixin(object):
     ChildRel = namedtuple("ChildRel", ("parent_col", "child_cls", "child_dicts"))
 
     def dict_from_colset(self, listing: bool = False) -> Dict:
-        cols = self.dir_cols if listing else self.public_cols
-        out = dict()
-        for colname in cols:
-            val = getattr(self, colname)
-            if isinstance(val, (datetime.datetime, datetime.date)) and val:
-                out[colname] = val.isoformat()
-            elif (
-                isinstance(val, list)
-                and len(val) > 0
-                and isinstance(val[0], BasicMixin)
-            ):
-                out[colname] = [x.dict_from_colset(listing) for x in val]
-            elif val is not None:
-                out[colname] = val
-        return out
+        # compiled per model and mode in dtcvote.models.serializers
+        return SERIALIZERS[type(self), listing](self)
 
     @classmethod
     def from_dict(cls, d):
@@ -78,16 +71,16 @@ class BasicMixin(object):
         return obj
 
     @classmethod
-    def search(cls) -> List[Dict]:  # noqa: E501
+    def search(cls, after_id: int = 0, limit: int = LIST_PAGE_SIZE) -> List[Dict]:  # noqa: E501
         """get
 
-        Returns all table rows from the system that the user has access to  # noqa: E501
+        Returns a page of table rows from the system that the user has access to,
+        by id after `after_id`, selecting only the listing columns  # noqa: E501
         """
-        x = select(cls)
-        x = db_exec(x).unique().scalars()
-        # current_app.logger.warning([y.__dict__ for y in x])
-        response = [y.dict_from_colset(listing=True) for y in x]
-        return response
+        columns = [c for c in cls.__table__.c if c.key in cls.dir_cols]
+        stmt = select(*columns).where(cls.id > after_id).order_by(cls.id).limit(min(limit, LIST_MAX_PAGE_SIZE))
+        serialize = SERIALIZERS[cls, True]
+        return [serialize(row) for row in db_exec(stmt)]
 
     @classmethod
     def post(
@@ -107,14 +100,15 @@ class BasicMixin(object):
         return response
 
     @classmethod
-    def get(cls, id: int) -> Union[dict, NoReturn]:
+    def get(cls, id: int, options: Iterable = ()) -> Union[dict, NoReturn]:
         """get
 
         Returns a row based on a single id
 
         :param id: id of pet to fetch
+        :param options: loader options, e.g. from dtcvote.models.loading
         """
-        x = db_get_by_id(cls, id)
+        x = db_get_by_id(cls, id, options)
         response = x.dict_from_colset(listing=False) if x else None
         return response
 
@@ -172,10 +166,11 @@ class Election(BasicMixin, Base):
     secret_number = Column(NUMERIC(precision=78, scale=0))
     manifest = deferred(Column(JSONB))
     pickle_jar = deferred(Column(BYTEA))
+    pickle_version = Column(Integer, nullable=False, server_default=text("0"))
     pickle_box = deferred(Column(BYTEA))
     results = deferred(Column(ARRAY(JSONB, dimensions=1)))
     questions = relationship(
-        "Question", backref="election", lazy="joined", order_by="Question.sequence"
+        "Question", backref="election", order_by="Question.sequence"
     )
     ballots = relationship("Ballot", backref="election")
     voters = association_proxy("election_voters", "voter")
@@ -205,20 +200,34 @@ class Election(BasicMixin, Base):
         "results",
     }
 
-    def voters_for_election(self, only_new: bool = False, as_dict: bool=False):
-        if only_new:
-            stmt = select(Voter).join(ElectionVoter).where(
-                ElectionVoter.created_dt > self.opened,
-                ElectionVoter.election_id == self.id
-            )
-            voters = db_exec(stmt).scalars()
-        else:
-            voters = self.voters
+    def voters_for_election(self, only_new: bool = False, as_dict: bool = False):
+        # one query, rather than the association proxy's load per voter
+        voters = db_exec(self._voters_since(self.opened if only_new else None).order_by(Voter.id)).scalars().all()
         if as_dict:
             return [v.dict_from_colset() for v in voters]
         else:
             return voters if voters and len(voters) > 0 else None
 
+    def _voters_since(self, since: datetime.datetime = None) -> Select:
+        stmt = select(Voter).join(ElectionVoter).where(ElectionVoter.election_id == self.id)
+        if since is not None:
+            stmt = stmt.where(ElectionVoter.created_dt > since)
+        return stmt
+
+    def count_voters(self, since: datetime.datetime = None) -> int:
+        """
+        How many voters are in the election, or were added after `since`.
+        """
+        stmt = self._voters_since(since).with_only_columns(func.count(Voter.id))
+        return db_exec(stmt).scalar()
+
+    def voters_page(self, since: datetime.datetime = None, after_id: int = 0, limit: int = 1000) -> List["Voter"]:
+        """
+        The next `limit` voters by id after `after_id`, optionally only those
+        added after `since`, so a long job can resume where it stopped.
+        """
+        stmt = self._voters_since(since).where(Voter.id > after_id).order_by(Voter.id).limit(limit)
+        return db_exec(stmt).scalars().all()
 
     @classmethod
     def put(cls, id: int, request: dict, dry_run: bool = False):
@@ -267,6 +276,9 @@ class Voter(BasicMixin, Base):
     email = Column(Unicode, nullable=False)
     elections = association_proxy("election_voters", "election")
 
+    # voters are matched by email on import; see dtcvote.voter_import
+    __table_args__ = (Index("voter_email_key", func.lower(email), unique=True),)
+
     public_cols = {
         "id",
         "created_dt",
@@ -290,6 +302,8 @@ class ElectionVoter(Base):
         election_id: FK to Election
         voter_id: FK to Voter.
         created_dt: The created_dt of the ElectionVoter.
+        ballot_id: FK to the Ballot generated for the voter, so reminders
+            can go to those who have or haven't voted.
     """
 
     __tablename__ = "election_voter"
@@ -306,9 +320,38 @@ class ElectionVoter(Base):
         nullable=False,
         server_default=func.CURRENT_TIMESTAMP(),
     )
+    ballot_id = Column(Integer, ForeignKey("ballot.id", ondelete="SET NULL"))
     election = relationship(Election, backref="election_voters")
     voter = relationship(Voter, backref="election_voters")
 
+    @classmethod
+    def attach_ballots(cls, election_id: int, voter_ids: List[int], ballot_ids: List[int]) -> NoReturn:
+        """
+        Record which ballot each voter was sent, in one statement.
+        """
+        db_exec(ATTACH_BALLOTS_STMT.bindparams(election_id=election_id, voter_ids=voter_ids, ballot_ids=ballot_ids))
+
+    @classmethod
+    def reminder_page(cls, election_id: int, voted: bool, after_id: int = 0, limit: int = 1000) -> List[Row]:
+        """
+        The next `limit` voters by id after `after_id` who have (or haven't)
+        voted, with their ballot's uuid and secret phrase.
+        """
+        has_voted = (
+            select(BallotCast.ballot_id)
+            .where(BallotCast.election_id == election_id, BallotCast.ballot_id == Ballot.id)
+            .exists()
+        ) | (func.cardinality(Ballot.votes) > 0)
+        stmt = (
+            select(Voter.id, Voter.email, Ballot.uuid, Ballot.secret_phrase)
+            .join(cls, cls.voter_id == Voter.id)
+            .join(Ballot, Ballot.id == cls.ballot_id)
+            .where(cls.election_id == election_id, Voter.id > after_id, has_voted if voted else ~has_voted)
+            .order_by(Voter.id)
+            .limit(limit)
+        )
+        return db_exec(stmt).all()
+
 
 class Algorithm(BasicMixin, Base):
     """
@@ -319,6 +362,8 @@ class Algorithm(BasicMixin, Base):
         created_dt: The created_dt of the Algorithm.
         name: The name of the Algorithm.
         description: The description of the Algorithm
+        ballot_encoding: How ranked questions become ElectionGuard selections,
+            'expanded' or 'compact'; see dtcvote.crypto.encoding.
     """
 
     __tablename__ = "algorithm"
@@ -326,9 +371,10 @@ class Algorithm(BasicMixin, Base):
     name = Column(Unicode, nullable=False)
     description = Column(Unicode, nullable=False)
     instructions = Column(Unicode, nullable=False)
+    ballot_encoding = Column(Unicode, nullable=False, server_default=text("'expanded'"))
 
-    public_cols = {"id", "created_dt", "name", "description", "instructions"}
-    dir_cols = {"id", "created_dt", "name", "description"}
+    public_cols = {"id", "created_dt", "name", "description", "instructions", "ballot_encoding"}
+    dir_cols = {"id", "created_dt", "name", "description", "ballot_encoding"}
 
 
 class Question(BasicMixin, Base):
@@ -357,9 +403,9 @@ class Question(BasicMixin, Base):
     name = Column(Unicode, nullable=False)
     randomize_candidates = Column(Boolean, nullable=False, server_default=text("False"))
     number_of_winners = Column(Integer, nullable=False, server_default=text("1"))
-    algorithm = relationship("Algorithm", lazy="joined")
+    algorithm = relationship("Algorithm")
     candidates = relationship(
-        "Candidate", backref="question", lazy="joined", order_by="Candidate.sequence"
+        "Candidate", backref="question", order_by="Candidate.sequence"
     )
 
     public_cols = {
@@ -379,38 +425,70 @@ class Question(BasicMixin, Base):
         "name",
     }
 
-    def blt(self):
-        election_id = self.election.id
-        question_seq = self.sequence
-        number_of_candidates = len(self.candidates)
-        stmt = select(Ballot).where(Ballot.election_id == election_id)
-        ballots = db_exec(stmt).scalars()
-        blt_string = f"{number_of_candidates} {self.number_of_winners}\n"
-        # count = {p: 0 for p in permutations(range(1, number_of_candidates+1), number_of_candidates)}
-        count = dict()
-
-
-        for b in ballots:
-            votes = loads(b.votes[-1])
-            # this is a list of dict
-            votes_this_q = [v for v in votes if v.get("question_seq") == question_seq]
-            this_blt_key = tuple(v["candidate_seq"] for v in sorted(votes_this_q, key=lambda k: k["rank"]))
-            if this_blt_key in count.keys():
-                count[this_blt_key] += 1
-            else:
-                count[this_blt_key] = 1
-
-        for k, v in count.items():
-            blt_string += f"{str(v)} {' '.join([str(n) for n in k])} 0\n"
-
-        blt_string += "0\n"
-        for c in self.candidates:
-            blt_string += f"\"{c.name}\"\n"
-        blt_string += f"\"{self.name}\"\n"
-        current_app.logger.warning(blt_string)
-        return blt_string
-
-
+    def ballot_groups(self, batch_size: int = 1000, first_choice_only: bool = False) -> Dict[Tuple[int, ...], int]:
+        """
+        Collapse the current vote on every ballot in the election into
+        {ranking: number of ballots}, where ranking is the tuple of
+        candidate sequences for this question in rank order.
+        The aggregation runs in Postgres against ballot_vote, so only the
+        distinct rankings come back.
+
+        :param first_choice_only: Group on the top choice alone, as plurality
+            and majority counts do
+        """
+        if first_choice_only:
+            choices = (
+                select(BallotVote.candidate_seq.label("choice"))
+                .where(BallotVote.election_id == self.election_id, BallotVote.question_seq == self.sequence)
+                .distinct(BallotVote.ballot_id)
+                .order_by(BallotVote.ballot_id, BallotVote.rank)
+                .subquery()
+            )
+            stmt = select(choices.c.choice, func.count()).group_by(choices.c.choice)
+            return {(choice,): n for choice, n in db_exec(stmt)}
+
+        rankings = (
+            select(func.array_agg(aggregate_order_by(BallotVote.candidate_seq, BallotVote.rank)).label("ranking"))
+            .where(BallotVote.election_id == self.election_id, BallotVote.question_seq == self.sequence)
+            .group_by(BallotVote.ballot_id)
+            .subquery()
+        )
+        stmt = (
+            select(rankings.c.ranking, func.count())
+            .group_by(rankings.c.ranking)
+            .execution_options(stream_results=True)
+        )
+        return {tuple(ranking): n for ranking, n in db_exec(stmt).yield_per(batch_size)}
+
+    def iter_blt(self, batch_size: int = 1000) -> Iterator[Text]:
+        """
+        Yield this question's ballots in BLT format, a chunk at a time.
+        """
+        yield f"{len(self.candidates)} {self.number_of_winners}\n"
+        lines = list()
+        for k, v in self.ballot_groups(batch_size).items():
+            lines.append(f"{v} {' '.join(str(n) for n in k)} 0\n")
+            if len(lines) >= batch_size:
+                yield "".join(lines)
+                lines = list()
+        lines.append("0\n")
+        lines.extend(f"\"{c.name}\"\n" for c in self.candidates)
+        lines.append(f"\"{self.name}\"\n")
+        yield "".join(lines)
+
+    def blt(self) -> Text:
+        return "".join(self.iter_blt())
+
+    def tabulate(self) -> List[Dict]:
+        """
+        Count this question in-process with its algorithm.
+        """
+        first_choice_only = self.algorithm.name.lower() in ("plurality", "majority")
+        return tabulate(self.algorithm.name,
+                        self.ballot_groups(first_choice_only=first_choice_only).items(),
+                        [c.sequence for c in self.candidates],
+                        self.number_of_winners,
+                        self.id)
 
 
 class Candidate(BasicMixin, Base):
@@ -471,16 +549,63 @@ class Party(BasicMixin, Base):
     }
 
 
+class BallotTemplate(Base):
+    """
+    The election as a ballot shows it, shared by every ballot generated from
+    it. A new version is saved only when the election's content changes.
+
+    Attrs:
+        election_id: The election.
+        version: 1 for the election's first template, counting up.
+        content: The election's dict_from_colset(), as a codec content blob.
+    """
+
+    __tablename__ = "ballot_template"
+    __table_args__ = (UniqueConstraint("election_id", "version"),)
+
+    id = Column(Integer, Identity(start=1), primary_key=True)
+    created_dt = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.CURRENT_TIMESTAMP())
+    election_id = Column(Integer, ForeignKey("election.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)
+    content = Column(BYTEA, nullable=False)
+
+    @classmethod
+    def for_election(cls, e: Election) -> "BallotTemplate":
+        """
+        The election's latest template, or a new version of it if the
+        election has changed since.
+        """
+        content = encode_content(e.dict_from_colset())
+        stmt = select(cls).where(cls.election_id == e.id).order_by(cls.version.desc()).limit(1)
+        latest = db_exec(stmt).scalar()
+        if latest is not None and latest.content == content:
+            return latest
+        template, = db_insert([cls(election_id=e.id, version=latest.version + 1 if latest else 1, content=content)])
+        return template
+
+    @classmethod
+    def load(cls, template_id: int) -> Dict:
+        """
+        A template's decoded content, cached. Templates never change, and
+        callers must not change the dict they get.
+        """
+        return template_cache.get(
+            (template_id, 0),
+            lambda: decode(db_exec(select(cls.content).where(cls.id == template_id)).scalar_one()))
+
+
 class Ballot(BasicMixin, Base):
     """
     SQLAlchemy model protocol.
 
     Attrs:
         uuid: The uuid of the Ballot.
-        ballot_content: The ballot_content of the Ballot.
-        voted_on: Array of timestamps, from earliest to latest vote. Initializes to empty array.
-        voted: Array of encrypted ballots, from earliest to latest vote. Initializes to empty array.
-        signature: The signature of the Ballot.
+        template_id: The BallotTemplate the ballot shows.
+        shuffle_seed: Seeds the ballot's candidate order; see dtcvote.shuffle.
+        ballot_content: The whole ballot, on ballots generated before templates.
+        voted_on: Legacy array of vote timestamps, from before votes moved to BallotCast.
+        votes: Legacy array of votes, from before votes moved to BallotCast.
+        signature: Legacy signature of the last vote in `votes`.
         election: The election of the Ballot.
 
     """
@@ -493,7 +618,9 @@ class Ballot(BasicMixin, Base):
     uuid = Column(
         UUID(as_uuid=True), nullable=False, server_default=func.gen_random_uuid()
     )
-    ballot_content = Column(BYTEA, nullable=False)
+    template_id = Column(Integer, ForeignKey("ballot_template.id"))
+    shuffle_seed = Column(Integer)
+    ballot_content = Column(BYTEA)
     voted_on = Column(
         ARRAY(TIMESTAMP(timezone=True), dimensions=1, as_tuple=True),
         server_default=text("ARRAY[]::timestamptz[]",),
@@ -510,41 +637,679 @@ class Ballot(BasicMixin, Base):
 
     @classmethod
     def put(cls, uuid, votes, dry_run):
-        b = db_get_by_uuid(Ballot, uuid)
-        if b:
-            # request is a list of dicts with keys 'question_seq', 'candidate_seq', and 'rank'
-            b.votes = b.votes + (dumps(votes),)
-            db_flush()
-            # get md5 hash of this vote
-            stmt = select(text("encode(digest(votes[array_length(votes, 1)], 'md5'::text), 'hex')")).where(Ballot.uuid == b.uuid)
-            b.signature = db_exec(stmt).scalar()
-            b.voted_on = b.voted_on + array((text("CURRENT_TIMESTAMP"),))
-            db_flush()
-            response = b.serialize_response()
+        # request is a list of dicts with keys 'question_seq', 'candidate_seq', and 'rank'
+        if len({(v["question_seq"], v["rank"]) for v in votes}) < len(votes):
+            return 400
+        blob = encode_votes(votes)
+        stmt = CAST_STMT.bindparams(
+            uuid=uuid,
+            votes=blob,
+            signature=md5(blob).hexdigest(),
+            question_seqs=[v["question_seq"] for v in votes],
+            ranks=[v["rank"] for v in votes],
+            candidate_seqs=[v["candidate_seq"] for v in votes],
+        )
+        # lock the ballot before CAST_STMT takes its snapshot, so a re-cast that
+        # committed while this one waited has its choices deleted rather than
+        # left alongside these
+        db_exec(select(Ballot.id).where(Ballot.uuid == uuid).with_for_update())
+        row = db_exec(stmt).first()
+        if row:
             commit_or_rollback(dry_run)
-            return response
+            return dict(signature=row.signature, cast_dt=row.cast_dt)
         else:
             return 418
 
+    def history(self) -> List[Tuple[datetime.datetime, bytes, Text]]:
+        """
+        Every vote cast on this ballot as (cast_dt, votes blob, signature),
+        oldest first, including votes stored on the row before BallotCast.
+        """
+        legacy = [(dt, v, None) for dt, v in zip(self.voted_on or (), self.votes or ())]
+        stmt = (
+            select(BallotCast.cast_dt, BallotCast.votes, BallotCast.signature)
+            .where(BallotCast.election_id == self.election_id, BallotCast.ballot_id == self.id)
+            .order_by(BallotCast.id)
+        )
+        return legacy + [tuple(r) for r in db_exec(stmt)]
+
+    def content(self) -> Dict:
+        """
+        The ballot as its voter sees it: the shared template with the
+        ballot's own candidate order, or the stored content of an older ballot.
+        """
+        if self.template_id is None:
+            return decode(self.ballot_content)
+        return shuffled_content(BallotTemplate.load(self.template_id), self.shuffle_seed)
+
     def serialize_response(self):
+        history = self.history()
+        signature = history[-1][2] if history and history[-1][2] else self.signature
         response = dict(created_dt=self.created_dt,
-                secret_phrase=self.secret_phrase,
-                signature=self.signature,
-                voted_on=self.voted_on,
-                ballot_content=loads(self.ballot_content),
-                votes=[loads(v) for v in self.votes],
-                )
+                        secret_phrase=self.secret_phrase,
+                        signature=signature,
+                        voted_on=[dt for dt, _, _ in history],
+                        ballot_content=self.content(),
+                        votes=[decode(v) for _, v, _ in history])
         return {k: v for k, v in response.items() if v is not None}
 
+    @classmethod
+    def recode(cls, election_id: int = None, batch_size: int = 1000, after_id: int = 0) -> Tuple[int, int]:
+        """
+        Rewrite one batch of ballots still holding dill pickles into the
+        current encodings, in id order starting after `after_id`.
+        A ballot cast while the batch was being converted is left alone
+        and picked up by the next pass. Signatures are not recomputed;
+        they remain the receipts issued when each vote was cast.
+
+        Returns (last id examined, number of ballots rewritten); the last id
+        is 0 once there is nothing left to examine.
+        """
+        stmt = select(Ballot.id, Ballot.ballot_content, Ballot.votes).where(Ballot.id > after_id)
+        if election_id is not None:
+            stmt = stmt.where(Ballot.election_id == election_id)
+        rows = db_exec(stmt.order_by(Ballot.id).limit(batch_size)).all()
+        rewritten = 0
+        for ballot_id, content, votes in rows:
+            if not is_legacy(content) and not any(is_legacy(v) for v in votes):
+                continue
+            new_content = encode_content(decode(content)) if is_legacy(content) else content
+            new_votes = tuple(encode_votes(decode(v)) if is_legacy(v) else v for v in votes)
+            stmt = (
+                update(Ballot)
+                .where(Ballot.id == ballot_id, func.cardinality(Ballot.votes) == len(votes))
+                .values(ballot_content=new_content, votes=new_votes)
+            )
+            rewritten += db_exec(stmt).rowcount
+        return (rows[-1].id if rows else 0), rewritten
+
+
+class BallotCast(Base):
+    """
+    Append-only history of votes cast, list-partitioned by election.
+    Casting a vote is one INSERT here; the ballot row itself is never
+    rewritten, so it stays small however often the voter changes their mind.
+    The current vote is the ballot's row with the highest id.
+
+    Attrs:
+        id: Ever-increasing id of the cast.
+        election_id: FK to Election, and the partition key.
+        ballot_id: FK to Ballot.
+        cast_dt: When the vote was cast.
+        votes: The vote, encoded with dtcvote.codec.encode_votes.
+        signature: md5 hex digest of `votes`, the voter's receipt.
+    """
+
+    __tablename__ = "ballot_cast"
+    __table_args__ = (
+        Index("ix_ballot_cast_current", "election_id", "ballot_id", "id"),
+        {"postgresql_partition_by": "LIST (election_id)"},
+    )
+
+    id = Column(BigInteger, Sequence("ballot_cast_id_seq"), primary_key=True)
+    election_id = Column(
+        Integer, ForeignKey("election.id", ondelete="CASCADE"), primary_key=True
+    )
+    ballot_id = Column(
+        Integer, ForeignKey("ballot.id", ondelete="CASCADE"), nullable=False
+    )
+    cast_dt = Column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=func.CURRENT_TIMESTAMP(),
+    )
+    votes = Column(BYTEA, nullable=False)
+    signature = Column(Unicode, nullable=False)
+
+    @classmethod
+    def add_partition(cls, election_id: int) -> NoReturn:
+        """
+        Give the election its own partition. Called when the election opens.
+        """
+        election_id = int(election_id)
+        db_exec(text(f"CREATE TABLE IF NOT EXISTS ballot_cast_{election_id} "
+                     f"PARTITION OF ballot_cast FOR VALUES IN ({election_id})"))
+
+    @classmethod
+    def append(cls, ballot: Ballot, votes: List[Dict]) -> NoReturn:
+        blob = encode_votes(votes)
+        db_exec(insert(cls).values(election_id=ballot.election_id,
+                                   ballot_id=ballot.id,
+                                   votes=blob,
+                                   signature=md5(blob).hexdigest()))
+
+    @classmethod
+    def current_vote(cls, election_id: int, ballot_id: int):
+        """
+        Expression for the latest cast on a ballot, an index lookup on
+        ix_ballot_cast_current.
+        """
+        return (
+            select(cls.votes)
+            .where(cls.election_id == election_id, cls.ballot_id == ballot_id)
+            .order_by(cls.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+
+# ballots cast in elections opened before their partition was added land here
+event.listen(
+    BallotCast.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS ballot_cast_default PARTITION OF ballot_cast DEFAULT"),
+)
+
+
+class BallotVote(Base):
+    """
+    One ranked choice from the current vote on a ballot, kept alongside
+    Ballot.votes so that counts and BLT exports can aggregate in SQL.
+
+    Attrs:
+        election_id: FK to Election.
+        question_seq: Sequence of the Question voted on.
+        ballot_id: FK to Ballot.
+        rank: Rank the voter gave the candidate.
+        candidate_seq: Sequence of the Candidate.
+    """
+
+    __tablename__ = "ballot_vote"
+    __table_args__ = (
+        Index("ix_ballot_vote_question", "election_id", "question_seq", "ballot_id", "rank", "candidate_seq"),
+        Index("ix_ballot_vote_ballot", "ballot_id"),
+        # checked at the end of each statement, so CAST_STMT can delete a ballot's
+        # choices and insert the new ones in one go; a duplicate fails instead of
+        # being counted twice
+        UniqueConstraint("ballot_id", "question_seq", "rank", deferrable=True, initially="IMMEDIATE"),
+    )
+
+    id = Column(BigInteger, Identity(start=1), primary_key=True)
+    election_id = Column(
+        Integer, ForeignKey("election.id", ondelete="CASCADE"), nullable=False
+    )
+    question_seq = Column(Integer, nullable=False)
+    ballot_id = Column(
+        Integer, ForeignKey("ballot.id", ondelete="CASCADE"), nullable=False
+    )
+    rank = Column(Integer, nullable=False)
+    candidate_seq = Column(Integer, nullable=False)
+
+    @classmethod
+    def replace(cls, ballot: Ballot, votes: List[Dict]) -> None:
+        """
+        Swap the ballot's current choices for `votes`. Holds the ballot row
+        locked until the transaction ends, so concurrent replaces take turns.
+        """
+        db_exec(select(Ballot.id).where(Ballot.id == ballot.id).with_for_update())
+        db_exec(sql_delete(cls).where(cls.ballot_id == ballot.id))
+        rows = [dict(election_id=ballot.election_id,
+                     ballot_id=ballot.id,
+                     question_seq=v["question_seq"],
+                     rank=v["rank"],
+                     candidate_seq=v["candidate_seq"]) for v in votes]
+        if rows:
+            db_exec(insert(cls).values(rows))
+
+    @classmethod
+    def rebuild(cls, election_id: int, batch_size: int = 1000) -> int:
+        """
+        Repopulate the election's choices from the current vote on every
+        ballot, for ballots cast before ballot_vote existed.
+        """
+        db_exec(sql_delete(cls).where(cls.election_id == election_id))
+        last_vote = func.coalesce(BallotCast.current_vote(election_id, Ballot.id),
+                                  Ballot.votes[func.array_length(Ballot.votes, 1)])
+        stmt = (
+            select(Ballot.id, last_vote)
+            .where(Ballot.election_id == election_id, last_vote.isnot(None))
+            .execution_options(stream_results=True)
+        )
+        ballots = 0
+        for partition in db_exec(stmt).yield_per(batch_size).partitions():
+            rows = [dict(election_id=election_id, ballot_id=ballot_id, question_seq=v["question_seq"],
+                         rank=v["rank"], candidate_seq=v["candidate_seq"])
+                    for ballot_id, blob in partition for v in decode(blob)]
+            if rows:
+                db_exec(insert(cls).values(rows))
+            ballots += len(partition)
+        return ballots
+
+
+class ElectionTally(Base):
+    """
+    Checkpoint of an election's running encrypted tally, so that closing the
+    election only needs the final decryption.
+
+    Attrs:
+        election_id: FK to Election; one row per election.
+        accumulator: dtcvote.crypto.tally.TallyAccumulator.to_bytes().
+        ballots: Cast ballots folded into the accumulator.
+        ballot_cast_id: Highest BallotCast.id folded in, where to resume from.
+        updated_dt: When the checkpoint was written.
+    """
+
+    __tablename__ = "election_tally"
+
+    election_id = Column(
+        Integer, ForeignKey("election.id", ondelete="CASCADE"), primary_key=True
+    )
+    accumulator = Column(BYTEA, nullable=False)
+    ballots = Column(Integer, nullable=False, server_default=text("0"))
+    ballot_cast_id = Column(BigInteger)
+    updated_dt = Column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=func.CURRENT_TIMESTAMP(),
+        onupdate=func.CURRENT_TIMESTAMP(),
+    )
+
+    @classmethod
+    def save(cls, election_id: int, accumulator: bytes, ballots: int, ballot_cast_id: int = None) -> NoReturn:
+        stmt = pg_insert(cls).values(election_id=election_id, accumulator=accumulator,
+                                     ballots=ballots, ballot_cast_id=ballot_cast_id)
+        db_exec(stmt.on_conflict_do_update(
+            index_elements=[cls.election_id],
+            set_=dict(accumulator=stmt.excluded.accumulator, ballots=stmt.excluded.ballots,
+                      ballot_cast_id=stmt.excluded.ballot_cast_id, updated_dt=func.CURRENT_TIMESTAMP()),
+        ))
+
+    @classmethod
+    def load(cls, election_id: int) -> Union["ElectionTally", None]:
+        return db_get_by_id(cls, election_id)
+
+    @classmethod
+    def lock(cls, election_id: int, accumulator: bytes, ballots: int) -> "ElectionTally":
+        """
+        The election's checkpoint, locked FOR UPDATE until the transaction
+        ends, saved from `accumulator` first if the election has none yet.
+        """
+        db_exec(pg_insert(cls).values(election_id=election_id, accumulator=accumulator, ballots=ballots)
+                .on_conflict_do_nothing(index_elements=[cls.election_id]))
+        stmt = (
+            select(cls).where(cls.election_id == election_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        return db_exec(stmt).scalar_one()
+
+
+class EncryptedBallot(Base):
+    """
+    ElectionGuard ballots accepted into an election's ballot box, one row per
+    ballot, so that they live in the database rather than in the election's
+    pickle_jar. Backs dtcvote.crypto.store.DatabaseStore.
+
+    Attrs:
+        election_id: FK to Election.
+        object_id: The ballot's ElectionGuard object_id.
+        state: The BallotBoxState value it was accepted with.
+        ballot: The SubmittedBallot, pickled with dill.
+        created_dt: When it was (last) accepted.
+    """
+
+    __tablename__ = "encrypted_ballot"
+
+    election_id = Column(
+        Integer, ForeignKey("election.id", ondelete="CASCADE"), primary_key=True
+    )
+    object_id = Column(Unicode, primary_key=True)
+    state = Column(Integer, nullable=False)
+    ballot = Column(BYTEA, nullable=False)
+    created_dt = Column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=func.CURRENT_TIMESTAMP(),
+    )
+
+    @classmethod
+    def fetch(cls, election_id: int, object_id: Text) -> Union[bytes, None]:
+        return db_exec(select(cls.ballot).where(cls.election_id == election_id,
+                                                cls.object_id == object_id)).scalar()
+
+    @classmethod
+    def store(cls, election_id: int, object_id: Text, state: int, ballot: bytes) -> NoReturn:
+        stmt = pg_insert(cls).values(election_id=election_id, object_id=object_id, state=state, ballot=ballot)
+        db_exec(stmt.on_conflict_do_update(
+            index_elements=[cls.election_id, cls.object_id],
+            set_=dict(state=stmt.excluded.state, ballot=stmt.excluded.ballot,
+                      created_dt=func.CURRENT_TIMESTAMP()),
+        ))
+
+    @classmethod
+    def remove(cls, election_id: int, object_id: Text = None) -> Union[bytes, None]:
+        """
+        Delete one ballot and return it, or every ballot in the election when
+        object_id is None.
+        """
+        stmt = sql_delete(cls).where(cls.election_id == election_id)
+        if object_id is None:
+            db_exec(stmt)
+            return None
+        return db_exec(stmt.where(cls.object_id == object_id).returning(cls.ballot)).scalar()
+
+    @classmethod
+    def count(cls, election_id: int) -> int:
+        return db_exec(select(func.count()).select_from(cls).where(cls.election_id == election_id)).scalar()
+
+    @classmethod
+    def stream(cls, election_id: int, columns: Tuple = None, batch_size: int = 1000) -> Iterator[Tuple]:
+        """
+        Every ballot in the election, read through a server-side cursor
+        `batch_size` rows at a time.
+        """
+        stmt = (
+            select(*(columns or (cls.object_id, cls.ballot)))
+            .where(cls.election_id == election_id)
+            .order_by(cls.object_id)
+            .execution_options(stream_results=True)
+        )
+        yield from db_exec(stmt).yield_per(batch_size)
+
+
+class Job(BasicMixin, Base):
+    """
+    A long election operation run by a worker process (see dtcvote.jobs)
+    instead of inside the HTTP request that asked for it.
+
+    Attrs:
+        kind: The handler to run, e.g. "generate-ballots", "count" or "export".
+        election_id: FK to the Election it works on.
+        params: The request's options for the handler.
+        state: queued, running, done or failed.
+        progress: Units of work done so far.
+        total: Units of work expected, when known.
+        checkpoint: Handler state saved with each chunk, to resume from.
+        result: What the handler returned.
+        error: Why the job failed.
+        attempts: How many times a worker has claimed it.
+        worker: The worker holding it while running.
+        heartbeat_dt: When that worker last showed it was alive.
+        started_dt: When a worker first claimed it.
+        finished_dt: When it was done or failed.
+    """
+
+    __tablename__ = "job"
+
+    kind = Column(Unicode, nullable=False)
+    election_id = Column(Integer, ForeignKey("election.id", ondelete="CASCADE"))
+    params = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    state = Column(Unicode, nullable=False, server_default=text("'queued'"))
+    progress = Column(Integer, nullable=False, server_default=text("0"))
+    total = Column(Integer)
+    checkpoint = deferred(Column(JSONB))
+    result = deferred(Column(JSONB))
+    error = Column(Unicode)
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    worker = Column(Unicode)
+    heartbeat_dt = Column(TIMESTAMP(timezone=True))
+    started_dt = Column(TIMESTAMP(timezone=True))
+    finished_dt = Column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (Index("job_state_idx", "state", "id"),)
+
+    public_cols = {
+        "id",
+        "created_dt",
+        "kind",
+        "election_id",
+        "params",
+        "state",
+        "progress",
+        "total",
+        "result",
+        "error",
+        "attempts",
+        "heartbeat_dt",
+        "started_dt",
+        "finished_dt",
+    }
+    dir_cols = {"id", "created_dt", "kind", "election_id", "state", "progress", "total"}
+
+    @classmethod
+    def enqueue(cls, kind: Text, election_id: int, params: Dict = None) -> "Job":
+        """
+        Queue a job, or return the one of the same kind and params already
+        queued or running for the election.
+        """
+        params = params or dict()
+        stmt = select(cls).where(cls.kind == kind, cls.election_id == election_id, cls.params == params,
+                                 cls.state.in_(("queued", "running")))
+        job = db_exec(stmt.order_by(cls.id).limit(1)).scalar()
+        if job is None:
+            job, = db_insert([cls(kind=kind, election_id=election_id, params=params)])
+        return job
+
+    @classmethod
+    def claim(cls, worker: Text, stale_after: int, max_attempts: int) -> Union["Job", None]:
+        """
+        Take the oldest queued job, or a running one whose worker has stopped
+        sending heartbeats, skipping rows another worker has locked. Jobs that
+        have already been retried `max_attempts` times are failed instead.
+        The caller commits.
+        """
+        stale = cls.heartbeat_dt < func.CURRENT_TIMESTAMP() - datetime.timedelta(seconds=stale_after)
+        db_exec(update(cls)
+                .where(cls.state == "running", stale, cls.attempts >= max_attempts)
+                .values(state="failed", error="Its worker stopped too many times", finished_dt=func.CURRENT_TIMESTAMP())
+                .execution_options(synchronize_session=False))
+        stmt = (
+            select(cls)
+            .where((cls.state == "queued") | ((cls.state == "running") & stale))
+            .order_by(cls.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = db_exec(stmt).scalar()
+        if job is not None:
+            job.state = "running"
+            job.worker = worker
+            job.attempts += 1
+            job.heartbeat_dt = func.CURRENT_TIMESTAMP()
+            job.started_dt = job.started_dt or func.CURRENT_TIMESTAMP()
+        return job
+
+    def advance(self, progress: int, checkpoint: Dict, total: int = None) -> bool:
+        """
+        Record a chunk's progress in the chunk's own transaction. False if
+        another worker has taken the job over, in which case the caller
+        must roll back and stop.
+        """
+        values = dict(progress=progress, checkpoint=checkpoint, heartbeat_dt=func.CURRENT_TIMESTAMP())
+        if total is not None:
+            values["total"] = total
+        stmt = update(Job).where(Job.id == self.id, Job.worker == self.worker).values(**values)
+        return db_exec(stmt.execution_options(synchronize_session="fetch")).rowcount == 1
+
+    def finish(self, result=None, error: Text = None) -> None:
+        self.state = "failed" if error else "done"
+        self.result = result
+        self.error = error
+        self.finished_dt = func.CURRENT_TIMESTAMP()
+
+    @classmethod
+    def heartbeat(cls, connection, job_id: int, worker: Text) -> bool:
+        """
+        Show the job's worker is alive, on a connection of its own so it
+        works while the worker's session is busy.
+        """
+        stmt = (update(cls).where(cls.id == job_id, cls.worker == worker, cls.state == "running")
+                .values(heartbeat_dt=func.CURRENT_TIMESTAMP()))
+        return connection.execute(stmt).rowcount == 1
+
+
+class OutboundEmail(BasicMixin, Base):
+    """
+    Queue of emails to send, drained by the sender threads in dtcvote.mail.
+
+    Attrs:
+        election_id: FK to the Election the email is about.
+        kind: vote, voted or not_voted.
+        email_from: The From address.
+        email_to: The To address.
+        subject: The Subject.
+        body: The plain text body.
+        state: queued, sending, sent or failed.
+        attempts: Delivery attempts so far.
+        next_attempt_dt: When it may next be tried, after backing off.
+        last_error: The relay's answer to the last failed attempt.
+        claimed_by: The sender that last took it.
+        claimed_dt: When it was taken; a sender that dies leaves it to be
+            taken again after MAIL_CLAIM_TIMEOUT.
+        sent_dt: When the relay accepted it.
+    """
+
+    __tablename__ = "outbound_email"
+
+    election_id = Column(Integer, ForeignKey("election.id", ondelete="CASCADE"))
+    kind = Column(Unicode, nullable=False)
+    email_from = Column(Unicode, nullable=False)
+    email_to = Column(Unicode, nullable=False)
+    subject = Column(Unicode, nullable=False)
+    body = Column(Unicode, nullable=False)
+    state = Column(Unicode, nullable=False, server_default=text("'queued'"))
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    next_attempt_dt = Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.CURRENT_TIMESTAMP())
+    last_error = Column(Unicode)
+    claimed_by = Column(Unicode)
+    claimed_dt = Column(TIMESTAMP(timezone=True))
+    sent_dt = Column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (Index("outbound_email_due_idx", "state", "next_attempt_dt"),)
+
+    @classmethod
+    def enqueue(cls, rows: List[Dict]) -> int:
+        """
+        Queue emails given as dicts of election_id, kind, email_from,
+        email_to, subject and body, in the caller's transaction.
+        """
+        if not rows:
+            return 0
+        db_exec(insert(cls).values(rows))
+        return len(rows)
+
+    @classmethod
+    def claim(cls, sender: Text, limit: int, claim_timeout: int) -> List[Row]:
+        """
+        Take up to `limit` emails that are due, oldest first, skipping any
+        another sender has locked. The caller commits.
+        """
+        now = func.CURRENT_TIMESTAMP()
+        due = (
+            select(cls.id)
+            .where(((cls.state == "queued") & (cls.next_attempt_dt <= now))
+                   | ((cls.state == "sending") & (cls.claimed_dt < now - datetime.timedelta(seconds=claim_timeout))))
+            .order_by(cls.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .cte("due")
+        )
+        stmt = (
+            update(cls)
+            .where(cls.id == due.c.id)
+            .values(state="sending", claimed_by=sender, claimed_dt=now)
+            .returning(cls.id, cls.email_from, cls.email_to, cls.subject, cls.body)
+            .execution_options(synchronize_session=False)
+        )
+        return sorted(db_exec(stmt).all())
+
+    @classmethod
+    def settle(cls, sent: List[int], retry: List[Tuple[int, Text]], failed: List[Tuple[int, Text]],
+               max_attempts: int, backoff: int) -> NoReturn:
+        """
+        Record a batch's outcome. Emails to retry wait backoff * 2^attempts
+        seconds, give or take a quarter, and fail after `max_attempts`.
+        """
+        if sent:
+            db_exec(update(cls).where(cls.id.in_(sent))
+                    .values(state="sent", attempts=cls.attempts + 1, sent_dt=func.CURRENT_TIMESTAMP(),
+                            last_error=None)
+                    .execution_options(synchronize_session=False))
+        for outcome, rows in (("retry", retry), ("failed", failed)):
+            if rows:
+                ids, errors = zip(*rows)
+                db_exec(SETTLE_STMT.bindparams(ids=list(ids), errors=list(errors), fail=outcome == "failed",
+                                               max_attempts=max_attempts, backoff=backoff))
+
+
+# Cast a vote in one round trip: find the ballot in an election that is still
+# open, append the vote to its history and swap its ballot_vote rows.
+# Every data-modifying CTE runs exactly once, whether or not it is referenced.
+CAST_STMT = text("""
+    WITH b AS (
+        SELECT ballot.id, ballot.election_id
+        FROM ballot JOIN election ON election.id = ballot.election_id
+        WHERE ballot.uuid = :uuid
+          AND (election.closed IS NULL OR election.closed > CURRENT_TIMESTAMP)
+        FOR UPDATE OF ballot
+    ), c AS (
+        INSERT INTO ballot_cast (id, election_id, ballot_id, votes, signature)
+        SELECT nextval('ballot_cast_id_seq'), b.election_id, b.id, :votes, :signature FROM b
+        RETURNING election_id, ballot_id, cast_dt, signature
+    ), d AS (
+        DELETE FROM ballot_vote USING c WHERE ballot_vote.ballot_id = c.ballot_id
+    ), v AS (
+        INSERT INTO ballot_vote (election_id, ballot_id, question_seq, rank, candidate_seq)
+        SELECT c.election_id, c.ballot_id, x.question_seq, x.rank, x.candidate_seq
+        FROM c, unnest(:question_seqs, :ranks, :candidate_seqs) AS x(question_seq, rank, candidate_seq)
+    )
+    SELECT c.signature, c.cast_dt FROM c
+""").bindparams(
+    bindparam("uuid", type_=UUID(as_uuid=True)),
+    bindparam("votes", type_=BYTEA),
+    bindparam("question_seqs", type_=ARRAY(Integer)),
+    bindparam("ranks", type_=ARRAY(Integer)),
+    bindparam("candidate_seqs", type_=ARRAY(Integer)),
+).columns(signature=Unicode, cast_dt=TIMESTAMP(timezone=True))
+
+
+ATTACH_BALLOTS_STMT = text("""
+    UPDATE election_voter SET ballot_id = x.ballot_id
+    FROM unnest(:voter_ids, :ballot_ids) AS x(voter_id, ballot_id)
+    WHERE election_voter.election_id = :election_id AND election_voter.voter_id = x.voter_id
+""").bindparams(
+    bindparam("voter_ids", type_=ARRAY(Integer)),
+    bindparam("ballot_ids", type_=ARRAY(Integer)),
+)
+
+
+# Back off or fail a batch of emails, each with its own error, in one statement.
+SETTLE_STMT = text("""
+    UPDATE outbound_email SET
+        attempts = attempts + 1,
+        last_error = x.error,
+        state = CASE WHEN :fail OR attempts + 1 >= :max_attempts THEN 'failed' ELSE 'queued' END,
+        next_attempt_dt = CURRENT_TIMESTAMP
+            + make_interval(secs => :backoff * power(2, attempts) * (0.75 + random() / 2))
+    FROM unnest(:ids, :errors) AS x(id, error)
+    WHERE outbound_email.id = x.id
+""").bindparams(
+    bindparam("ids", type_=ARRAY(Integer)),
+    bindparam("errors", type_=ARRAY(Unicode)),
+)
+
+
+# after every model, so the mappers can be configured
+SERIALIZERS = compile_serializers(BasicMixin.__subclasses__())
 
 
 def init_db():
     db_engine = create_engine(SQLALCHEMY_DATABASE_URI, echo=True, future=True)
     Base.metadata.create_all(db_engine)
-    algs = [Algorithm(name="plurality", description="Traditional first-past-the-post voting. Each voter gets one vote and the candidate with the most votes wins.", instructions="Vote for one candidate."),
-            Algorithm(name="majority", description="Same as plurality, but a winner is declared only if a candidate receives >50% of votes cast.", instructions="Vote for one candidate."),
-            Algorithm(name="rcv", description="Instant Runoff Ranked Choice Voting", instructions="Rank the candidates according to your preference, with 1 being your most preferred."),
-            ]
+    rank = "Rank the candidates according to your preference, with 1 being your most preferred."
+    algs = [Algorithm(name="plurality",
+                      description="Traditional first-past-the-post voting. "
+                                  "Each voter gets one vote and the candidate with the most votes wins.",
+                      instructions="Vote for one candidate."),
+            Algorithm(name="majority",
+                      description="Same as plurality, but a winner is declared only if a candidate receives "
+                                  ">50% of votes cast.",
+                      instructions="Vote for one candidate."),
+            Algorithm(name="rcv", description="Instant Runoff Ranked Choice Voting", instructions=rank),
+            Algorithm(name="rcv-compact",
+                      description="Instant Runoff Ranked Choice Voting, with the compact ballot encoding for large "
+                                  "fields of candidates",
+                      instructions=rank, ballot_encoding="compact")]
     election = Election(questions=[Question(candidates=[Candidate(sequence=1, name="Mayela"),
                                                         Candidate(sequence=2, name="Christina"),
                                                         Candidate(sequence=3, name="Nathan"),
@@ -554,8 +1319,7 @@ def init_db():
                                             name="Who is the fairest one of all?",
                                             number_of_winners=1,
                                             sequence=1,
-                                            randomize_candidates=True)
-                                    ],
+                                            randomize_candidates=True)],
                         deadline="2021-04-28T01:10:08.107Z",
                         name="The Apple of Discord",
                         secret_ballot=False,
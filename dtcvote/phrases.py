@@ -0,0 +1,108 @@
+import mmap
+import secrets
+from array import array
+from functools import lru_cache
+from itertools import product
+from typing import Iterable, List, Optional, Set, Text
+
+WORDS_FILE = "/usr/share/dict/words"
+MIN_WORD_LENGTH = 3
+MAX_WORD_LENGTH = 10
+
+CONSONANTS = "bdfghjklmnprstvz"
+VOWELS = "aeiou"
+
+
+class WordList(object):
+    """
+    A read-only, indexed list of words.
+
+    Words are read from a memory-mapped dictionary file when one is available.
+    Only the offsets and lengths of usable words are kept in memory, packed
+    into arrays, so the list costs a few bytes per word no matter how large
+    the dictionary is. Hosts without a dictionary get a synthetic list of
+    pronounceable three-syllable words computed from their index.
+    """
+
+    def __init__(self, path: Optional[Text] = WORDS_FILE):
+        self._mmap = None
+        self._offsets = array("L")
+        self._lengths = array("B")
+        self._syllables = None
+        try:
+            with open(path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, TypeError, ValueError):
+            self._syllables = ["".join(s) for s in product(CONSONANTS, VOWELS)]
+        else:
+            self._index()
+
+    def _index(self):
+        m = self._mmap
+        start = 0
+        size = len(m)
+        while start < size:
+            end = m.find(b"\n", start)
+            if end == -1:
+                end = size
+            length = end - start
+            if MIN_WORD_LENGTH <= length <= MAX_WORD_LENGTH:
+                word = m[start:end]
+                if word.isalpha() and word.islower():
+                    self._offsets.append(start)
+                    self._lengths.append(length)
+            start = end + 1
+        if not self._offsets:
+            self._mmap.close()
+            self._mmap = None
+            self._syllables = ["".join(s) for s in product(CONSONANTS, VOWELS)]
+
+    def __len__(self) -> int:
+        if self._syllables is not None:
+            return len(self._syllables) ** 3
+        return len(self._offsets)
+
+    def __getitem__(self, i: int) -> Text:
+        if self._syllables is not None:
+            n = len(self._syllables)
+            return self._syllables[i // (n * n)] + self._syllables[(i // n) % n] + self._syllables[i % n]
+        start = self._offsets[i]
+        return self._mmap[start:start + self._lengths[i]].decode("ascii")
+
+
+@lru_cache(maxsize=None)
+def word_list(path: Optional[Text] = WORDS_FILE) -> WordList:
+    """
+    Load and index the word list once per process.
+    """
+    return WordList(path)
+
+
+def random_phrases(count: int, taken: Iterable[Text] = (), words: Optional[WordList] = None) -> List[Text]:
+    """
+    Draw `count` two-word phrases that are unique among themselves and
+    among the `taken` phrases already issued for an election. A set passed
+    as `taken` is used as it is and gains the new phrases, so drawing in
+    batches doesn't copy every phrase issued so far for each batch.
+
+    Each phrase is a single `secrets.randbelow` draw over every ordered pair
+    of distinct words, so a draw is O(1). Collisions are re-drawn, which is cheap
+    because the number of phrases is kept below half of the possible pairs.
+    """
+    words = words if words is not None else word_list()
+    n = len(words)
+    space = n * (n - 1)
+    seen: Set[Text] = taken if isinstance(taken, set) else set(taken)
+    if len(seen) + count > space // 2:
+        raise ValueError(f"Cannot draw {count} unique phrases from {n} words")
+    phrases = list()
+    while len(phrases) < count:
+        i = secrets.randbelow(space)
+        first, second = divmod(i, n - 1)
+        if second >= first:
+            second += 1
+        phrase = f"{words[first]} {words[second]}"
+        if phrase not in seen:
+            seen.add(phrase)
+            phrases.append(phrase)
+    return phrases
@@ -0,0 +1,44 @@
+"""
+Seeded candidate order for ballots.
+
+A ballot stores its election's shared BallotTemplate and a small seed
+rather than a shuffled copy of the whole election. Its view is rebuilt from
+the two when the ballot is read.
+
+The permutation is a Fisher-Yates shuffle driven only by random.Random's
+random(). Python guarantees that method's sequence for a given seed across
+versions, whereas shuffle() and sample() may change, so a stored seed
+keeps producing the order its voter was first shown.
+"""
+import random
+from typing import Dict, List, Sequence
+
+SEED_BITS = 31
+
+
+def new_seed() -> int:
+    return random.getrandbits(SEED_BITS)
+
+
+def permuted(items: Sequence, rng: random.Random) -> List:
+    out = list(items)
+    for i in range(len(out) - 1, 0, -1):
+        j = int(rng.random() * (i + 1))
+        out[i], out[j] = out[j], out[i]
+    return out
+
+
+def shuffled_content(ballot_content: Dict, seed: int) -> Dict:
+    """
+    Return a copy of the ballot content with candidates shuffled on every
+    question that asks for it, in question order from one generator seeded
+    with `seed`. Only the questions list and the shuffled candidate lists
+    are copied; everything else is shared with the original.
+    """
+    rng = random.Random(seed)
+    questions = list()
+    for q in ballot_content.get("questions", list()):
+        if q.get("randomize_candidates"):
+            q = dict(q, candidates=permuted(q["candidates"], rng))
+        questions.append(q)
+    return dict(ballot_content, questions=questions)
@@ -0,0 +1,243 @@
+"""
+In-process counting of one question's aggregated ballots.
+
+Every tabulator returns one row per candidate per round with the
+candidate's votes and one of these statuses:
+
+- elected, defeated: the outcome, in the last round;
+- runoff: one of the two candidates a majority count sends to a runoff;
+- eliminated: out of an RCV count after this round;
+- continuing: still in the RCV count;
+- tie: tied with others for a place the count can't break. Nobody is
+  chosen by sequence; the count stops, and the tie has to be settled
+  outside it, e.g. by lot.
+
+No votes means no winner: every candidate is defeated.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+BallotGroup = Tuple[Tuple[int, ...], int]
+
+
+class BallotGroups(object):
+    """
+    Aggregated ballots for one question as NumPy arrays.
+
+    Identical rankings are collapsed into a single row with a weight, so the
+    arrays grow with the number of distinct rankings, not with turnout.
+
+    Attrs:
+        rankings: (groups x max rank) array of candidate sequences in rank
+            order, padded with 0 for unranked positions.
+        weights: Number of ballots in each group.
+        sequences: Candidate sequences on the question.
+    """
+
+    def __init__(self, groups: Iterable[BallotGroup], sequences: Sequence[int]):
+        groups = [(k, v) for k, v in groups if len(k) > 0]
+        width = max((len(k) for k, _ in groups), default=1)
+        self.rankings = np.zeros((len(groups), width), dtype=np.int32)
+        self.weights = np.zeros(len(groups), dtype=np.int64)
+        for i, (ranking, weight) in enumerate(groups):
+            self.rankings[i, :len(ranking)] = ranking
+            self.weights[i] = weight
+        self.sequences = list(sequences)
+        self.size = max(self.sequences + [int(self.rankings.max(initial=0))]) + 1
+
+    def choices(self, eliminated: np.ndarray) -> np.ndarray:
+        """
+        Each group's highest ranked candidate that has not been eliminated,
+        or 0 for an exhausted group.
+        """
+        skip = eliminated[self.rankings] | (self.rankings == 0)
+        live = ~skip
+        has_choice = live.any(axis=1)
+        choice = self.rankings[np.arange(len(self.rankings)), live.argmax(axis=1)]
+        return np.where(has_choice, choice, 0)
+
+    def first_choices(self, eliminated: np.ndarray, values: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Tally each group for its highest ranked candidate that has not been
+        eliminated. Index 0 of the result holds the exhausted ballots.
+
+        :param values: What each group's ballots are still worth, as a
+            fraction, after surplus transfers; whole by default
+        """
+        weights = self.weights if values is None else self.weights * values
+        tally = np.bincount(self.choices(eliminated), weights=weights, minlength=self.size)
+        return tally.astype(np.int64) if values is None else tally
+
+
+def _votes(votes) -> Union[int, float]:
+    votes = float(votes)
+    return int(votes) if votes.is_integer() else round(votes, 6)
+
+
+def _row(question_id: int, rnd: int, sequence: int, votes, redistributed, status: str) -> Dict:
+    return dict(question_id=question_id, round=rnd, sequence=sequence,
+                votes=_votes(votes), votes_redistributed=_votes(redistributed), status=status)
+
+
+def _top(ranked: List[int], tally: np.ndarray, n: int) -> Tuple[Set[int], Set[int]]:
+    """
+    The first `n` of `ranked` (sorted by descending tally), as (chosen, tied):
+    when candidates tie across the cut, those above it are chosen and those
+    on it are tied.
+    """
+    if n >= len(ranked):
+        return set(ranked), set()
+    if n <= 0:
+        return set(), set()
+    cut = tally[ranked[n - 1]]
+    if tally[ranked[n]] != cut:
+        return set(ranked[:n]), set()
+    return {s for s in ranked if tally[s] > cut}, {s for s in ranked if tally[s] == cut}
+
+
+def _no_votes(groups: BallotGroups, question_id: int) -> List[Dict]:
+    return [_row(question_id, 1, s, 0, 0, "defeated") for s in groups.sequences]
+
+
+def plurality(groups: BallotGroups, number_of_winners: int, question_id: int) -> List[Dict]:
+    """
+    First-past-the-post: the candidates with the most first choices win.
+    """
+    tally = groups.first_choices(np.zeros(groups.size, dtype=bool))
+    if not tally[groups.sequences].any():
+        return _no_votes(groups, question_id)
+    ranked = sorted(groups.sequences, key=lambda s: -tally[s])
+    winners, tied = _top(ranked, tally, number_of_winners)
+    return [_row(question_id, 1, s, tally[s], 0, "elected" if s in winners else "tie" if s in tied else "defeated")
+            for s in ranked]
+
+
+def majority(groups: BallotGroups, number_of_winners: int, question_id: int) -> List[Dict]:
+    """
+    Plurality, but a candidate is elected only with more than half of the
+    votes cast. Without a majority the top two candidates go to a runoff.
+    """
+    tally = groups.first_choices(np.zeros(groups.size, dtype=bool))
+    total = int(tally[groups.sequences].sum())
+    if not total:
+        return _no_votes(groups, question_id)
+    ranked = sorted(groups.sequences, key=lambda s: -tally[s])
+    if tally[ranked[0]] * 2 > total:
+        statuses = {ranked[0]: "elected"}
+    else:
+        runoff, tied = _top(ranked, tally, 2)
+        statuses = {s: "tie" if s in tied else "runoff" for s in runoff | tied}
+    return [_row(question_id, 1, s, tally[s], 0, statuses.get(s, "defeated")) for s in ranked]
+
+
+def _last(continuing: List[int], history: List[np.ndarray], seats: int) -> Tuple[Set[int], Set[int]]:
+    """
+    Who to eliminate, as (eliminated, tied). Ties for last place are broken
+    by the most recent earlier round that separates them. Candidates still
+    tied are eliminated together when their votes combined are fewer than
+    anyone else's, so the order can't matter, and enough candidates remain
+    for the open seats; otherwise they are tied.
+    """
+    key = {s: tuple(h[s] for h in reversed(history)) for s in continuing}
+    lowest = min(key.values())
+    last = {s for s in continuing if key[s] == lowest}
+    if len(last) == 1:
+        return last, set()
+    tally = history[-1]
+    others = [tally[s] for s in continuing if s not in last]
+    if others and sum(tally[s] for s in last) < min(others) and len(continuing) - len(last) >= seats:
+        return last, set()
+    return set(), last
+
+
+def rcv(groups: BallotGroups, number_of_winners: int, question_id: int) -> List[Dict]:
+    """
+    Instant runoff, or for more than one seat the single transferable vote.
+    Each round re-tallies every ballot group for its highest continuing
+    choice in one vectorized pass.
+
+    With one seat, a candidate holding a majority of the continuing ballots
+    is elected; otherwise the last-place candidate is eliminated.
+
+    With more, the quota is the Droop quota of the first round's votes, in
+    its exact form: more than votes / (seats + 1). Candidates over it are
+    elected, and the ballots counting for each pass on to their next
+    continuing choice at the fraction (votes - quota) / votes of their
+    value, so only the surplus transfers. A round without anyone over the
+    quota eliminates the last-place candidate. Once the open seats can
+    take every continuing candidate, they are all elected.
+    """
+    seats = max(number_of_winners, 1)
+    out = np.ones(groups.size, dtype=bool)
+    out[groups.sequences] = False
+    values = np.ones(len(groups.weights)) if seats > 1 else None
+    history = list()
+    previous = None
+    rows = list()
+    quota = None
+    elected = 0
+    rnd = 1
+    while True:
+        tally = groups.first_choices(out, values)
+        history.append(tally)
+        continuing = [s for s in groups.sequences if not out[s]]
+        if not continuing:
+            return rows
+        total = tally[continuing].sum()
+        if rnd == 1 and not total:
+            return _no_votes(groups, question_id)
+        open_seats = seats - elected
+        winners, losers, tied = set(), set(), set()
+        if len(continuing) <= open_seats:
+            winners = set(continuing)
+        elif seats == 1:
+            leader = max(continuing, key=lambda s: tally[s])
+            if tally[leader] * 2 > total:
+                winners = {leader}
+        else:
+            quota = total / (seats + 1) if quota is None else quota
+            winners = {s for s in continuing if tally[s] > quota}
+        if not winners:
+            losers, tied = _last(continuing, history, open_seats)
+        for s in continuing:
+            redistributed = 0 if previous is None else tally[s] - previous[s]
+            status = ("elected" if s in winners else "eliminated" if s in losers else "tie" if s in tied
+                      else "continuing")
+            rows.append(_row(question_id, rnd, s, tally[s], redistributed, status))
+        elected += len(winners)
+        if tied or elected >= seats:
+            return rows
+        if winners and values is not None:
+            choices = groups.choices(out)
+            for s in winners:
+                values[choices == s] *= (tally[s] - quota) / tally[s]
+        out[list(winners | losers)] = True
+        previous = tally
+        rnd += 1
+
+
+TABULATORS: Dict[str, Callable[[BallotGroups, int, int], List[Dict]]] = {
+    "plurality": plurality,
+    "majority": majority,
+    "rcv": rcv,
+    # rcv with the compact ballot encoding (dtcvote.crypto.encoding); counted the same way
+    "rcv-compact": rcv,
+}
+
+
+def tabulate(algorithm: str, groups: Iterable[BallotGroup], sequences: Sequence[int],
+             number_of_winners: int, question_id: int) -> List[Dict]:
+    """
+    Count one question with the named algorithm.
+
+    :param algorithm: Name of the Algorithm row, e.g. 'rcv'
+    :param groups: (ranking, weight) pairs, as aggregated by Question.ballot_groups
+    :param sequences: Candidate sequences on the question
+    :param number_of_winners: Seats to fill
+    :param question_id: Question id to stamp on every result row
+    """
+    tabulator = TABULATORS.get(algorithm.lower())
+    if tabulator is None:
+        raise ValueError(f"No tabulator for algorithm {algorithm}")
+    return tabulator(BallotGroups(groups, sequences), number_of_winners, question_id)
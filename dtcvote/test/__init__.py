@@ -0,0 +1,35 @@
+import unittest
+
+from flask import Flask
+from flask_testing import TestCase
+from sqlalchemy.exc import OperationalError
+
+from dtcvote import config
+from dtcvote.database import db_connect, db_engine
+from dtcvote.models.orm import Base
+
+
+class BaseTestCase(TestCase):
+    """
+    A Flask app with a thread-local session on SQLALCHEMY_DATABASE_URI.
+    Whatever a test writes is rolled back after it. The tests are skipped
+    when the database can't be reached.
+    """
+
+    def create_app(self) -> Flask:
+        app = Flask(__name__)
+        app.config.from_object(config)
+        app.db_session = db_connect()
+        return app
+
+    @classmethod
+    def setUpClass(cls):
+        db_engine.echo = False
+        try:
+            Base.metadata.create_all(db_engine)
+        except OperationalError as err:
+            raise unittest.SkipTest(f"database unavailable: {err}")
+
+    def tearDown(self):
+        self.app.db_session.rollback()
+        self.app.db_session.remove()
@@ -0,0 +1,72 @@
+from flask import current_app
+from sqlalchemy.exc import InvalidRequestError
+
+from dtcvote.ballot import BasicBallot
+from dtcvote.controllers.election import generate_manifest
+from dtcvote.database import count_statements, db_insert
+from dtcvote.models.loading import BALLOT_TEMPLATE, DETAIL, LISTING, MANIFEST, TALLY, load
+from dtcvote.models.orm import Algorithm, Candidate, Election, Party, Question
+from dtcvote.test import BaseTestCase
+
+
+def make_election(questions: int, candidates: int) -> int:
+    algorithm, = db_insert([Algorithm(name="rcv", description="test", instructions="Rank them")])
+    parties = db_insert([Party(sequence=i, name=f"Party {i}") for i in range(1, 4)])
+    e, = db_insert([Election(name=f"loading-{questions}x{candidates}", vote_email="Vote")])
+    qs = db_insert([Question(election_id=e.id, algorithm_id=algorithm.id, sequence=i, name=f"Question {i}")
+                    for i in range(1, questions + 1)])
+    db_insert([Candidate(question_id=q.id, sequence=i, name=f"Candidate {i}", party_id=parties[i % 3].id)
+               for q in qs for i in range(1, candidates + 1)])
+    return e.id
+
+
+def tally_walk(e: Election):
+    return [(q.algorithm.name, [c.sequence for c in q.candidates]) for q in e.questions]
+
+
+class TestLoadingProfiles(BaseTestCase):
+    """
+    Each profile loads an election for its callers in a fixed number of
+    statements, whatever the election's size.
+    """
+
+    def statements(self, election_id: int, profile: str, use) -> int:
+        current_app.db_session.expunge_all()
+        with count_statements() as statements:
+            use(load(Election, election_id, profile))
+        return len(statements)
+
+    def assertStatements(self, profile: str, use, expected: int):
+        for questions, candidates in ((1, 2), (6, 5)):
+            election_id = make_election(questions, candidates)
+            self.assertEqual(self.statements(election_id, profile, use), expected,
+                             f"{profile} on a {questions}x{candidates} election")
+
+    def test_listing(self):
+        self.assertStatements(LISTING, lambda e: (e.name, e.opened), 1)
+
+    def test_detail(self):
+        self.assertStatements(DETAIL, lambda e: e.dict_from_colset(), 3)
+
+    def test_ballot_template(self):
+        self.assertStatements(BALLOT_TEMPLATE, lambda e: (BasicBallot(e), e.dict_from_colset(), e.vote_email), 5)
+
+    def test_manifest(self):
+        self.assertStatements(MANIFEST, generate_manifest, 5)
+
+    def test_tally(self):
+        self.assertStatements(TALLY, tally_walk, 4)
+
+    def test_off_profile_raises(self):
+        election_id = make_election(2, 2)
+        current_app.db_session.expunge_all()
+        e = load(Election, election_id, TALLY)
+        with self.assertRaises(InvalidRequestError):
+            e.questions[0].candidates[0].party
+        with self.assertRaises(InvalidRequestError):
+            e.ballots
+
+
+if __name__ == "__main__":
+    import unittest
+    unittest.main()
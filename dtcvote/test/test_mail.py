@@ -0,0 +1,135 @@
+import socket
+from email import message_from_bytes
+from email.policy import default
+
+from aiosmtpd.controller import Controller
+from flask import current_app
+from sqlalchemy import delete as sql_delete
+from sqlalchemy import select, update
+
+from dtcvote.config import MAIL_BACKOFF, MAIL_MAX_ATTEMPTS, MAIL_MESSAGE_ID_DOMAIN
+from dtcvote.database import db_insert
+from dtcvote.mail import Relay, deliver
+from dtcvote.models.orm import OutboundEmail
+from dtcvote.test import BaseTestCase
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class StandIn(object):
+    """
+    A relay that refuses refused@ for good, and busy@ for now until it is
+    told to stop being busy.
+    """
+
+    def __init__(self):
+        self.busy = True
+        self.messages = list()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("refused@"):
+            return "550 5.1.1 No such mailbox"
+        if address.startswith("busy@") and self.busy:
+            return "450 4.2.1 Mailbox busy, try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, message_from_bytes(envelope.content, policy=default)))
+        return "250 OK"
+
+
+class TestDeliver(BaseTestCase):
+    """
+    deliver() drains the queue into a local aiosmtpd relay. It commits, so
+    the rows each test queues are deleted again afterwards.
+    """
+
+    def setUp(self):
+        self.handler = StandIn()
+        port = free_port()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=port)
+        self.controller.start()
+        self.relay = Relay("127.0.0.1", port)
+        self.ids = list()
+
+    def tearDown(self):
+        self.controller.stop()
+        if self.ids:
+            current_app.db_session.execute(sql_delete(OutboundEmail).where(OutboundEmail.id.in_(self.ids)))
+            current_app.db_session.commit()
+        super().tearDown()
+
+    def queue(self, *addresses: str, attempts: int = 0):
+        rows = db_insert([OutboundEmail(kind="vote", email_from="Election <election@example.com>", email_to=a,
+                                        subject=f"Vote, {a}", body=f"Your ballot, {a}", attempts=attempts)
+                          for a in addresses])
+        current_app.db_session.commit()
+        self.ids += [r.id for r in rows]
+        return [r.id for r in rows]
+
+    def rows(self):
+        stmt = select(OutboundEmail).where(OutboundEmail.id.in_(self.ids)).execution_options(populate_existing=True)
+        return {r.email_to: r for r in current_app.db_session.execute(stmt).scalars()}
+
+    def test_sends_every_due_email(self):
+        ids = self.queue("a@example.com", "b@example.com")
+        self.assertEqual(deliver(self.relay, "test", until_empty=True), 2)
+        received = {m["To"]: (rcpt, m) for rcpt, m in self.handler.messages}
+        for email_id, address in zip(ids, ("a@example.com", "b@example.com")):
+            rcpt, m = received[address]
+            self.assertEqual(rcpt, [address])
+            self.assertEqual(m["Subject"], f"Vote, {address}")
+            self.assertEqual(m["Message-ID"], f"<outbound-{email_id}@{MAIL_MESSAGE_ID_DOMAIN}>")
+            self.assertEqual(m.get_content().strip(), f"Your ballot, {address}")
+        for row in self.rows().values():
+            self.assertEqual((row.state, row.attempts, row.last_error, row.claimed_by), ("sent", 1, None, "test"))
+            self.assertIsNotNone(row.sent_dt)
+
+    def test_refused_recipient_fails_at_once(self):
+        self.queue("refused@example.com", "a@example.com")
+        self.assertEqual(deliver(self.relay, "test", until_empty=True), 1)
+        self.assertEqual([m["To"] for _, m in self.handler.messages], ["a@example.com"])
+        refused = self.rows()["refused@example.com"]
+        self.assertEqual((refused.state, refused.attempts), ("failed", 1))
+        self.assertIn("550", refused.last_error)
+
+    def test_busy_recipient_backs_off_then_sends(self):
+        self.queue("busy@example.com")
+        self.assertEqual(deliver(self.relay, "test", until_empty=True), 0)
+        busy = self.rows()["busy@example.com"]
+        self.assertEqual((busy.state, busy.attempts), ("queued", 1))
+        self.assertIn("450", busy.last_error)
+        # backoff * 2^0, give or take a quarter, from when it was claimed
+        wait = (busy.next_attempt_dt - busy.claimed_dt).total_seconds()
+        self.assertGreaterEqual(wait, MAIL_BACKOFF * 0.75)
+        self.assertLess(wait, MAIL_BACKOFF * 1.25 + 5)
+
+        # not due yet, so not tried again
+        self.assertEqual(deliver(self.relay, "test", until_empty=True), 0)
+        self.assertEqual(self.rows()["busy@example.com"].attempts, 1)
+
+        self.handler.busy = False
+        current_app.db_session.execute(update(OutboundEmail).where(OutboundEmail.id.in_(self.ids))
+                                       .values(next_attempt_dt=busy.claimed_dt)
+                                       .execution_options(synchronize_session=False))
+        current_app.db_session.commit()
+        self.assertEqual(deliver(self.relay, "test", until_empty=True), 1)
+        busy = self.rows()["busy@example.com"]
+        self.assertEqual((busy.state, busy.attempts, busy.last_error), ("sent", 2, None))
+
+    def test_busy_recipient_fails_after_max_attempts(self):
+        self.queue("busy@example.com", attempts=MAIL_MAX_ATTEMPTS - 1)
+        self.assertEqual(deliver(self.relay, "test", until_empty=True), 0)
+        busy = self.rows()["busy@example.com"]
+        self.assertEqual((busy.state, busy.attempts), ("failed", MAIL_MAX_ATTEMPTS))
+        self.assertEqual(self.handler.messages, [])
+
+
+if __name__ == "__main__":
+    import unittest
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+
+from dtcvote.tabulate import tabulate
+
+
+def count(algorithm: str, groups, candidates: int = 3, number_of_winners: int = 1):
+    return tabulate(algorithm, groups, list(range(1, candidates + 1)), number_of_winners, 7)
+
+
+def last_round(rows):
+    final = max(r["round"] for r in rows)
+    return {r["sequence"]: r["status"] for r in rows if r["round"] == final}
+
+
+def statuses(rows, status: str):
+    return {r["sequence"] for r in rows if r["status"] == status}
+
+
+class TestPlurality(unittest.TestCase):
+
+    def test_most_votes_wins(self):
+        rows = count("plurality", [((1,), 5), ((2,), 3), ((3,), 1)])
+        self.assertEqual(statuses(rows, "elected"), {1})
+        self.assertEqual({r["sequence"]: r["votes"] for r in rows}, {1: 5, 2: 3, 3: 1})
+        self.assertTrue(all(r["question_id"] == 7 for r in rows))
+
+    def test_tie_for_the_seat(self):
+        rows = count("plurality", [((1,), 4), ((2,), 4), ((3,), 1)])
+        self.assertEqual(statuses(rows, "elected"), set())
+        self.assertEqual(statuses(rows, "tie"), {1, 2})
+        self.assertEqual(statuses(rows, "defeated"), {3})
+
+    def test_tie_for_the_last_of_several_seats(self):
+        rows = count("plurality", [((1,), 6), ((2,), 4), ((3,), 4)], number_of_winners=2)
+        self.assertEqual(statuses(rows, "elected"), {1})
+        self.assertEqual(statuses(rows, "tie"), {2, 3})
+
+    def test_no_votes(self):
+        rows = count("plurality", [])
+        self.assertEqual(statuses(rows, "defeated"), {1, 2, 3})
+        self.assertTrue(all(r["votes"] == 0 for r in rows))
+
+
+class TestMajority(unittest.TestCase):
+
+    def test_majority_wins(self):
+        rows = count("majority", [((1,), 6), ((2,), 3), ((3,), 2)])
+        self.assertEqual(statuses(rows, "elected"), {1})
+
+    def test_runoff(self):
+        rows = count("majority", [((1,), 5), ((2,), 4), ((3,), 2)])
+        self.assertEqual(statuses(rows, "runoff"), {1, 2})
+        self.assertEqual(statuses(rows, "defeated"), {3})
+
+    def test_tie_for_the_runoff(self):
+        rows = count("majority", [((1,), 5), ((2,), 3), ((3,), 3)])
+        self.assertEqual(statuses(rows, "runoff"), {1})
+        self.assertEqual(statuses(rows, "tie"), {2, 3})
+
+    def test_half_is_not_a_majority(self):
+        rows = count("majority", [((1,), 4), ((2,), 4)], candidates=2)
+        self.assertEqual(statuses(rows, "runoff"), {1, 2})
+
+    def test_no_votes(self):
+        self.assertEqual(statuses(count("majority", []), "defeated"), {1, 2, 3})
+
+
+class TestRCV(unittest.TestCase):
+
+    def test_first_round_majority(self):
+        rows = count("rcv", [((1, 2), 6), ((2, 1), 4)])
+        self.assertEqual(max(r["round"] for r in rows), 1)
+        self.assertEqual(last_round(rows), {1: "elected", 2: "continuing", 3: "continuing"})
+
+    def test_elimination_transfers(self):
+        rows = count("rcv", [((1, 3), 4), ((2, 3), 3), ((3, 2), 2)])
+        self.assertEqual([r for r in rows if r["round"] == 1 and r["sequence"] == 3][0]["status"], "eliminated")
+        final = [r for r in rows if r["round"] == 2]
+        self.assertEqual({r["sequence"]: r["votes"] for r in final}, {1: 4, 2: 5})
+        self.assertEqual({r["sequence"]: r["votes_redistributed"] for r in final}, {1: 0, 2: 2})
+        self.assertEqual(last_round(rows), {1: "continuing", 2: "elected"})
+
+    def test_exhausted_ballots_leave_the_count(self):
+        # candidate 3's ballots rank no one else, so 4 of the 7 continuing ballots is a majority
+        rows = count("rcv", [((1,), 4), ((2,), 3), ((3,), 2)])
+        final = [r for r in rows if r["round"] == 2]
+        self.assertEqual(sum(r["votes"] for r in final), 7)
+        self.assertEqual(last_round(rows), {1: "elected", 2: "continuing"})
+
+    def test_earlier_rounds_break_a_tie_for_last(self):
+        rows = count("rcv", [((1,), 5), ((2,), 3), ((3, 2), 2), ((4, 3), 1)], candidates=4)
+        # round 2: 2 and 3 both have 3; 3 had fewer in round 1
+        round2 = {r["sequence"]: r for r in rows if r["round"] == 2}
+        self.assertEqual(round2[2]["votes"], round2[3]["votes"])
+        self.assertEqual(round2[3]["status"], "eliminated")
+
+    def test_unbreakable_tie_stops_the_count(self):
+        rows = count("rcv", [((1, 3), 4), ((2, 3), 4)])
+        self.assertEqual(statuses(rows, "elected"), set())
+        self.assertEqual(statuses(rows, "eliminated"), {3})
+        self.assertEqual(last_round(rows), {1: "tie", 2: "tie"})
+
+    def test_candidates_without_votes_go_together(self):
+        rows = count("rcv", [((1,), 4), ((2,), 3), ((3,), 2)], candidates=5)
+        self.assertEqual({r["sequence"] for r in rows if r["round"] == 1 and r["status"] == "eliminated"}, {4, 5})
+        self.assertEqual(statuses(rows, "elected"), {1})
+
+    def test_no_ballots(self):
+        rows = count("rcv", [])
+        self.assertEqual(statuses(rows, "defeated"), {1, 2, 3})
+        self.assertEqual(statuses(rows, "elected"), set())
+
+
+class TestSTV(unittest.TestCase):
+
+    def test_surplus_transfers(self):
+        # 20 ballots, 2 seats: quota is more than 20 / 3. 1 has 12, a surplus of 16/3
+        # worth 4/9 a ballot, which all goes to 3 and puts it ahead of 2
+        rows = count("rcv", [((1, 3), 12), ((2,), 5), ((3,), 3)], number_of_winners=2)
+        round1 = {r["sequence"]: r for r in rows if r["round"] == 1}
+        self.assertEqual(round1[1]["status"], "elected")
+        round2 = {r["sequence"]: r for r in rows if r["round"] == 2}
+        self.assertAlmostEqual(round2[3]["votes"], 3 + 16 / 3, places=5)
+        self.assertAlmostEqual(round2[3]["votes_redistributed"], 16 / 3, places=5)
+        self.assertEqual(statuses(rows, "elected"), {1, 3})
+
+    def test_elimination_fills_the_last_seat(self):
+        # 16 ballots: 1 is over the quota at once, 2 only with 4's ballots
+        rows = count("rcv", [((1,), 7), ((2,), 4), ((3, 2), 3), ((4, 2), 2)], candidates=4, number_of_winners=2)
+        self.assertEqual(statuses(rows, "elected"), {1, 2})
+        self.assertEqual(statuses(rows, "eliminated"), {4})
+        self.assertEqual(last_round(rows), {2: "elected", 3: "continuing"})
+
+    def test_no_more_candidates_than_seats(self):
+        rows = count("rcv", [((1,), 1)], candidates=2, number_of_winners=2)
+        self.assertEqual(statuses(rows, "elected"), {1, 2})
+
+    def test_votes_only_move(self):
+        rows = count("rcv", [((1, 2, 3), 9), ((2, 1), 4), ((3, 1, 2), 5), ((4, 3), 2)], candidates=4,
+                     number_of_winners=3)
+        for rnd in {r["round"] for r in rows}:
+            live = sum(r["votes"] for r in rows if r["round"] == rnd)
+            self.assertLessEqual(live, 20 + 1e-6)
+        self.assertEqual(len(statuses(rows, "elected")), 3)
+
+    def test_no_ballots(self):
+        rows = count("rcv", [], number_of_winners=2)
+        self.assertEqual(statuses(rows, "elected"), set())
+
+
+class TestTabulate(unittest.TestCase):
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            count("borda", [])
+
+
+if __name__ == "__main__":
+    unittest.main()
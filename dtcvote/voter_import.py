@@ -0,0 +1,213 @@
+"""
+Bulk voter import through COPY.
+
+Rows are parsed from CSV (with `name` and `email` columns) or NDJSON (one
+{"name", "email"} object per line) as they are read, and streamed with
+COPY into a temporary staging table. Everything after that happens in
+Postgres, in the caller's transaction:
+
+- Rows with a missing name, a malformed email or an email seen earlier in
+  the same import are marked rejected, with the reason.
+- The remaining rows are upserted into `voter` by case-insensitive email.
+  An existing voter's name is updated.
+- With an election, every upserted voter is attached to it. Voters already
+  attached are left alone.
+
+A bad row never aborts the import, including one that doesn't parse, isn't
+valid UTF-8 or has a NUL character, which COPY can't carry; those are
+rejected as they are read. It comes back in `rejected` with its line number.
+"""
+import codecs
+import csv
+import json
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Text, Tuple
+
+from flask import current_app
+from sqlalchemy import text
+
+from dtcvote.database import db_exec
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+# (line number, name, email, reason rejected or None)
+ImportRow = Tuple[int, Optional[Text], Optional[Text], Optional[Text]]
+
+
+def _row(line: int, name: Optional[Text], email: Optional[Text]) -> ImportRow:
+    # COPY text format has no escape for NUL, so one would fail the whole COPY
+    if "\x00" in (name or "") or "\x00" in (email or ""):
+        return line, None, None, "name and email must not contain NUL characters"
+    return line, name, email, None
+
+
+def _lines(stream: BinaryIO, invalid: Set[int]) -> Iterator[Text]:
+    """
+    Decode `stream` a line at a time. A line that isn't valid UTF-8 has its
+    number added to `invalid`, and comes out with the bad bytes replaced, so
+    its quotes and commas still delimit the row for the reader.
+    """
+    for number, raw in enumerate(stream, start=1):
+        if number == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            yield raw.decode("utf-8", errors="strict")
+        except UnicodeDecodeError:
+            invalid.add(number)
+            yield raw.decode("utf-8", errors="replace")
+
+
+def parse_csv(stream: BinaryIO) -> Iterator[ImportRow]:
+    invalid: Set[int] = set()
+    # csv.reader rather than DictReader, whose line_num lags behind a row that fails to parse
+    reader = csv.reader(_lines(stream, invalid))
+    # checked here rather than when COPY starts reading
+    try:
+        header = next(reader, ())
+    except csv.Error as err:
+        raise ValueError(f"The CSV header row is malformed: {err}")
+    if invalid:
+        raise ValueError("The CSV header row is not valid UTF-8")
+    columns = {c.strip().lower(): i for i, c in enumerate(header)}
+    if "name" not in columns or "email" not in columns:
+        raise ValueError("The CSV needs a header row with name and email columns")
+
+    def field(row: List[Text], column: Text) -> Optional[Text]:
+        return row[columns[column]] if columns[column] < len(row) else None
+
+    def rows() -> Iterator[ImportRow]:
+        # a quoted field can span lines; report the line its row starts on
+        line = reader.line_num + 1
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as err:
+                # the reader starts afresh on the next line
+                yield line, None, None, f"invalid CSV: {err}"
+            else:
+                # the reader doesn't read ahead, so any invalid line is one of this row's
+                if invalid:
+                    yield line, None, None, "not valid UTF-8"
+                elif row:
+                    yield _row(line, field(row, "name"), field(row, "email"))
+            invalid.clear()
+            line = reader.line_num + 1
+
+    return rows()
+
+
+def parse_ndjson(stream: BinaryIO) -> Iterator[ImportRow]:
+    for line, raw in enumerate(stream, start=1):
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError as err:
+            yield line, None, None, f"invalid JSON: {err}"
+            continue
+        if not isinstance(row, dict):
+            yield line, None, None, "not a JSON object"
+            continue
+        name, email = row.get("name"), row.get("email")
+        if not isinstance(name, (str, type(None))) or not isinstance(email, (str, type(None))):
+            yield line, None, None, "name and email must be strings"
+            continue
+        yield _row(line, name, email)
+
+
+PARSERS = {CSV: parse_csv, NDJSON: parse_ndjson}
+
+
+def _copy_field(value: Optional[Text]) -> Text:
+    if value is None:
+        return "\\N"
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class CopyStream(object):
+    """
+    A file-like view of rows in COPY text format, produced as COPY reads.
+    """
+
+    def __init__(self, rows: Iterator[ImportRow]):
+        self.rows = rows
+        self.buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            line, name, email, reject = row
+            self.buffer += f"{line}\t{_copy_field(name)}\t{_copy_field(email)}\t{_copy_field(reject)}\n".encode()
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+STAGE_STMT = """
+    CREATE TEMP TABLE voter_import (line integer PRIMARY KEY, name text, email text, reject text)
+    ON COMMIT DROP
+"""
+
+REJECT_INVALID_STMT = text(r"""
+    UPDATE voter_import SET reject = CASE
+        WHEN coalesce(btrim(name), '') = '' THEN 'missing name'
+        ELSE 'invalid email'
+    END
+    WHERE reject IS NULL
+      AND (coalesce(btrim(name), '') = '' OR email IS NULL OR btrim(email) !~ '^[^@\s]+@[^@\s]+\.[^@\s]+$')
+""")
+
+REJECT_DUPLICATES_STMT = text("""
+    UPDATE voter_import SET reject = 'duplicate of line ' || d.first
+    FROM (
+        SELECT line, min(line) OVER (PARTITION BY lower(btrim(email))) AS first
+        FROM voter_import WHERE reject IS NULL
+    ) d
+    WHERE voter_import.line = d.line AND d.first < d.line
+""")
+
+# Upsert the accepted rows and attach them to the election, if any, in one pass.
+# xmax is 0 only on rows this statement inserted rather than updated.
+UPSERT_STMT = text("""
+    WITH up AS (
+        INSERT INTO voter (name, email)
+        SELECT btrim(name), btrim(email) FROM voter_import WHERE reject IS NULL ORDER BY line
+        ON CONFLICT ((lower(email))) DO UPDATE SET name = EXCLUDED.name
+        RETURNING id, xmax = 0 AS inserted
+    ), attached AS (
+        INSERT INTO election_voter (election_id, voter_id)
+        SELECT CAST(:election_id AS integer), id FROM up WHERE :election_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+        RETURNING voter_id
+    )
+    SELECT count(*) FILTER (WHERE inserted) AS inserted,
+           count(*) FILTER (WHERE NOT inserted) AS updated,
+           (SELECT count(*) FROM attached) AS attached
+    FROM up
+""")
+
+
+def import_voters(stream: BinaryIO, fmt: Text = CSV, election_id: Optional[int] = None) -> Dict:
+    """
+    Load voters from a CSV or NDJSON byte stream within the thread's current
+    transaction. Returns counts of voters inserted, updated and attached,
+    and the rejected rows as {line, reason}.
+    """
+    rows = PARSERS[fmt](stream)
+    cursor = current_app.db_session.connection().connection.cursor()
+    try:
+        cursor.execute(STAGE_STMT)
+        cursor.copy_expert("COPY voter_import (line, name, email, reject) FROM STDIN", CopyStream(rows))
+    finally:
+        cursor.close()
+    db_exec(REJECT_INVALID_STMT)
+    db_exec(REJECT_DUPLICATES_STMT)
+    counts = db_exec(UPSERT_STMT.bindparams(election_id=election_id)).one()
+    rejected = db_exec(text("SELECT line, reject FROM voter_import WHERE reject IS NOT NULL ORDER BY line"))
+    return dict(inserted=counts.inserted, updated=counts.updated, attached=counts.attached,
+                rejected=[dict(line=line, reason=reason) for line, reason in rejected])